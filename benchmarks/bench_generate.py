@@ -0,0 +1,261 @@
+"""Benchmark of the project generation, scaling apps × models × fields.
+
+Synthetic compose files of growing size are generated in-process, phase by
+phase (parse, validate, scaffold, render, format, manifest and write). The
+results are written as JSON so the runs of two releases can be compared::
+
+    $ python benchmarks/bench_generate.py --output before.json
+    $ python benchmarks/bench_generate.py --output after.json --compare before.json
+
+By default each dimension is scaled on its own, starting from the first value
+of the other two. --matrix runs every combination instead. The benchmark
+runs offline, it only needs drf_compose and its dependencies.
+"""
+import itertools
+import json
+import pathlib
+import platform
+import statistics
+import sys
+import tempfile
+import time
+
+import click
+
+ROOT_PATH = pathlib.Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT_PATH))
+
+from drf_compose import __version__, cli, rendering, timing  # noqa: E402
+
+RESULTS_VERSION = 1
+
+# Field types and options cycled through by the synthetic models
+FIELD_TYPES = (
+    ("char", {"max_length": 200, "blank": True}),
+    ("text", {"blank": True, "null": True}),
+    ("integer", {"default": 0}),
+    ("boolean", {"default": False}),
+    ("dateTime", {"auto_now_add": True}),
+    ("decimal", {"max_digits": 10, "decimal_places": 2}),
+)
+
+
+def make_compose(apps: int, models: int, fields: int):
+    """
+    Returns a synthetic compose document of apps applications of models
+    models of fields fields each. Every model but the first of an application
+    has a foreign key to the first one.
+    """
+    app_with_model = []
+    for app_index in range(apps):
+        app_name = f"app{app_index}"
+        app_models = []
+        for model_index in range(models):
+            model_fields = []
+            for field_index in range(fields):
+                field_type, options = FIELD_TYPES[field_index % len(FIELD_TYPES)]
+                model_fields.append(
+                    {
+                        "name": f"field{field_index}",
+                        "type": field_type,
+                        "options": dict(options),
+                    }
+                )
+            if model_index and fields > 1:
+                model_fields[-1] = {
+                    "name": "parent",
+                    "type": "fk",
+                    "options": {
+                        "to": f"{app_name}.Model0",
+                        "on_delete": "models.CASCADE",
+                    },
+                }
+            app_models.append(
+                {
+                    "name": f"Model{model_index}",
+                    "meta": {"ordering": ["-id"]},
+                    "fields": model_fields,
+                    "str": "field0",
+                }
+            )
+        app_with_model.append({"app_name": app_name, "models": app_models})
+    return {"name": "bench_project", "app_with_model": app_with_model}
+
+
+def get_cases(apps: list, models: list, fields: list, matrix: bool):
+    """Returns the (apps, models, fields) benchmark cases."""
+    if matrix:
+        return list(itertools.product(apps, models, fields))
+    cases = [(count, models[0], fields[0]) for count in apps]
+    cases += [(apps[0], count, fields[0]) for count in models[1:]]
+    cases += [(apps[0], models[0], count) for count in fields[1:]]
+    return cases
+
+
+def run_case(
+    apps: int, models: int, fields: int, repeat: int, no_format: bool, workers: int
+):
+    """Generates the case repeat times and returns its phase timings."""
+    runs = []
+    files = 0
+    compose_file_content = json.dumps(make_compose(apps, models, fields))
+    with tempfile.TemporaryDirectory() as temporary_dir:
+        for run_index in range(repeat):
+            # Each run generates a new project next to its own compose file
+            run_path = pathlib.Path(temporary_dir) / f"run{run_index}"
+            run_path.mkdir()
+            source = run_path / "drf-compose.json"
+            source.write_text(compose_file_content)
+
+            timings = timing.Timings()
+            start_time = time.perf_counter()
+            with timing.recording(timings):
+                summary = cli.generate_project(
+                    source, no_format=no_format, format_workers=workers
+                )
+            timings.add("total", time.perf_counter() - start_time)
+            runs.append(timings.as_dict())
+            files = len(summary.tree)
+
+    phases = {}
+    for name in runs[0]:
+        seconds = [run.get(name, 0.0) for run in runs]
+        phases[name] = {
+            "min": min(seconds),
+            "median": statistics.median(seconds),
+            "max": max(seconds),
+        }
+    return {
+        "name": f"apps={apps},models={models},fields={fields}",
+        "apps": apps,
+        "models": models,
+        "fields": fields,
+        "files": files,
+        "phases": phases,
+    }
+
+
+def compare_results(results: dict, baseline: dict, threshold: float):
+    """
+    Returns the (case name, baseline seconds, seconds) of the cases whose
+    median total time is more than threshold slower than in baseline.
+    """
+    baseline_cases = {case["name"]: case for case in baseline["cases"]}
+    regressions = []
+    for case in results["cases"]:
+        baseline_case = baseline_cases.get(case["name"])
+        if baseline_case is None:
+            continue
+        before = baseline_case["phases"]["total"]["median"]
+        after = case["phases"]["total"]["median"]
+        if after > before * (1 + threshold):
+            regressions.append((case["name"], before, after))
+    return regressions
+
+
+def parse_counts(ctx, param, value: str):
+    try:
+        counts = [int(count) for count in value.split(",")]
+    except ValueError:
+        raise click.BadParameter("expected comma separated integers, e.g 1,10,100")
+    if not counts or min(counts) < 1:
+        raise click.BadParameter("counts must be greater than 0")
+    return counts
+
+
+@click.command()
+@click.option(
+    "--apps", default="1,10,100,500", show_default=True, callback=parse_counts
+)
+@click.option("--models", default="1,10,50", show_default=True, callback=parse_counts)
+@click.option("--fields", default="5,20,100", show_default=True, callback=parse_counts)
+@click.option("--matrix", is_flag=True, help="Run every apps × models × fields case")
+@click.option("--repeat", default=3, show_default=True, type=click.IntRange(min=1))
+@click.option("--no-format", is_flag=True, help="Skip formatting with black")
+@click.option(
+    "--format-workers",
+    type=click.IntRange(min=1),
+    show_default="CPU count",
+    help="Number of processes used to format the generated code",
+)
+@click.option(
+    "--engine",
+    default="django",
+    show_default=True,
+    type=click.Choice(sorted(rendering.ENGINES)),
+    help="Template engine rendering the generated code",
+)
+@click.option(
+    "-o",
+    "--output",
+    type=click.Path(dir_okay=False, path_type=pathlib.Path),
+    help="Write the results to this JSON file",
+)
+@click.option(
+    "--compare",
+    type=click.Path(exists=True, dir_okay=False, path_type=pathlib.Path),
+    help="Results JSON file of a previous run to compare against",
+)
+@click.option(
+    "--threshold",
+    default=0.25,
+    show_default=True,
+    help="Slowdown of the median total time reported as a regression",
+)
+def main(
+    apps,
+    models,
+    fields,
+    matrix,
+    repeat,
+    no_format,
+    format_workers,
+    engine,
+    output,
+    compare,
+    threshold,
+):
+    """Benchmarks the generation of synthetic projects."""
+    rendering.set_engine(engine)
+    results = {
+        "version": RESULTS_VERSION,
+        "drf_compose": __version__,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "repeat": repeat,
+        "format": not no_format,
+        "engine": engine,
+        "cases": [],
+    }
+    for case in get_cases(apps, models, fields, matrix):
+        result = run_case(*case, repeat, no_format, format_workers)
+        results["cases"].append(result)
+        click.echo(
+            f"{result['name']:<32} {result['files']:>6} files  "
+            + "  ".join(
+                f"{name} {seconds['median']:.3f}s"
+                for name, seconds in result["phases"].items()
+            )
+        )
+
+    if output is not None:
+        output.write_text(json.dumps(results, indent=2) + "\n")
+
+    if compare is not None:
+        regressions = compare_results(
+            results, json.loads(compare.read_text()), threshold
+        )
+        for name, before, after in regressions:
+            click.secho(
+                f"{name}: {before:.3f}s -> {after:.3f}s "
+                f"({(after / before - 1) * 100:+.0f}%)",
+                fg="red",
+            )
+        if regressions:
+            sys.exit(1)
+        click.secho("No regression", fg="green")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,106 @@
+"""Benchmark of the template rendering, Django engine against Jinja2.
+
+The application templates are rendered for synthetic model sets of growing
+size with every engine, with the contexts the generation renders them with.
+The results can be written as JSON::
+
+    $ python benchmarks/bench_render.py --models 10,100,1000 --output render.json
+
+Templates are compiled before timing, only rendering is measured.
+"""
+import json
+import pathlib
+import platform
+import statistics
+import sys
+import time
+
+import click
+
+ROOT_PATH = pathlib.Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT_PATH))
+
+from bench_generate import make_compose, parse_counts  # noqa: E402
+
+from drf_compose import __version__, generation, rendering  # noqa: E402
+
+RESULTS_VERSION = 1
+
+# Templates rendered with the models of an application
+APP_TEMPLATES = (
+    "app/models.py-tpl",
+    "app/serializers.py-tpl",
+    "app/views.py-tpl",
+    "app/admin.py-tpl",
+    "app/app_urls.py-tpl",
+)
+
+
+def time_render(renderer, contexts: dict, repeat: int):
+    """
+    Returns the seconds taken by each of the repeat renders of the app
+    templates, contexts maps each template to its context.
+    """
+    renderer.compile_all()
+    seconds = []
+    for _ in range(repeat):
+        start_time = time.perf_counter()
+        for template_name in APP_TEMPLATES:
+            renderer.render(template_name, contexts[template_name])
+        seconds.append(time.perf_counter() - start_time)
+    return seconds
+
+
+@click.command()
+@click.option(
+    "--models", default="10,100,1000", show_default=True, callback=parse_counts
+)
+@click.option("--fields", default=20, show_default=True, type=click.IntRange(min=1))
+@click.option("--repeat", default=5, show_default=True, type=click.IntRange(min=1))
+@click.option(
+    "-o",
+    "--output",
+    type=click.Path(dir_okay=False, path_type=pathlib.Path),
+    help="Write the results to this JSON file",
+)
+def main(models, fields, repeat, output):
+    """Benchmarks rendering the application templates with every engine."""
+    results = {
+        "version": RESULTS_VERSION,
+        "drf_compose": __version__,
+        "python": platform.python_version(),
+        "platform": platform.platform(),
+        "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        "repeat": repeat,
+        "cases": [],
+    }
+    renderers = {name: engine() for name, engine in rendering.ENGINES.items()}
+    for model_count in models:
+        compose_content = make_compose(1, model_count, fields)
+        contexts = generation.get_app_contexts(
+            compose_content["app_with_model"][0],
+            generation.get_views_context(compose_content),
+        )
+        case = {"models": model_count, "fields": fields, "engines": {}}
+        for name, renderer in renderers.items():
+            seconds = time_render(renderer, contexts, repeat)
+            case["engines"][name] = {
+                "min": min(seconds),
+                "median": statistics.median(seconds),
+                "max": max(seconds),
+            }
+        results["cases"].append(case)
+
+        medians = {name: timings["median"] for name, timings in case["engines"].items()}
+        click.echo(
+            f"models={model_count:<6} fields={fields:<4} "
+            + "  ".join(f"{name} {seconds:.4f}s" for name, seconds in medians.items())
+            + f"  jinja2 speedup x{medians['django'] / medians['jinja2']:.1f}"
+        )
+
+    if output is not None:
+        output.write_text(json.dumps(results, indent=2) + "\n")
+
+
+if __name__ == "__main__":
+    main()
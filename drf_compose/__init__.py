@@ -3,3 +3,7 @@
 __author__ = """Sotunde Abiodun"""
 __email__ = "sotundeabiodun00@gmail.com"
 __version__ = "0.1.1"
+
+from drf_compose.generation import ComposeError, ComposeResult, compose  # noqa: E402
+
+__all__ = ["ComposeError", "ComposeResult", "compose"]
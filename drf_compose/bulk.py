@@ -0,0 +1,30 @@
+"""Bulk endpoints of the generated viewsets.
+
+Models set ``bulk: true``, or the batch size of their bulk queries, to get a
+bulk/ route creating, updating and deleting many instances in a single
+request. They are resolved here into the list serializers and the viewsets
+rendered into the generated project, along with its ``<project>/bulk.py``.
+"""
+
+# Rows inserted or updated by each query of bulk_create and bulk_update
+DEFAULT_BATCH_SIZE = 1000
+
+
+def get_model_bulk(model: dict):
+    """
+    Returns the (bulk, batch_size) of a model: whether its viewset has the
+    bulk endpoints, and the batch size of their queries.
+    """
+    bulk = model.get("bulk")
+    if isinstance(bulk, dict):
+        return True, bulk.get("batch_size") or DEFAULT_BATCH_SIZE
+    return bool(bulk), DEFAULT_BATCH_SIZE
+
+
+def has_bulk(compose_content: dict):
+    """Returns whether any model of the project has the bulk endpoints."""
+    return any(
+        get_model_bulk(model)[0]
+        for app_with_model in compose_content["app_with_model"]
+        for model in app_with_model.get("models") or []
+    )
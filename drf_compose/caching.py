@@ -0,0 +1,95 @@
+"""Response caching of the generated viewsets.
+
+The compose file sets the cache of the whole project, its backend and the
+time to live of the cached responses, and models can set their own time to
+live or turn caching off with false. Both are resolved here into the
+``CACHES`` setting, the requirements and the cached viewsets rendered into
+the generated project.
+"""
+
+CACHE_BACKENDS = ("locmem", "redis", "memcached")
+
+DEFAULT_CACHE = {"backend": "locmem", "timeout": 300}
+
+# Django 3.2 has no Redis backend of its own, django-redis provides it
+BACKEND_CLASSES = {
+    "locmem": "django.core.cache.backends.locmem.LocMemCache",
+    "redis": "django_redis.cache.RedisCache",
+    "memcached": "django.core.cache.backends.memcached.PyMemcacheCache",
+}
+
+DEFAULT_LOCATIONS = {
+    "redis": "redis://127.0.0.1:6379/1",
+    "memcached": "127.0.0.1:11211",
+}
+
+BACKEND_REQUIREMENTS = {
+    "redis": "django-redis==5.0.0",
+    "memcached": "pymemcache==3.5.0",
+}
+
+
+def resolve_cache(cache: dict, project_name: str):
+    """
+    Returns cache completed with DEFAULT_CACHE, along with the backend_class,
+    the default location and the requirement of its backend.
+    """
+    resolved = {**DEFAULT_CACHE, **cache}
+    resolved["backend_class"] = BACKEND_CLASSES[resolved["backend"]]
+    resolved.setdefault(
+        "location", DEFAULT_LOCATIONS.get(resolved["backend"], project_name)
+    )
+    resolved["requirement"] = BACKEND_REQUIREMENTS.get(resolved["backend"])
+    return resolved
+
+
+def get_model_cache(model: dict, default: dict = None):
+    """
+    Returns the (cached, timeout) of a model: whether its list and retrieve
+    responses are cached, and its own time to live or None if it uses the
+    project's one.
+    """
+    cache = model.get("cache")
+    if cache is False:
+        return False, None
+    if cache is None:
+        return default is not None, None
+    return True, cache.get("timeout")
+
+
+def get_cache(compose_content: dict):
+    """
+    Returns the project's cache, the default one if it sets none but some of
+    its models set their own, or None when nothing is cached.
+    """
+    models = [
+        model
+        for app_with_model in compose_content["app_with_model"]
+        for model in app_with_model.get("models") or []
+    ]
+    if compose_content.get("auth_app") is not None:
+        models.append(compose_content["auth_app"])
+    if compose_content.get("cache") is not None:
+        return compose_content["cache"]
+    if any(isinstance(model.get("cache"), dict) for model in models):
+        return {}
+    return None
+
+
+def get_related_models(app_label: str, model: dict, model_name: str):
+    """
+    Returns the app_label.Model references of the models the fk, o2o and m2m
+    fields of a model relate to. Deleting one of them can change the model's
+    responses without saving or deleting it: m2m rows and SET_NULL relations
+    are removed without signals.
+    """
+    # Imported here as the migrations import Django, see django_core.setup
+    from drf_compose import migrations
+
+    return sorted(
+        {
+            reference
+            for reference in migrations.iter_relations(app_label, [model], None)
+            if reference not in ("self", f"{app_label}.{model_name}")
+        }
+    )
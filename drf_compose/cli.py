@@ -1,37 +1,24 @@
 """Console script for drf_compose."""
-import json
+import glob
+import os
 import pathlib
-import subprocess
 import sys
 
 import click
-import django
-import emoji
-import yaml as YAML
-from django.conf import settings
-from django.template.loader import render_to_string
-
-from drf_compose.django_core import settings as local_settings
-
-# Configure django.conf settings default values to use this project local_settings
-settings.configure(
-    DEBUG=False,
-    INSTALLED_APPS=local_settings.INSTALLED_APPS,
-    TEMPLATES=local_settings.TEMPLATES,
-    SECRET_KEY=local_settings.SECRET_KEY,
-)
 
-django.setup()
+from drf_compose import generation, parsing, rendering, timing
+
+# Compose files looked up when a directory is given to the batch command
+COMPOSE_FILE_NAMES = ("drf-compose.json", "drf-compose.yaml", "drf-compose.yml")
 
 
-@click.command()
+@click.group(invoke_without_command=True)
 @click.option(
     "-s",
     "--source",
     default="drf-compose.json",
     show_default=True,
     type=click.Path(
-        exists=True,
         file_okay=True,
         dir_okay=False,
         readable=True,
@@ -42,10 +29,120 @@ django.setup()
 @click.option(
     "--yaml",
     is_flag=True,
-    help="Indicates that the supplied source file is a YAML file",
+    help="Parse the source file as YAML whatever its extension, "
+    ".yaml and .yml files are detected",
+)
+@click.option(
+    "--no-format",
+    is_flag=True,
+    help="Skip formatting the generated code with black",
+)
+@click.option(
+    "--format-workers",
+    type=click.IntRange(min=1),
+    show_default="CPU count",
+    help="Number of processes used to format the generated code",
+)
+@click.option(
+    "-j",
+    "--jobs",
+    default=1,
+    show_default=True,
+    type=click.IntRange(min=1),
+    help="Number of processes used to generate the project's applications",
+)
+@click.option(
+    "--update",
+    is_flag=True,
+    help="Regenerate an existing project, only rewriting what changed in the compose file",
+)
+@click.option(
+    "--no-migrations",
+    is_flag=True,
+    help="Skip generating the initial migrations of the applications",
+)
+@click.option(
+    "--template-cache",
+    type=click.Path(file_okay=False, dir_okay=True, path_type=pathlib.Path),
+    help=(
+        "Directory where compiled templates are cached between runs, only writable by trusted users. "
+        "With the jinja2 engine, it must be private to the current user"
+    ),
+)
+@click.option(
+    "--engine",
+    default="django",
+    show_default=True,
+    type=click.Choice(["django", "jinja2"]),
+    help="Template engine rendering the generated code",
+)
+@click.option(
+    "--output-archive",
+    type=click.Path(file_okay=True, dir_okay=False, path_type=pathlib.Path),
+    help="Write the project into a .tar.gz, .tgz or .zip archive instead of a folder",
+)
+@click.option(
+    "--dry-run",
+    is_flag=True,
+    help="List the files that would be generated without writing anything",
 )
-def main(source: pathlib.Path, yaml: bool):
+@click.option(
+    "--timings",
+    is_flag=True,
+    help="Print the time spent in each phase, the slowest sections and templates",
+)
+@click.option(
+    "--profile",
+    type=click.Path(file_okay=True, dir_okay=False, path_type=pathlib.Path),
+    help="Write the cProfile statistics of the run to this file",
+)
+@click.option(
+    "--trace",
+    type=click.Path(file_okay=True, dir_okay=False, path_type=pathlib.Path),
+    help="Write a Chrome trace of the generation phases to this JSON file",
+)
+@click.pass_context
+def main(
+    ctx: click.Context,
+    source: pathlib.Path,
+    yaml: bool,
+    no_format: bool,
+    format_workers: int,
+    jobs: int,
+    update: bool,
+    no_migrations: bool,
+    template_cache: pathlib.Path,
+    engine: str,
+    output_archive: pathlib.Path,
+    dry_run: bool,
+    timings: bool,
+    profile: pathlib.Path,
+    trace: pathlib.Path,
+):
     """This script composes a DRF project."""
+    import emoji
+
+    rendering.set_engine(engine)
+    if template_cache is not None:
+        if engine == "jinja2":
+            unsafe_reason = rendering.check_bytecode_cache_dir(template_cache)
+            if unsafe_reason is not None:
+                raise click.ClickException(
+                    click.style(
+                        f"The template cache {template_cache} can not hold the jinja2 bytecode, {unsafe_reason}.",
+                        fg="red",
+                    )
+                )
+        rendering.renderer.cache_dir = template_cache
+
+    if ctx.invoked_subcommand is not None:
+        return
+
+    # The source path is checked here rather than by click, as it is not used by the subcommands
+    if not source.is_file():
+        raise click.BadParameter(
+            f"File '{source}' does not exist.", param_hint="'-s' / '--source'"
+        )
 
     click.echo(
         click.style(
@@ -54,300 +151,296 @@ def main(source: pathlib.Path, yaml: bool):
         )
     )
 
-    # Read the specified source file content, default is drf-compose.json in the current working directory.
-    compose_file_content = source.read_text()
+    # Phases are only recorded when their timings are asked for
+    run_timings = timing.Timings() if timings or trace is not None else None
+    profiler = None
+    if profile is not None:
+        import cProfile
 
-    # Try parsing the read file content, raise an error if there was an error parsing the file's content.
+        profiler = cProfile.Profile()
+        profiler.enable()
     try:
-        if yaml:
-            # If the --yaml flag is specified, it parses the file's content as YAML.
-            compose_file_content = YAML.full_load(compose_file_content)
-        else:
-            # If the --yaml flag is not specified (which is the default), it parses the file's content as JSON.
-            compose_file_content = json.loads(compose_file_content)
-    except Exception:
-        click.echo("Error parsing compose file", err=True)
-        raise click.ClickException("Error parsing compose file")
-
-    # Get the specified project name, raise an error if not found.
-    project_name = get_key_or_error(
-        compose_file_content, "name", err_message="project name is required"
-    )
-
-    # Get the list of specified project application names
-    specified_apps = list(
-        map(
-            get_app_names,
-            get_key_or_error(compose_file_content, "app_with_model", content_type=list),
-        )
-    )
-
-    # Since auth_app is optional, get the specified application name if there exist auth_app
-    if compose_file_content.get("auth_app", None) is not None:
-        specified_apps.insert(0, get_app_names(compose_file_content.get("auth_app")))
-
-    # Construct the project path using the source file parent directory and project name
-    new_project_path = pathlib.Path(source.parent / project_name)
-
-    if not new_project_path.exists():
-        # If the project path does not exist, create it and run the django-admin startproject <project_name> command
-        new_project_path.mkdir(exist_ok=True)
-        subprocess.run(
-            [
-                "django-admin",
-                "startproject",
-                project_name,
-                source.parent / project_name,
-            ]
-        )
-    else:
-        raise click.ClickException(
-            click.style(
-                f"Project folder with the specified project name ({project_name}) already exists.",
-                fg="red",
+        with timing.recording(run_timings), timing.phase("total"):
+            summary = generate_project(
+                source,
+                yaml=yaml,
+                no_format=no_format,
+                format_workers=format_workers,
+                jobs=jobs,
+                update=update,
+                output_archive=output_archive,
+                dry_run=dry_run,
+                migrations=not no_migrations,
             )
+    finally:
+        if profiler is not None:
+            profiler.disable()
+            profiler.dump_stats(profile)
+        if trace is not None:
+            run_timings.write_trace(trace)
+
+    if dry_run and not summary.updated:
+        click.echo("\n".join(summary.tree.listing()))
+    elif dry_run:
+        for relative_path in summary.written:
+            click.echo(f"would write {relative_path}")
+        for relative_path in summary.deleted:
+            click.echo(f"would delete {relative_path}")
+    if summary.updated:
+        click.echo(
+            f"{summary.changed_sections} of {summary.sections} sections changed, "
+            f"{len(summary.written)} files written, {len(summary.unchanged)} files unchanged, "
+            f"{len(summary.deleted)} files deleted."
         )
+        for relative_path in summary.hand_edited:
+            click.secho(
+                f"{relative_path} was edited by hand, it was left alone.", fg="yellow"
+            )
+    elif output_archive is not None and not dry_run:
+        click.echo(f"Project written to {output_archive}")
 
-    # Project level template files are files in the generated project directory by django e.g settings.py, urls.py
-    project_context = {
-        "local_apps": specified_apps,
-        "project_name": project_name,
-        "auth_app": compose_file_content.get("auth_app", None),
-    }
-
-    # Construct path to settings.py
-    new_project_settings_file = pathlib.Path(
-        source.parent / project_name / project_name / "settings.py"
-    )
-    # Write into settings.py using the settings.py-tpl template file and project_context
-    copy_tpl_files(
-        "project_level/settings.py-tpl", new_project_settings_file, project_context
-    )
-
-    # Construct path to urls.py
-    new_project_urls_file = pathlib.Path(
-        source.parent / project_name / project_name / "urls.py"
-    )
-    # Write into urls.py (create if it does not exist) using the project_urls.py-tpl template file and project_context
-    copy_tpl_files(
-        "project_level/project_urls.py-tpl",
-        new_project_urls_file,
-        project_context,
-        True,
-    )
+    if timings:
+        click.echo("\n".join(run_timings.report()))
 
-    # Construct path to requirements.txt
-    new_project_requirements_file = pathlib.Path(
-        source.parent / project_name / "requirements.txt"
-    )
-    # Write into requirements.txt (create if it does not exist)
-    # using the requirements.txt-tpl template file with no context
-    copy_tpl_files(
-        "project_level/requirements.txt-tpl", new_project_requirements_file, {}, True
+    # Show success status to user
+    click.secho(
+        emoji.emojize("All done! :sparkles: :cake: :sparkles:", use_aliases=True),
+        bold=True,
     )
+    sys.exit(0)
 
-    # Construct path for the apps directory - this is where all the project's applications will reside
-    apps_path = pathlib.Path(new_project_path / "apps")
-    apps_path.mkdir(exist_ok=True)
-
-    pathlib.Path(apps_path / "__init__.py").touch(exist_ok=True)
-
-    for app_with_model in get_key_or_error(
-        compose_file_content, "app_with_model", content_type=list
-    ):
-        app_name = get_key_or_error(app_with_model, "app_name")
-        app_name_path = apps_path / app_name
-        if not pathlib.Path(app_name_path).exists():
-            # If the application path does not exist, create it and run the django-admin startapp <app_name> command
-            pathlib.Path(app_name_path).mkdir(exist_ok=True)
-            subprocess.run(["django-admin", "startapp", app_name, app_name_path])
-
-        # Construct path to application specific apps.py
-        new_app_apps_file = pathlib.Path(app_name_path / "apps.py")
-        # Write into apps.py using the apps.py-tpl template file and application name as context
-        copy_tpl_files("app/apps.py-tpl", new_app_apps_file, {"app_name": app_name})
 
-        models_context = {"models": app_with_model.get("models")}
+@main.command()
+@click.argument("patterns", nargs=-1, required=True)
+@click.option(
+    "-w",
+    "--workers",
+    type=click.IntRange(min=1),
+    show_default="CPU count",
+    help="Number of processes generating projects",
+)
+@click.option(
+    "--no-format",
+    is_flag=True,
+    help="Skip formatting the generated code with black",
+)
+@click.option(
+    "--update",
+    is_flag=True,
+    help="Regenerate existing projects, only rewriting what changed in the compose files",
+)
+@click.option(
+    "--dry-run",
+    is_flag=True,
+    help="Generate the projects without writing anything",
+)
+def batch(patterns: tuple, workers: int, no_format: bool, update: bool, dry_run: bool):
+    """
+    Generates a DRF project for every compose file matching PATTERNS.
 
-        if models_context["models"] and type(models_context["models"]) == list:
+    A pattern is either a glob, e.g 'services/*/drf-compose.json', or a directory
+    searched recursively for drf-compose.json, drf-compose.yaml and drf-compose.yml files.
+    """
+    import time
 
-            # clean models for required fields
-            for single_model in models_context["models"]:
-                get_key_or_error(
-                    single_model, "name", err_message="model's name is required"
-                )
-                get_key_or_error(
-                    single_model,
-                    "fields",
-                    err_message="model's list of fields is required",
-                )
-                # clean model fields for required values
-                for single_field in single_model["fields"]:
-                    get_key_or_error(
-                        single_field, "name", err_message="field's name is required"
-                    )
-                    get_key_or_error(
-                        single_field, "type", err_message="field's type is required"
-                    )
+    sources = find_compose_files(patterns)
+    if not sources:
+        raise click.ClickException(
+            click.style("No compose file matches the given patterns.", fg="red")
+        )
 
-            # Construct file path to application specific models.py and write into it
-            new_app_model_file = pathlib.Path(app_name_path / "models.py")
-            copy_tpl_files("app/models.py-tpl", new_app_model_file, models_context)
+    # Compile the templates once, so every project (and forked worker) reuses them
+    rendering.renderer.compile_all()
+
+    start_time = time.perf_counter()
+    workers = min(workers or os.cpu_count() or 1, len(sources))
+    results = generation.run_tasks(
+        [
+            (generate_batch_project, (source, no_format, update, dry_run))
+            for source in sources
+        ],
+        workers,
+    )
+    elapsed_time = time.perf_counter() - start_time
 
-            # Construct file path to application specific serializers.py and write into it
-            new_app_serializers_file = pathlib.Path(app_name_path / "serializers.py")
-            copy_tpl_files(
-                "app/serializers.py-tpl", new_app_serializers_file, models_context, True
+    failed = [result for result in results if result["error"] is not None]
+    click.secho(
+        f"Generated {len(results) - len(failed)} of {len(results)} projects "
+        f"in {elapsed_time:.2f}s",
+        bold=True,
+    )
+    for result in results:
+        if result["error"] is None:
+            click.echo(
+                f"  {click.style('OK', fg='green')}     {result['seconds']:7.2f}s  "
+                f"{result['project_path']}"
             )
+        else:
+            click.echo(
+                f"  {click.style('FAILED', fg='red')} {result['seconds']:7.2f}s  "
+                f"{result['source']}: {click.unstyle(result['error'])}"
+            )
+    sys.exit(1 if failed else 0)
 
-            # Construct file path to application specific views.py and write into it
-            new_app_views_file = pathlib.Path(app_name_path / "views.py")
-            copy_tpl_files("app/views.py-tpl", new_app_views_file, models_context)
 
-            # Construct file path to application specific admin.py and write into it
-            new_app_views_file = pathlib.Path(app_name_path / "admin.py")
-            copy_tpl_files("app/admin.py-tpl", new_app_views_file, models_context)
+@main.command()
+@click.argument(
+    "source",
+    default="drf-compose.json",
+    type=click.Path(exists=True, dir_okay=False, path_type=pathlib.Path),
+)
+@click.option(
+    "--no-format",
+    is_flag=True,
+    help="Skip formatting the generated code with black",
+)
+@click.option(
+    "--debounce",
+    default=0.2,
+    show_default=True,
+    type=click.FloatRange(min=0),
+    help="Seconds without changes to wait for before regenerating",
+)
+def watch(source: pathlib.Path, no_format: bool, debounce: float):
+    """
+    Regenerates the project whenever the SOURCE compose file changes.
 
-            # Construct file path to application specific urls.py and write into it
-            new_app_urls_file = pathlib.Path(app_name_path / "urls.py")
-            copy_tpl_files(
-                "app/app_urls.py-tpl", new_app_urls_file, models_context, True
+    Django and the compiled templates are kept warm between runs and only the
+    sections whose compose input changed are generated again. Changes are
+    picked up with watchdog if it is installed, by polling otherwise.
+    """
+    import time
+
+    from drf_compose import watch as compose_watch
+
+    # Warm up everything a run needs once, so each regeneration only pays for its own work
+    rendering.renderer.compile_all()
+    if not no_format:
+        import black  # noqa: F401
+
+    def regenerate():
+        start_time = time.perf_counter()
+        try:
+            summary = generate_project(
+                source,
+                no_format=no_format,
+                format_workers=1,
+                update=True,
             )
-
-    if compose_file_content.get("auth_app", None) is not None:
-        auth_app = compose_file_content.get("auth_app")
-        auth_app_name = get_key_or_error(
-            auth_app, "app_name", err_message="auth app_name is required"
-        )
-        auth_app_name_path = apps_path / auth_app_name
-
-        if not pathlib.Path(auth_app_name_path).exists():
-            # If the custom authentication application path does not exist,
-            # create it and run the django-admin startapp <app_name> command
-            pathlib.Path(auth_app_name_path).mkdir(exist_ok=True)
-            subprocess.run(
-                ["django-admin", "startapp", auth_app_name, auth_app_name_path]
+        except click.ClickException as error:
+            click.echo(
+                f"{time.strftime('%H:%M:%S')} {error.format_message()}", err=True
             )
-
-        get_key_or_error(
-            auth_app, "model_name", err_message="auth model_name is required"
-        )
-
-        if auth_app.get("fields") and type(auth_app["fields"]) == list:
-            # clean model fields for required values
-            for single_field in auth_app["fields"]:
-                get_key_or_error(
-                    single_field, "name", err_message="field's name is required"
-                )
-                get_key_or_error(
-                    single_field, "type", err_message="field's type is required"
-                )
-
-        auth_models_context = {
-            "model": auth_app,
-            "include": compose_file_content.get("include"),
-        }
-
-        # Construct file path to custom authentication (user) models.py and write into it
-        new_app_model_file = pathlib.Path(auth_app_name_path / "models.py")
-        copy_tpl_files(
-            "auth_app/models.py-tpl", new_app_model_file, auth_models_context
-        )
-
-        # Construct file path to custom authentication (user) manager.py and write into it
-        new_app_manager_file = pathlib.Path(auth_app_name_path / "manager.py")
-        copy_tpl_files(
-            "auth_app/manager.py-tpl", new_app_manager_file, auth_models_context, True
-        )
-
-        # Construct file path to custom authentication (user) serializers.py and write into it
-        new_app_serializers_file = pathlib.Path(auth_app_name_path / "serializers.py")
-        copy_tpl_files(
-            "auth_app/serializers.py-tpl",
-            new_app_serializers_file,
-            auth_models_context,
-            True,
-        )
-
-        # Construct file path to custom authentication (user) views.py and write into it
-        new_app_views_file = pathlib.Path(auth_app_name_path / "views.py")
-        copy_tpl_files("auth_app/views.py-tpl", new_app_views_file, auth_models_context)
-
-        # Construct file path to custom authentication (user) admin.py and write into it
-        new_app_views_file = pathlib.Path(auth_app_name_path / "admin.py")
-        copy_tpl_files("auth_app/admin.py-tpl", new_app_views_file, auth_models_context)
-
-        # Construct file path to custom authentication (user) urls.py and write into it
-        new_app_urls_file = pathlib.Path(auth_app_name_path / "urls.py")
-        copy_tpl_files(
-            "auth_app/auth_urls.py-tpl", new_app_urls_file, auth_models_context, True
-        )
-
-        # Construct file path to custom authentication (user) apps.py and write into it
-        new_app_apps_file = pathlib.Path(auth_app_name_path / "apps.py")
-        copy_tpl_files(
-            "app/apps.py-tpl", new_app_apps_file, {"app_name": auth_app_name}
+            return
+        except Exception as error:
+            # Keep watching, the next save may fix the compose file
+            click.echo(
+                f"{time.strftime('%H:%M:%S')} {type(error).__name__}: {error}", err=True
+            )
+            return
+        elapsed_time = time.perf_counter() - start_time
+        click.echo(
+            f"{time.strftime('%H:%M:%S')} {summary.changed_sections} of "
+            f"{summary.sections} sections changed, {len(summary.written)} files "
+            f"written in {elapsed_time:.2f}s"
         )
+        for relative_path in summary.hand_edited:
+            click.secho(
+                f"{relative_path} was edited by hand, it was left alone.", fg="yellow"
+            )
 
-    # Having successfully generated the DRF project code, run black to format the code
-    subprocess.run(["black", new_project_path, "-q"])
-
-    # Show success status to user
-    click.secho(
-        emoji.emojize("All done! :sparkles: :cake: :sparkles:", use_aliases=True),
-        bold=True,
-    )
-    sys.exit(0)
+    regenerate()
+    click.secho(f"Watching {source} for changes, press Ctrl+C to stop.", bold=True)
+    try:
+        compose_watch.watch(source, regenerate, debounce=debounce)
+    except KeyboardInterrupt:
+        pass
 
 
-def get_app_names(obj: dict):
+def find_compose_files(patterns):
     """
-    Composes the specified applications name in the form of
-    apps.<app_name>
+    Returns the sorted compose files matching the glob patterns or found
+    recursively in the directories given as patterns.
     """
-    return f"apps.{obj['app_name']}"
+    sources = set()
+    for pattern in patterns:
+        if pathlib.Path(pattern).is_dir():
+            for file_name in COMPOSE_FILE_NAMES:
+                sources.update(pathlib.Path(pattern).rglob(file_name))
+        else:
+            sources.update(
+                pathlib.Path(path)
+                for path in glob.glob(pattern, recursive=True)
+                if pathlib.Path(path).is_file()
+            )
+    return sorted(sources)
 
 
-def copy_tpl_files(
-    tpl_file_name: str, dest_file_path: pathlib.Path, context: dict, touch: bool = False
+def generate_batch_project(
+    source: pathlib.Path, no_format: bool, update: bool, dry_run: bool = False
 ):
     """
-    This creates a file in the destination path if directed to do so,
-    Load a template and render it with a context, and
-    finally writes the returned render string to the file.
+    Generates the project of a single batch compose file. Errors are returned
+    rather than raised so one broken compose file does not stop the batch.
     """
-    if touch:
-        dest_file_path.touch(exist_ok=True)
-    render_model = render_to_string(tpl_file_name, context)
-    dest_file_path.write_text(render_model)
-
+    import time
 
-def get_key_or_error(
-    obj: dict,
-    key: str,
-    err_message=None,
-    content_type=None,
+    start_time = time.perf_counter()
+    result = {"source": source, "project_path": None, "error": None}
+    try:
+        summary = generate_project(
+            source,
+            no_format=no_format,
+            format_workers=1,
+            update=update,
+            dry_run=dry_run,
+        )
+        result["project_path"] = summary.project_path
+    except click.ClickException as error:
+        result["error"] = error.format_message()
+    except Exception as error:
+        result["error"] = f"{type(error).__name__}: {error}"
+    result["seconds"] = time.perf_counter() - start_time
+    return result
+
+
+def generate_project(
+    source: pathlib.Path,
+    yaml: bool = False,
+    no_format: bool = False,
+    format_workers: int = None,
+    jobs: int = 1,
+    update: bool = False,
+    output_archive: pathlib.Path = None,
+    dry_run: bool = False,
+    migrations: bool = True,
 ):
     """
-    This checks for a compulsory key in an object and raises
-    an error message when the key is not found.
-
-    If content_type is specified it checks if the found value is of the specified type
-    if it is not, it raises an error.
+    Generates the DRF project described by the source compose file next to it
+    and returns the ComposeResult, see drf_compose.generation.compose.
+    Errors are raised as ClickException, warnings are printed to stderr.
     """
-    if key in obj:
-        if content_type is None:
-            return obj[key]
-        else:
-            if type(obj[key]) == content_type:
-                return obj[key]
-            else:
-                raise click.ClickException(
-                    click.style(f"{key} is expected to be a {content_type}", fg="red")
-                )
-    raise click.ClickException(
-        click.style(err_message if err_message else f"{key} is required", fg="red")
+    # The format is detected from the source file extension, --yaml forces YAML
+    compose_file_content = parsing.load_compose_file(
+        source, format="yaml" if yaml else None
+    )
+
+    result = generation.compose(
+        compose_file_content,
+        source.parent,
+        update=update,
+        output_archive=output_archive,
+        dry_run=dry_run,
+        no_format=no_format,
+        format_workers=format_workers,
+        jobs=jobs,
+        migrations=migrations,
     )
+    if not result.ok:
+        raise click.ClickException(click.style("\n".join(result.errors), fg="red"))
+    for warning in result.warnings:
+        click.secho(warning, fg="yellow", err=True)
+    return result
 
 
 if __name__ == "__main__":
@@ -0,0 +1,162 @@
+"""Database connections of the generated project.
+
+The compose file sets the database engine, how long connections are kept
+open between requests, whether they are checked before being reused, a
+connection pool and the connection and statement timeouts. It can also add
+read replicas and databases applications are placed in, which a generated
+database router then picks from. They are resolved here into the
+``DATABASES`` and ``DATABASE_ROUTERS`` settings and the requirements of the
+generated project.
+"""
+import json
+
+DATABASE_ENGINES = ("sqlite3", "postgresql", "mysql")
+
+# Engines django-db-connection-pool can pool the connections of
+POOLED_ENGINES = ("postgresql", "mysql")
+
+DEFAULT_DATABASE = {"engine": "sqlite3", "health_checks": False}
+
+# Seconds connections are kept open, pooled connections go back to the pool
+# at the end of each request instead
+DEFAULT_CONN_MAX_AGE = 60
+
+# Seconds the reads of a client go to the primary database after it wrote,
+# so it reads its own writes whatever the replication lag
+DEFAULT_STICKY_SECONDS = 5
+
+DEFAULT_POOL = {"size": 10, "max_overflow": 10, "recycle": 3600, "timeout": 30}
+
+ENGINE_REQUIREMENTS = {
+    "postgresql": "psycopg2-binary==2.9.1",
+    "mysql": "mysqlclient==2.0.3",
+}
+
+# Django 3.2, which the generated projects pin, has no connection pool
+POOL_REQUIREMENT = "django-db-connection-pool==1.0.7"
+
+
+def resolve_database(database: dict, app_databases: dict = None):
+    """
+    Returns database completed with DEFAULT_DATABASE and DEFAULT_POOL, along
+    with the engine_class, the OPTIONS as a Python literal, the aliases of
+    the other databases, the Python literals of the database router and the
+    requirements of the generated project. app_databases holds the alias of
+    the applications placed outside the default database.
+    """
+    resolved = {
+        **DEFAULT_DATABASE,
+        **{key: value for key, value in database.items() if value is not None},
+    }
+    engine = resolved["engine"]
+    # An empty pool object pools the connections with the DEFAULT_POOL settings
+    pool = resolved.get("pool")
+    if isinstance(pool, dict):
+        resolved["pool"] = {**DEFAULT_POOL, **pool}
+        resolved["engine_class"] = f"dj_db_conn_pool.backends.{engine}"
+    else:
+        resolved["pool"] = None
+        resolved["engine_class"] = f"django.db.backends.{engine}"
+    if "conn_max_age" not in resolved:
+        resolved["conn_max_age"] = 0 if resolved["pool"] else DEFAULT_CONN_MAX_AGE
+
+    options = get_options(
+        engine, resolved.get("connect_timeout"), resolved.get("statement_timeout")
+    )
+    resolved["options"] = json.dumps(options) if options else None
+
+    resolved["aliases"] = get_aliases(resolved)
+    resolved["routing"] = bool(resolved["aliases"])
+    resolved["app_databases_literal"] = json.dumps(app_databases or {})
+    resolved.setdefault("sticky_seconds", DEFAULT_STICKY_SECONDS)
+    primary_replicas = {
+        "default": [replica["alias"] for replica in resolved.get("replicas") or []]
+    }
+    for routed_database in resolved.get("databases") or []:
+        primary_replicas[routed_database["alias"]] = [
+            replica["alias"] for replica in routed_database.get("replicas") or []
+        ]
+    resolved["replicas_literal"] = json.dumps(primary_replicas)
+    resolved["sticky"] = any(primary_replicas.values())
+
+    resolved["requirements"] = (
+        [ENGINE_REQUIREMENTS[engine]] if engine in ENGINE_REQUIREMENTS else []
+    )
+    if resolved["pool"]:
+        resolved["requirements"].append(POOL_REQUIREMENT)
+    return resolved
+
+
+def get_options(
+    engine: str, connect_timeout: int = None, statement_timeout: int = None
+):
+    """
+    Returns the OPTIONS of the database driver setting the connect timeout,
+    in seconds, and the statement timeout, in milliseconds.
+    """
+    options = {}
+    if connect_timeout is not None:
+        # sqlite3 waits that long for the database to be unlocked
+        timeout_option = "timeout" if engine == "sqlite3" else "connect_timeout"
+        options[timeout_option] = connect_timeout
+    if statement_timeout is not None and engine == "postgresql":
+        options["options"] = f"-c statement_timeout={statement_timeout}"
+    elif statement_timeout is not None and engine == "mysql":
+        options["init_command"] = f"SET SESSION max_execution_time={statement_timeout}"
+    return options
+
+
+def get_aliases(database: dict):
+    """
+    Returns the databases added to the default one, each primary database
+    before its replicas, as dicts of alias, primary (the database it is a
+    replica of, None for primary databases), the env_prefix of the DB_*
+    environment variables overriding them, and the Python expressions of
+    their NAME, HOST and PORT defaults.
+    """
+    aliases = []
+    entries = [(replica, "default") for replica in database.get("replicas") or []]
+    for routed_database in database.get("databases") or []:
+        entries.append((routed_database, None))
+        entries += [
+            (replica, routed_database["alias"])
+            for replica in routed_database.get("replicas") or []
+        ]
+    for entry, primary in entries:
+        base = f'DATABASES["{primary or "default"}"]'
+        if database["engine"] == "sqlite3":
+            # Every database is a file of its own, replicas included
+            name = f'os.path.join(BASE_DIR, "{entry["alias"]}.sqlite3")'
+        elif entry.get("name") is not None or primary is None:
+            name = json.dumps(entry.get("name") or entry["alias"])
+        else:
+            name = f'{base}["NAME"]'
+        aliases.append(
+            {
+                "alias": entry["alias"],
+                "primary": primary,
+                "env_prefix": f"DB_{entry['alias'].upper()}",
+                "base": base,
+                "name": name,
+                "host": (
+                    json.dumps(entry["host"])
+                    if entry.get("host") is not None
+                    else f'{base}["HOST"]'
+                ),
+                "port": (
+                    json.dumps(str(entry["port"]))
+                    if entry.get("port") is not None
+                    else f'{base}["PORT"]'
+                ),
+            }
+        )
+    return aliases
+
+
+def get_app_databases(compose_content: dict):
+    """Returns the database alias of the applications placed outside the default one."""
+    return {
+        app_with_model["app_name"]: app_with_model["database"]
+        for app_with_model in compose_content["app_with_model"]
+        if app_with_model.get("database") not in (None, "default")
+    }
@@ -0,0 +1,32 @@
+"""Lazy bootstrap of the Django instance used to render the template files."""
+
+_is_setup = False
+
+
+def setup():
+    """
+    Configures django.conf settings with this project local settings and
+    loads the installed apps, only the first time it is called.
+
+    Django is imported here rather than at module level, so importing the
+    CLI (e.g for --help) does not pay for Django's start up.
+    """
+    global _is_setup
+    if _is_setup:
+        return
+
+    import django
+    from django.conf import settings
+
+    from drf_compose.django_core import settings as local_settings
+
+    # Configure django.conf settings default values to use this project local_settings
+    if not settings.configured:
+        settings.configure(
+            DEBUG=False,
+            INSTALLED_APPS=local_settings.INSTALLED_APPS,
+            SECRET_KEY=local_settings.SECRET_KEY,
+        )
+
+    django.setup()
+    _is_setup = True
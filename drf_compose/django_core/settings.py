@@ -27,29 +27,16 @@ DEBUG = False
 
 # Application definition
 
+# Only the template app is needed to render the template files and load myfilters,
+# the contrib apps are left out to keep Django's start up cheap
 INSTALLED_APPS = [
-    "django.contrib.admin",
-    "django.contrib.auth",
-    "django.contrib.contenttypes",
-    "django.contrib.sessions",
-    "django.contrib.messages",
-    "django.contrib.staticfiles",
     "drf_compose.django_template_app",
 ]
 
-TEMPLATES = [
-    {
-        "BACKEND": "django.template.backends.django.DjangoTemplates",
-        "DIRS": [BASE_DIR / "templates"],
-        "APP_DIRS": True,
-        "OPTIONS": {
-            "context_processors": [
-                "django.template.context_processors.debug",
-                "django.template.context_processors.request",
-                "django.contrib.auth.context_processors.auth",
-                "django.contrib.messages.context_processors.messages",
-            ],
-            "autoescape": False,
-        },
-    },
-]
+# The migrations of the generated apps depend on the ones of these apps, and
+# the custom user model extends django.contrib.auth's AbstractUser, they are
+# only installed while the migrations are generated
+MIGRATIONS_INSTALLED_APPS = [
+    "django.contrib.contenttypes",
+    "django.contrib.auth",
+] + INSTALLED_APPS
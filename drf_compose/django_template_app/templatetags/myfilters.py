@@ -41,3 +41,46 @@ def clean_option(value: str, param: str):
     if param in STRING_OPTIONS:
         return f"'{value}'"
     return value
+
+
+def related_fields(model: dict, override: str, field_types: tuple):
+    """
+    Returns the names of the model's fields of the given (clean) types, or
+    the model's own override list if it sets one.
+    """
+    if model.get(override) is not None:
+        return model[override]
+    return [
+        field["name"]
+        for field in model.get("fields") or []
+        if clean_field_type(field["type"]) in field_types
+    ]
+
+
+@register.filter(name="select_related")
+def select_related(model: dict):
+    return related_fields(model, "select_related", ("ForeignKey", "OneToOneField"))
+
+
+@register.filter(name="prefetch_related")
+def prefetch_related(model: dict):
+    return related_fields(model, "prefetch_related", ("ManyToManyField",))
+
+
+@register.filter(name="many_to_many_fields")
+def many_to_many_fields(model: dict):
+    return [
+        field["name"]
+        for field in model.get("fields") or []
+        if clean_field_type(field["type"]) == "ManyToManyField"
+    ]
+
+
+@register.filter(name="lookups")
+def lookups(value: list):
+    return ", ".join(f'"{lookup}"' for lookup in value)
+
+
+@register.filter(name="keyword_arguments")
+def keyword_arguments(value: dict):
+    return ", ".join(f"{keyword}={argument!r}" for keyword, argument in value.items())
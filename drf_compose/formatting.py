@@ -0,0 +1,64 @@
+"""In-process code formatting of the generated project files."""
+import os
+import pathlib
+
+# Only files with these suffixes are handed over to the formatter
+FORMATTABLE_SUFFIXES = (".py",)
+
+
+def format_tree(tree, relative_paths=None, workers: int = None):
+    """
+    Formats the files of the OutputTree in memory with black and returns the
+    list of files that were changed and the list of the errors of the files
+    black could not format, which are left as they are. Only relative_paths
+    are formatted if given, every file of the tree otherwise.
+
+    Files are spread across a process pool of the given number of workers,
+    which defaults to the number of CPUs. The files are formatted in the
+    current process when a single worker is enough for the job.
+    """
+    relative_paths = [
+        relative_path
+        for relative_path in (tree if relative_paths is None else relative_paths)
+        if pathlib.PurePosixPath(relative_path).suffix in FORMATTABLE_SUFFIXES
+        and isinstance(tree[relative_path], str)
+    ]
+    sources = [tree[relative_path] for relative_path in relative_paths]
+    workers = min(workers or os.cpu_count() or 1, len(sources))
+
+    if workers <= 1:
+        results = list(map(format_source, sources))
+    else:
+        from concurrent.futures import ProcessPoolExecutor
+
+        # Hand out the files in chunks so each worker pays black's import only once
+        chunksize = max(1, len(sources) // (workers * 4))
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            results = list(executor.map(format_source, sources, chunksize=chunksize))
+
+    changed_files, errors = [], []
+    for relative_path, result in zip(relative_paths, results):
+        if isinstance(result, Exception):
+            errors.append(f"Error formatting {relative_path}: {result}")
+        elif result is not None:
+            tree[relative_path] = result
+            changed_files.append(relative_path)
+    return changed_files, errors
+
+
+def format_source(source: str):
+    """
+    Formats Python source code, returns the formatted code or None if it was
+    already formatted.
+
+    Formatting errors are returned instead of raised so a file black cannot
+    parse does not abort the formatting of every other file.
+    """
+    import black
+
+    try:
+        return black.format_file_contents(source, fast=False, mode=black.Mode())
+    except black.NothingChanged:
+        return None
+    except Exception as error:
+        return error
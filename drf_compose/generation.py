@@ -0,0 +1,861 @@
+"""Programmatic generation of DRF projects.
+
+``compose`` generates the project described by an already parsed compose
+document and returns a ComposeResult. It neither prints nor exits, so a
+long-running process can generate any number of projects::
+
+    from drf_compose import compose
+
+    result = compose(compose_content, "/srv/projects")
+    if not result.ok:
+        print(result.errors)
+
+The drf-compose command line is a thin wrapper around it.
+"""
+import pathlib
+
+import click
+
+from drf_compose import (
+    bulk,
+    caching,
+    database,
+    formatting,
+    indexes,
+    manifest,
+    output,
+    pagination,
+    rendering,
+    scaffold,
+    timing,
+    validation,
+)
+
+
+# The template files of an application and the files they are rendered to
+APP_FILES = {
+    "app/apps.py-tpl": "apps.py",
+    "app/models.py-tpl": "models.py",
+    "app/serializers.py-tpl": "serializers.py",
+    "app/views.py-tpl": "views.py",
+    "app/signals.py-tpl": "signals.py",
+    "app/admin.py-tpl": "admin.py",
+    "app/app_urls.py-tpl": "urls.py",
+}
+
+
+class ComposeError(Exception):
+    """Raised when a valid compose document can not be generated as asked."""
+
+
+class SectionSkipped(Exception):
+    """
+    Raised by the function generating a section to leave the section out of
+    the project, its message is reported as a warning of the run.
+    """
+
+
+class ComposeResult:
+    """
+    Outcome of a compose run.
+
+    tree holds every generated file in memory, written lists the files that
+    were written (or would be on a dry run), unchanged and hand_edited the
+    files an update left alone, deleted the files it removed as no section
+    generates them anymore. timings maps each generation phase to its
+    seconds and errors lists what went wrong, the run succeeded if it is
+    empty. warnings lists what was left out or left unformatted by a
+    successful run.
+    """
+
+    def __init__(
+        self,
+        project_name: str = None,
+        project_path: pathlib.Path = None,
+        tree: output.OutputTree = None,
+        written: list = None,
+        unchanged: list = None,
+        hand_edited: list = None,
+        deleted: list = None,
+        sections: int = 0,
+        changed_sections: int = 0,
+        updated: bool = False,
+        timings: timing.Timings = None,
+        errors: list = None,
+        warnings: list = None,
+    ):
+        self.project_name = project_name
+        self.project_path = project_path
+        self.tree = tree if tree is not None else output.OutputTree()
+        self.written = written or []
+        self.unchanged = unchanged or []
+        self.hand_edited = hand_edited or []
+        self.deleted = deleted or []
+        self.sections = sections
+        self.changed_sections = changed_sections
+        self.updated = updated
+        self.timings = timings if timings is not None else timing.Timings()
+        self.errors = errors or []
+        self.warnings = warnings or []
+
+    @property
+    def ok(self):
+        return not self.errors
+
+    def __repr__(self):
+        return (
+            f"<ComposeResult {self.project_name!r} ok={self.ok} "
+            f"written={len(self.written)} errors={len(self.errors)}>"
+        )
+
+
+def compose(
+    compose_content: dict,
+    output_dir=".",
+    update: bool = False,
+    output_archive=None,
+    dry_run: bool = False,
+    no_format: bool = False,
+    format_workers: int = None,
+    jobs: int = 1,
+    migrations: bool = True,
+):
+    """
+    Generates the DRF project described by compose_content in output_dir
+    and returns a ComposeResult.
+
+    Every file is rendered into an in-memory OutputTree first. The project
+    folder is then written in a single atomic step, synced into the existing
+    project on update, or written to output_archive instead. Nothing is
+    written at all on a dry run, the files are only available in the result's
+    tree.
+
+    The initial migrations of the applications are generated along with
+    them unless migrations is False. They are left out with a warning when
+    they can not be derived, e.g for field types Django does not provide.
+
+    Invalid compose documents and failures to write the project, including
+    OSErrors such as a full disk, are reported in the result's errors rather
+    than raised. compose can be called from several threads, their migrations
+    are generated one at a time as they change Django's settings.
+    """
+    result = ComposeResult()
+    try:
+        with timing.recording(result.timings):
+            generate(
+                result,
+                compose_content,
+                pathlib.Path(output_dir),
+                update=update,
+                output_archive=output_archive,
+                dry_run=dry_run,
+                no_format=no_format,
+                format_workers=format_workers,
+                jobs=jobs,
+                migrations=migrations,
+            )
+    except validation.ComposeValidationError as error:
+        result.errors = list(error.errors)
+    except (ComposeError, click.ClickException) as error:
+        message = (
+            error.format_message()
+            if isinstance(error, click.ClickException)
+            else str(error)
+        )
+        result.errors = [click.unstyle(message)]
+    except OSError as error:
+        result.errors = [f"The project can not be written: {error}"]
+    finally:
+        # Let the caller's recording, e.g the CLI's --timings, see the phases too
+        timing.merge(result.timings)
+    return result
+
+
+def generate(
+    result: ComposeResult,
+    compose_file_content: dict,
+    output_dir: pathlib.Path,
+    update: bool,
+    output_archive,
+    dry_run: bool,
+    no_format: bool,
+    format_workers: int,
+    jobs: int,
+    migrations: bool,
+):
+    """Runs the generation of compose, filling result in as it goes."""
+    # Validate the whole compose file content before anything is generated,
+    # every error found is reported at once.
+    with timing.phase("validate"):
+        validation.validate_compose(compose_file_content)
+
+    project_name = compose_file_content["name"]
+
+    # Get the list of specified project application names
+    specified_apps = list(map(get_app_names, compose_file_content["app_with_model"]))
+
+    # Since auth_app is optional, get the specified application name if there exist auth_app
+    if compose_file_content.get("auth_app", None) is not None:
+        specified_apps.insert(0, get_app_names(compose_file_content.get("auth_app")))
+
+    # Construct the project path using the output directory and project name
+    new_project_path = output_dir / project_name
+    result.project_name = project_name
+    result.project_path = new_project_path
+
+    if update and output_archive is not None:
+        raise ComposeError("A project can not be updated into an output archive.")
+
+    updating = update and new_project_path.exists()
+    if new_project_path.exists() and not update and output_archive is None:
+        raise ComposeError(
+            f"Project folder with the specified project name ({project_name}) already exists. "
+            "Use --update to regenerate it."
+        )
+    result.updated = updating
+
+    # Project level template files are files in the generated project directory by django e.g settings.py, urls.py
+    project_pagination = compose_file_content.get("pagination")
+    project_cache = caching.get_cache(compose_file_content)
+    project_context = {
+        "local_apps": specified_apps,
+        "project_name": project_name,
+        "auth_app": compose_file_content.get("auth_app", None),
+        "pagination": (
+            pagination.resolve_pagination(project_pagination)
+            if project_pagination is not None
+            else None
+        ),
+        "pagination_module": pagination.has_pagination(compose_file_content),
+        "cache": (
+            caching.resolve_cache(project_cache, project_name)
+            if project_cache is not None
+            else None
+        ),
+        "database": (
+            database.resolve_database(
+                compose_file_content["database"],
+                database.get_app_databases(compose_file_content),
+            )
+            if compose_file_content.get("database") is not None
+            else None
+        ),
+        "benchmark_url": get_benchmark_url(compose_file_content),
+        "bulk_module": bulk.has_bulk(compose_file_content),
+    }
+
+    # The views import the pagination and caching classes of the project when there are any
+    views_context = get_views_context(compose_file_content)
+
+    # The project level files, each application and the auth app are independent sections of the project,
+    # so they are generated as separate tasks which can run in parallel
+    sections = [("project", generate_project_files, (project_context,))]
+    for app_with_model in compose_file_content["app_with_model"]:
+        sections.append(
+            (
+                f"app:{app_with_model['app_name']}",
+                generate_app,
+                (app_with_model, views_context),
+            )
+        )
+
+    if compose_file_content.get("auth_app", None) is not None:
+        sections.append(
+            (
+                "auth_app",
+                generate_auth_app,
+                (
+                    compose_file_content.get("auth_app"),
+                    compose_file_content.get("include"),
+                    views_context,
+                ),
+            )
+        )
+
+    if migrations:
+        # The migrations depend on the models of every application, they are a section of their own
+        sections.append(
+            (
+                "migrations",
+                generate_migrations,
+                (
+                    compose_file_content["app_with_model"],
+                    compose_file_content.get("auth_app"),
+                    project_pagination,
+                ),
+            )
+        )
+
+    # Only the sections whose compose input changed are generated again on update
+    project_manifest = (
+        manifest.Manifest.load(new_project_path) if updating else manifest.Manifest()
+    )
+    pending_sections = []
+    for section_name, function, args in sections:
+        input_hash = manifest.hash_section(args)
+        if not updating or not project_manifest.is_section_unchanged(
+            section_name, input_hash, new_project_path
+        ):
+            pending_sections.append((section_name, input_hash, function, args))
+
+    section_results = run_tasks(
+        [
+            (generate_section, (section_name, function, args, timing.is_recording()))
+            for section_name, _, function, args in pending_sections
+        ],
+        jobs,
+    )
+    section_trees = []
+    tree = output.OutputTree()
+    for section_tree, section_timings, section_warnings in section_results:
+        if section_timings is not None:
+            timing.merge(section_timings)
+        result.warnings.extend(section_warnings)
+        section_trees.append(section_tree)
+        tree.update(section_tree)
+
+    if not no_format:
+        # Having successfully generated the DRF project code, format the generated files with black
+        with timing.phase("format"):
+            _, format_errors = formatting.format_tree(tree, workers=format_workers)
+        # The files black can not format are still written, as they were rendered
+        result.warnings.extend(format_errors)
+
+    result.tree = tree
+    result.sections = len(sections)
+    result.changed_sections = len(pending_sections)
+
+    with timing.phase("manifest"):
+        written, unchanged, hand_edited = list(tree), [], []
+        kept_migrations = []
+        if updating:
+            written, unchanged, hand_edited = manifest.plan_sync(
+                tree, list(tree), new_project_path, project_manifest
+            )
+            # A database may have applied the existing migrations, they are never rewritten
+            kept_migrations = [
+                relative_path
+                for relative_path in written
+                if is_migration(relative_path)
+                and (new_project_path / relative_path).exists()
+            ]
+            written = [path for path in written if path not in kept_migrations]
+            for relative_path in kept_migrations:
+                result.warnings.append(
+                    f"{relative_path} was left alone as it may have been applied, "
+                    "run manage.py makemigrations to migrate the model changes."
+                )
+
+        # The files the regenerated and the removed sections no longer generate
+        removed_sections = set(project_manifest.sections) - {
+            section_name for section_name, _, _ in sections
+        }
+        stale_entries = {}
+        for section_name, section_tree in [
+            *zip((section[0] for section in pending_sections), section_trees),
+            *((section_name, output.OutputTree()) for section_name in removed_sections),
+        ]:
+            for relative_path, entry in project_manifest.get_section_files(
+                section_name
+            ).items():
+                if relative_path not in section_tree and relative_path not in tree:
+                    stale_entries[relative_path] = entry
+
+        # Record the input and output hashes of the generated files so the project can be updated later
+        for (section_name, input_hash, _, _), section_tree in zip(
+            pending_sections, section_trees
+        ):
+            output_hashes = manifest.hash_tree(tree, section_tree)
+            for relative_path in hand_edited + kept_migrations:
+                if relative_path in output_hashes:
+                    output_hashes[relative_path] = None
+            project_manifest.record(section_name, input_hash, output_hashes)
+        for section_name in removed_sections:
+            project_manifest.forget(section_name)
+
+        deleted, stale_hand_edited = manifest.plan_removal(
+            stale_entries, new_project_path
+        )
+        for relative_path in stale_hand_edited:
+            # Kept, so the file is still known as generated if its section comes back
+            project_manifest.files[relative_path] = stale_entries[relative_path]
+            result.warnings.append(
+                f"{relative_path} is no longer generated but was edited by hand, "
+                "it was left alone."
+            )
+        tree[manifest.MANIFEST_FILE_NAME] = project_manifest.dumps()
+        written.append(manifest.MANIFEST_FILE_NAME)
+
+    with timing.phase("write"):
+        if dry_run:
+            pass
+        elif updating:
+            tree.write_files(new_project_path, written)
+            output.delete_files(new_project_path, deleted)
+        elif output_archive is not None:
+            tree.write_archive(output_archive, project_name)
+        else:
+            tree.write(new_project_path)
+
+    result.written = written
+    result.unchanged = unchanged
+    result.hand_edited = hand_edited
+    result.deleted = deleted
+
+
+def is_migration(relative_path: str):
+    """Returns whether the generated file at relative_path is a migration."""
+    path = pathlib.PurePosixPath(relative_path)
+    return path.parent.name == "migrations" and path.name != "__init__.py"
+
+
+def generate_section(section_name: str, function, args: tuple, record_timings: bool):
+    """
+    Runs the function generating a section, possibly in a worker process, and
+    returns its OutputTree together with the Timings of the section if
+    record_timings is set, None otherwise, and the warnings of the section.
+    A skipped section has an empty tree.
+    """
+    section_timings = timing.Timings() if record_timings else None
+    try:
+        if not record_timings:
+            return function(*args), None, []
+        with timing.recording(section_timings), section_timings.phase(
+            "section", section_name
+        ):
+            return function(*args), section_timings, []
+    except SectionSkipped as skipped:
+        return output.OutputTree(), section_timings, [str(skipped)]
+
+
+def generate_project_files(project_context: dict):
+    """
+    Returns the OutputTree of the startproject skeleton and the project level
+    template files, with paths relative to the project folder.
+    """
+    project_name = project_context["project_name"]
+    with timing.phase("scaffold"):
+        tree = scaffold.start_project(project_name)
+
+    # The apps directory is where all the project's applications will reside
+    tree["apps/__init__.py"] = ""
+
+    # Render settings.py using the settings.py-tpl template file and project_context
+    copy_tpl_files(
+        "project_level/settings.py-tpl",
+        tree,
+        f"{project_name}/settings.py",
+        project_context,
+    )
+
+    # Render urls.py using the project_urls.py-tpl template file and project_context
+    copy_tpl_files(
+        "project_level/project_urls.py-tpl",
+        tree,
+        f"{project_name}/urls.py",
+        project_context,
+    )
+
+    # Render serializers.py, saving only the fields the serializers change
+    copy_tpl_files(
+        "project_level/serializers.py-tpl",
+        tree,
+        f"{project_name}/serializers.py",
+        project_context,
+    )
+
+    # Render fieldsets.py, the ?fields=, ?omit= and ?expand= query parameters
+    copy_tpl_files(
+        "project_level/fieldsets.py-tpl",
+        tree,
+        f"{project_name}/fieldsets.py",
+        project_context,
+    )
+
+    if project_context["pagination_module"]:
+        # Render pagination.py, the pagination classes of the viewsets
+        copy_tpl_files(
+            "project_level/pagination.py-tpl",
+            tree,
+            f"{project_name}/pagination.py",
+            project_context,
+        )
+
+    if project_context["cache"]:
+        # Render caching.py, the response caching of the viewsets
+        copy_tpl_files(
+            "project_level/caching.py-tpl",
+            tree,
+            f"{project_name}/caching.py",
+            project_context,
+        )
+
+    if project_context["bulk_module"]:
+        # Render bulk.py, the bulk endpoints of the viewsets
+        copy_tpl_files(
+            "project_level/bulk.py-tpl",
+            tree,
+            f"{project_name}/bulk.py",
+            project_context,
+        )
+
+    if project_context["database"] and project_context["database"]["health_checks"]:
+        # Render database.py, the health checks of the persistent connections
+        copy_tpl_files(
+            "project_level/database.py-tpl",
+            tree,
+            f"{project_name}/database.py",
+            project_context,
+        )
+    if project_context["database"] and project_context["database"]["routing"]:
+        # Render routers.py, routing the queries to the primary databases and replicas
+        copy_tpl_files(
+            "project_level/routers.py-tpl",
+            tree,
+            f"{project_name}/routers.py",
+            project_context,
+        )
+    if project_context["database"]:
+        # Render bench_database.py, comparing new, persistent and pooled connections
+        copy_tpl_files(
+            "project_level/bench_database.py-tpl",
+            tree,
+            "bench_database.py",
+            project_context,
+        )
+
+    # Render requirements.txt using the requirements.txt-tpl template file and project_context
+    copy_tpl_files(
+        "project_level/requirements.txt-tpl", tree, "requirements.txt", project_context
+    )
+
+    return tree
+
+
+def get_views_context(compose_content: dict):
+    """
+    Returns the project wide context of the serializers and views templates
+    of the applications, see get_app_contexts.
+    """
+    return {
+        "project_name": compose_content["name"],
+        "pagination": compose_content.get("pagination"),
+        "pagination_module": pagination.has_pagination(compose_content),
+        "cache": compose_content.get("cache"),
+        "caching_module": caching.get_cache(compose_content) is not None,
+    }
+
+
+def get_app_contexts(app_with_model: dict, views_context: dict = None):
+    """
+    Returns the contexts the template files of an application are rendered
+    with, as template name -> context. The templates of the models are left
+    out of an application without models, and signals.py out of one without
+    cached models.
+    """
+    app_name = app_with_model["app_name"]
+    views_context = views_context or {}
+    models_context = {"models": app_with_model.get("models")}
+    views_models = [
+        with_bulk(
+            with_cache(
+                with_pagination(model, views_context.get("pagination")),
+                views_context.get("cache"),
+            )
+        )
+        for model in models_context["models"] or []
+    ]
+    signals = any(model["cached"] for model in views_models)
+    # The bulk endpoints send post_bulk_save rather than post_save
+    bulk_context = {
+        "bulk_module": any(model["bulk"] for model in views_models),
+        "bulk_signals": any(
+            model["bulk"] and model["cached"] for model in views_models
+        ),
+    }
+
+    contexts = {"app/apps.py-tpl": {"app_name": app_name, "signals": signals}}
+    if not models_context["models"]:
+        return contexts
+    contexts["app/models.py-tpl"] = {
+        "models": [
+            with_indexes(
+                app_name, model["name"], model, views_context.get("pagination")
+            )
+            for model in models_context["models"]
+        ]
+    }
+    contexts["app/serializers.py-tpl"] = {
+        **views_context,
+        **bulk_context,
+        "models": views_models,
+    }
+    contexts["app/views.py-tpl"] = {
+        **views_context,
+        **bulk_context,
+        "models": views_models,
+    }
+    if signals:
+        # signals.py invalidates the cached responses of the models
+        contexts["app/signals.py-tpl"] = {
+            **views_context,
+            **bulk_context,
+            "models": [
+                {
+                    **model,
+                    "related_models": caching.get_related_models(
+                        app_name, model, model["name"]
+                    ),
+                }
+                for model in views_models
+            ],
+        }
+    contexts["app/admin.py-tpl"] = models_context
+    contexts["app/app_urls.py-tpl"] = models_context
+    return contexts
+
+
+def generate_app(app_with_model: dict, views_context: dict = None):
+    """
+    Returns the OutputTree of an application and its models, with paths
+    relative to the project folder. views_context holds the project_name and
+    the project's pagination the views are rendered with.
+    """
+    app_name = app_with_model["app_name"]
+    app_path = f"apps/{app_name}"
+    tree = output.OutputTree()
+    with timing.phase("scaffold"):
+        tree.update(scaffold.start_app(app_name), prefix=app_path)
+
+    # Render apps.py, and the application specific models.py, serializers.py, views.py,
+    # signals.py, admin.py and urls.py when it has models
+    for template_name, context in get_app_contexts(
+        app_with_model, views_context
+    ).items():
+        copy_tpl_files(
+            template_name, tree, f"{app_path}/{APP_FILES[template_name]}", context
+        )
+
+    return tree
+
+
+def generate_auth_app(auth_app: dict, include: dict, views_context: dict = None):
+    """
+    Returns the OutputTree of the custom authentication (user) application,
+    with paths relative to the project folder.
+    """
+    auth_app_name = auth_app["app_name"]
+    auth_app_path = f"apps/{auth_app_name}"
+    tree = output.OutputTree()
+    with timing.phase("scaffold"):
+        tree.update(scaffold.start_app(auth_app_name), prefix=auth_app_path)
+
+    auth_models_context = {
+        "model": auth_app,
+        "include": include,
+    }
+    views_context = views_context or {}
+
+    # Render the custom authentication (user) models.py, manager.py, serializers.py,
+    # views.py, admin.py, urls.py and apps.py
+    copy_tpl_files(
+        "auth_app/models.py-tpl",
+        tree,
+        f"{auth_app_path}/models.py",
+        {
+            **auth_models_context,
+            "model": with_indexes(
+                auth_app_name,
+                auth_app["model_name"],
+                auth_app,
+                views_context.get("pagination"),
+            ),
+        },
+    )
+    for tpl_file_name, file_name in (
+        ("auth_app/manager.py-tpl", "manager.py"),
+        ("auth_app/admin.py-tpl", "admin.py"),
+        ("auth_app/auth_urls.py-tpl", "urls.py"),
+    ):
+        copy_tpl_files(
+            tpl_file_name, tree, f"{auth_app_path}/{file_name}", auth_models_context
+        )
+    copy_tpl_files(
+        "auth_app/serializers.py-tpl",
+        tree,
+        f"{auth_app_path}/serializers.py",
+        {**auth_models_context, "project_name": views_context.get("project_name")},
+    )
+    views_model = with_cache(
+        with_pagination(auth_app, views_context.get("pagination")),
+        views_context.get("cache"),
+    )
+    copy_tpl_files(
+        "auth_app/views.py-tpl",
+        tree,
+        f"{auth_app_path}/views.py",
+        {**auth_models_context, **views_context, "model": views_model},
+    )
+    if views_model["cached"]:
+        # The signals template is shared with the applications, whose models have a name
+        copy_tpl_files(
+            "app/signals.py-tpl",
+            tree,
+            f"{auth_app_path}/signals.py",
+            {
+                **views_context,
+                "models": [
+                    {
+                        **views_model,
+                        "name": auth_app["model_name"],
+                        "related_models": caching.get_related_models(
+                            auth_app_name, auth_app, auth_app["model_name"]
+                        ),
+                    }
+                ],
+            },
+        )
+    copy_tpl_files(
+        "app/apps.py-tpl",
+        tree,
+        f"{auth_app_path}/apps.py",
+        {"app_name": auth_app_name, "signals": views_model["cached"]},
+    )
+
+    return tree
+
+
+def generate_migrations(
+    app_with_model: list, auth_app: dict, project_pagination: dict = None
+):
+    """
+    Returns the OutputTree of the initial migrations of the applications,
+    with paths relative to the project folder.
+    """
+    from drf_compose import migrations
+
+    tree = output.OutputTree()
+    with timing.phase("migrations"):
+        try:
+            app_migrations = migrations.make_initial_migrations(
+                {
+                    "app_with_model": app_with_model,
+                    "auth_app": auth_app,
+                    "pagination": project_pagination,
+                }
+            )
+        except migrations.MigrationError as error:
+            # The rest of the project does not depend on its migrations
+            raise SectionSkipped(f"The initial migrations were not generated: {error}")
+    for app_label, app_label_migrations in app_migrations.items():
+        for migration_name, migration_source in app_label_migrations:
+            tree[f"apps/{app_label}/migrations/{migration_name}.py"] = migration_source
+    return tree
+
+
+def with_pagination(model: dict, project_pagination: dict = None):
+    """
+    Returns a copy of model for the views templates, with paginated telling
+    whether its viewset is paginated and pagination its own resolved
+    pagination, None if it uses the project's one.
+    """
+    paginated, model_pagination = pagination.get_model_pagination(
+        model, project_pagination
+    )
+    return {**model, "paginated": paginated, "pagination": model_pagination}
+
+
+def with_cache(model: dict, project_cache: dict = None):
+    """
+    Returns a copy of model for the views templates, with cached telling
+    whether its list and retrieve responses are cached and cache_timeout its
+    own time to live, None if it uses the project's one.
+    """
+    cached, cache_timeout = caching.get_model_cache(model, project_cache)
+    return {**model, "cached": cached, "cache_timeout": cache_timeout}
+
+
+def with_bulk(model: dict):
+    """
+    Returns a copy of model for the serializers and views templates, with
+    bulk telling whether its viewset has the bulk endpoints and batch_size
+    the batch size of their queries.
+    """
+    model_bulk, batch_size = bulk.get_model_bulk(model)
+    return {**model, "bulk": model_bulk, "batch_size": batch_size}
+
+
+def with_indexes(
+    app_label: str, model_name: str, model: dict, project_pagination: dict = None
+):
+    """
+    Returns a copy of model for the models templates, with the meta_indexes
+    and meta_constraints of its Meta, see drf_compose.indexes.
+    """
+    return {
+        **model,
+        "meta_indexes": indexes.get_indexes(
+            app_label, model_name, model, project_pagination
+        ),
+        "meta_constraints": indexes.get_constraints(model),
+    }
+
+
+def get_benchmark_url(compose_file_content: dict):
+    """Returns the URL of the list endpoint of the project's first model."""
+    for app_with_model in compose_file_content["app_with_model"]:
+        for model in app_with_model.get("models") or []:
+            return f"/api/{model['name'].lower()}s/"
+    return "/api/"
+
+
+def run_tasks(tasks: list, jobs: int = 1):
+    """
+    Runs the (function, args) tasks and returns their results in the order
+    the tasks were given.
+
+    With more than one job the tasks run on a process pool. If several tasks
+    fail, the error of the first failing task in the given order is raised,
+    which is the same error the serial run stops at.
+    """
+    if jobs <= 1 or len(tasks) <= 1:
+        return [function(*args) for function, args in tasks]
+
+    from concurrent.futures import ProcessPoolExecutor
+
+    # Compile the templates before the workers start, so forked workers inherit them
+    with timing.phase("compile"):
+        rendering.renderer.compile_all()
+    # Workers which are not forked, e.g under the spawn start method, do not
+    # inherit the renderer, they set up the same one
+    with ProcessPoolExecutor(
+        max_workers=min(jobs, len(tasks)),
+        initializer=init_worker,
+        initargs=(rendering.renderer.name, rendering.renderer.cache_dir),
+    ) as executor:
+        futures = [executor.submit(function, *args) for function, args in tasks]
+        return [future.result() for future in futures]
+
+
+def init_worker(engine: str, cache_dir: pathlib.Path = None):
+    """Makes a worker process render with the engine and template cache given."""
+    rendering.set_engine(engine).cache_dir = cache_dir
+
+
+def get_app_names(obj: dict):
+    """
+    Composes the specified applications name in the form of
+    apps.<app_name>
+    """
+    return f"apps.{obj['app_name']}"
+
+
+def copy_tpl_files(
+    tpl_file_name: str, tree: output.OutputTree, relative_path: str, context: dict
+):
+    """
+    Load a template and render it with a context, and
+    finally adds the returned render string to the tree at relative_path.
+    """
+    with timing.phase("render", tpl_file_name):
+        tree[relative_path] = rendering.render_to_string(tpl_file_name, context)
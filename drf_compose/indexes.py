@@ -0,0 +1,186 @@
+"""Database indexes and constraints of the generated models.
+
+Models declare indexes and constraints in their compose ``meta``. On top of
+those, an index is added for the orderings a model is read in, its
+``meta.ordering`` and the ordering of its cursor pagination, unless an index
+or the primary key, a unique field or a relation already covers it or the
+model sets ``auto_indexes`` to false.
+
+Indexes without a name are given the name Django would give them, so the
+generated models.py and migrations always agree on it.
+"""
+import hashlib
+
+from drf_compose import pagination
+
+# Field types whose column is named after the field with an _id suffix, and
+# which Django indexes already
+RELATION_FIELD_TYPES = ("ForeignKey", "OneToOneField")
+
+
+def get_db_table(app_label: str, model_name: str, meta: dict):
+    """Returns the table of a model, as Django names it."""
+    return str(meta.get("db_table") or f"{app_label}_{model_name.lower()}")
+
+
+def get_fields(model: dict):
+    """Returns the compose fields of a model by name."""
+    return {field["name"]: field for field in model.get("fields") or []}
+
+
+def is_relation(field: dict):
+    """Returns whether a compose field is a fk or o2o relation."""
+    # Imported here as the template filters import Django, see django_core.setup
+    from drf_compose.django_template_app.templatetags.myfilters import (
+        clean_field_type,
+    )
+
+    return clean_field_type(field["type"]) in RELATION_FIELD_TYPES
+
+
+def get_column(fields: dict, field_name: str):
+    """Returns the column of a field of the model."""
+    field = fields.get(field_name)
+    if field is None:
+        # pk and the fields of the auth app's AbstractUser are named after their column
+        return "id" if field_name == "pk" else field_name
+    options = field.get("options") or {}
+    if options.get("db_column"):
+        return str(options["db_column"])
+    if is_relation(field):
+        return f"{field_name}_id"
+    return field_name
+
+
+def make_index_name(table: str, columns: list, suffix: str = "idx"):
+    """
+    Returns the name Django gives to an index without one, see
+    django.db.models.Index.set_name_with_model. columns start with a - for
+    descending ones.
+    """
+    digest = hashlib.md5()
+    for part in [table] + columns + [suffix]:
+        digest.update(part.encode())
+    name = "%s_%s_%s_%s" % (
+        table[:11],
+        columns[0].lstrip("-")[:7],
+        digest.hexdigest()[:6],
+        suffix,
+    )
+    if name[0] == "_" or name[0].isdigit():
+        name = "D" + name[1:]
+    return name
+
+
+def is_covered(ordering: list, fields: dict, indexes: list):
+    """
+    Returns whether the ordering is already served by an index: the primary
+    key, a unique or indexed field or relation, or an index starting with the
+    same fields in the same directions.
+    """
+    first_field = fields.get(ordering[0].lstrip("-"))
+    if ordering[0].lstrip("-") in ("pk", "id"):
+        return True
+    if first_field is not None and len(ordering) == 1:
+        options = first_field.get("options") or {}
+        if (
+            options.get("primary_key")
+            or options.get("unique")
+            or options.get("db_index")
+            or is_relation(first_field)
+        ):
+            return True
+    for index in indexes:
+        if index.get("condition") is None and index["fields"][: len(ordering)] in (
+            ordering,
+            # A btree index is read backwards as well
+            [field[1:] if field.startswith("-") else f"-{field}" for field in ordering],
+        ):
+            return True
+    return False
+
+
+def get_orderings(model: dict, project_pagination: dict = None):
+    """Returns the orderings a model's list endpoint reads it in."""
+    orderings = []
+    meta_ordering = (model.get("meta") or {}).get("ordering")
+    if isinstance(meta_ordering, list) and meta_ordering:
+        orderings.append(meta_ordering)
+
+    paginated, model_pagination = pagination.get_model_pagination(
+        model, project_pagination
+    )
+    if paginated and model_pagination is None and project_pagination is not None:
+        model_pagination = pagination.resolve_pagination(project_pagination)
+    if model_pagination is not None and model_pagination["style"] == "cursor":
+        orderings.append([model_pagination["ordering"]])
+
+    return [
+        [str(field) for field in ordering]
+        for ordering in orderings
+        # Random and related orderings can not be served by an index of the table
+        if all(
+            isinstance(field, str) and field != "?" and "__" not in field
+            for field in ordering
+        )
+    ]
+
+
+def get_indexes(
+    app_label: str, model_name: str, model: dict, project_pagination: dict = None
+):
+    """
+    Returns the indexes of a model as dicts of fields, name, condition and
+    include, the declared ones first and then the automatic ones.
+    """
+    meta = model.get("meta") or {}
+    table = get_db_table(app_label, model_name, meta)
+    fields = get_fields(model)
+
+    indexes = []
+    for declared_index in meta.get("indexes") or []:
+        index = {
+            "fields": list(declared_index["fields"]),
+            "name": declared_index.get("name"),
+            "condition": declared_index.get("condition"),
+            "include": declared_index.get("include"),
+        }
+        indexes.append(index)
+
+    if model.get("auto_indexes") is not False:
+        for ordering in get_orderings(model, project_pagination):
+            if not is_covered(ordering, fields, indexes):
+                indexes.append(
+                    {
+                        "fields": ordering,
+                        "name": None,
+                        "condition": None,
+                        "include": None,
+                    }
+                )
+
+    for index in indexes:
+        if not index["name"]:
+            columns = [
+                ("-" if field.startswith("-") else "")
+                + get_column(fields, field.lstrip("-"))
+                for field in index["fields"]
+            ]
+            index["name"] = make_index_name(table, columns)
+    return indexes
+
+
+def get_constraints(model: dict):
+    """
+    Returns the constraints of a model as dicts of name and either check, a
+    check constraint, or fields and condition, a unique constraint.
+    """
+    return [
+        {
+            "name": constraint["name"],
+            "check": constraint.get("check"),
+            "fields": constraint.get("fields"),
+            "condition": constraint.get("condition"),
+        }
+        for constraint in (model.get("meta") or {}).get("constraints") or []
+    ]
@@ -0,0 +1,193 @@
+"""Manifest of the generated files, used to regenerate a project incrementally.
+
+The manifest is kept in the generated project. For every compose section
+(the project level files, each application and the auth app) it records a
+hash of the section's input, and for every generated file the input hash of
+its section and a hash of the bytes that were written.
+
+On update, sections whose input hash did not change are not rendered again,
+files whose bytes did not change are not written again and files whose bytes
+on disk no longer match the recorded output hash are considered hand-edited
+and left alone. Files a section no longer generates, e.g those of a removed
+application, are deleted unless they were hand-edited, whose entries are then
+kept so the files are still known if they are generated again.
+"""
+import hashlib
+import json
+import pathlib
+
+import click
+
+from drf_compose import __version__
+
+MANIFEST_FILE_NAME = ".drf-compose-manifest.json"
+MANIFEST_VERSION = 1
+
+
+def hash_bytes(content: bytes):
+    return hashlib.sha256(content).hexdigest()
+
+
+def hash_section(section):
+    """
+    Returns the input hash of a compose section. The generator version is part
+    of the hash so upgrading drf_compose regenerates every section.
+    """
+    content = json.dumps(section, sort_keys=True, default=str)
+    return hash_bytes(f"{__version__}\0{content}".encode())
+
+
+class Manifest:
+    """Input and output hashes of the files generated in a project."""
+
+    def __init__(self, sections: dict = None, files: dict = None):
+        # Section name -> input hash
+        self.sections = sections if sections is not None else {}
+        # File path relative to the project -> {"section", "input", "output"}
+        self.files = files if files is not None else {}
+
+    @classmethod
+    def load(cls, project_path: pathlib.Path):
+        """Reads the manifest of the project found at project_path."""
+        manifest_path = project_path / MANIFEST_FILE_NAME
+        try:
+            content = json.loads(manifest_path.read_text())
+            if content["version"] != MANIFEST_VERSION:
+                raise ValueError(f"unsupported manifest version {content['version']}")
+            return cls(content["sections"], content["files"])
+        except FileNotFoundError:
+            raise click.ClickException(
+                click.style(
+                    f"{project_path} has no {MANIFEST_FILE_NAME}, "
+                    "it can not be updated as it was not generated by drf-compose.",
+                    fg="red",
+                )
+            )
+        except (KeyError, TypeError, ValueError) as error:
+            raise click.ClickException(
+                click.style(f"Invalid {manifest_path}: {error}", fg="red")
+            )
+
+    def dumps(self):
+        """Returns the content of the manifest file."""
+        content = {
+            "version": MANIFEST_VERSION,
+            "sections": self.sections,
+            "files": dict(sorted(self.files.items())),
+        }
+        return json.dumps(content, indent=2) + "\n"
+
+    def is_section_unchanged(
+        self, section_name: str, input_hash: str, project_path: pathlib.Path
+    ):
+        """
+        Returns True if section_name was generated from the same input and
+        none of its files were deleted since.
+        """
+        if self.sections.get(section_name) != input_hash:
+            return False
+        return all(
+            (project_path / file_path).exists()
+            for file_path, entry in self.files.items()
+            if entry["section"] == section_name
+        )
+
+    def record(self, section_name: str, input_hash: str, output_hashes: dict):
+        """
+        Records the input hash of section_name and the output hash of each of
+        its generated files, given as relative path -> output hash.
+
+        A None output hash marks a file that was left alone as hand-edited,
+        whatever was recorded for it before is kept.
+        """
+        previous_files = self.files
+        self.forget(section_name)
+        self.sections[section_name] = input_hash
+        for relative_path, output_hash in output_hashes.items():
+            if output_hash is not None:
+                self.files[relative_path] = {
+                    "section": section_name,
+                    "input": input_hash,
+                    "output": output_hash,
+                }
+            elif relative_path in previous_files:
+                self.files[relative_path] = previous_files[relative_path]
+
+    def get_section_files(self, section_name: str):
+        """Returns the relative path -> entry of the files of section_name."""
+        return {
+            file_path: entry
+            for file_path, entry in self.files.items()
+            if entry["section"] == section_name
+        }
+
+    def forget(self, section_name: str):
+        """Removes section_name and its files from the manifest."""
+        self.sections.pop(section_name, None)
+        self.files = {
+            file_path: entry
+            for file_path, entry in self.files.items()
+            if entry["section"] != section_name
+        }
+
+    def is_hand_edited(self, project_path: pathlib.Path, relative_path: str):
+        """
+        Returns True if the file at relative_path exists but was not written by
+        drf-compose, or was changed since it was written.
+        """
+        file_path = project_path / relative_path
+        if not file_path.exists():
+            return False
+        entry = self.files.get(relative_path)
+        return entry is None or entry["output"] != hash_bytes(file_path.read_bytes())
+
+
+def hash_tree(tree, relative_paths):
+    """Returns the relative path -> output hash of the given files of the OutputTree."""
+    return {
+        relative_path: hash_bytes(tree.get_bytes(relative_path))
+        for relative_path in relative_paths
+    }
+
+
+def plan_removal(entries: dict, project_path: pathlib.Path):
+    """
+    Sorts the files the project no longer generates, given as relative path
+    -> manifest entry, by what removing them from project_path does: files to
+    delete, whose bytes are the ones written, and files that were hand-edited
+    and must be left alone. Files already gone are in neither.
+
+    Returns the (to delete, hand-edited) lists of relative paths.
+    """
+    to_delete, hand_edited = [], []
+    for relative_path, entry in sorted(entries.items()):
+        file_path = project_path / relative_path
+        if not file_path.exists():
+            continue
+        if entry["output"] == hash_bytes(file_path.read_bytes()):
+            to_delete.append(relative_path)
+        else:
+            hand_edited.append(relative_path)
+    return to_delete, hand_edited
+
+
+def plan_sync(tree, relative_paths, project_path: pathlib.Path, manifest: Manifest):
+    """
+    Sorts the given files of the OutputTree by what syncing them into the
+    existing project_path does: files to write, files whose bytes are
+    identical on disk and files that were hand-edited and must be left alone.
+
+    Returns the (to write, unchanged, hand-edited) lists of relative paths.
+    """
+    to_write, unchanged, hand_edited = [], [], []
+    for relative_path in relative_paths:
+        dest_file_path = project_path / relative_path
+        if manifest.is_hand_edited(project_path, relative_path):
+            hand_edited.append(relative_path)
+        elif dest_file_path.exists() and dest_file_path.read_bytes() == tree.get_bytes(
+            relative_path
+        ):
+            unchanged.append(relative_path)
+        else:
+            to_write.append(relative_path)
+    return to_write, unchanged, hand_edited
@@ -0,0 +1,387 @@
+"""Initial migrations of the generated applications.
+
+The migrations are derived from the compose document itself, without
+booting the generated project: the models are described as Django migration
+ModelStates, ordered by the dependency graph of their relations (fk, m2m and
+o2o fields, and the custom user model of the auth app), and fed to the same
+autodetector and writer ``manage.py makemigrations`` uses.
+
+Django is imported lazily, see drf_compose.django_core.setup.
+"""
+import ast
+import re
+import threading
+import uuid
+
+from drf_compose import django_core, indexes
+from drf_compose.django_template_app.templatetags.myfilters import (
+    STRING_OPTIONS,
+    clean_field_type,
+)
+
+# Field types relating a model to another one
+RELATION_FIELD_TYPES = ("ForeignKey", "ManyToManyField", "OneToOneField")
+
+# Migration files start with this line rather than Django's timestamped
+# header, so the same compose document always generates the same bytes
+MIGRATION_HEADER = "# Generated by drf-compose from the compose file\n\n"
+
+
+# String options naming an attribute of django.db.models, e.g models.CASCADE
+OPTION_NAME_REGEX = re.compile(r"models\.([A-Za-z_][A-Za-z0-9_]*)")
+
+
+# Serializes make_initial_migrations, which overrides the process wide settings
+_settings_lock = threading.Lock()
+
+
+class MigrationError(Exception):
+    """Raised when the migrations of a compose document can not be derived."""
+
+
+def get_apps(compose_content: dict):
+    """
+    Returns the (app label, models, auth model) of every application, the
+    auth app first. auth model is the auth_app section for the auth app and
+    None for the others.
+    """
+    apps = []
+    auth_app = compose_content.get("auth_app")
+    if auth_app is not None:
+        apps.append((auth_app["app_name"], [], auth_app))
+    for app_with_model in compose_content["app_with_model"]:
+        apps.append(
+            (app_with_model["app_name"], app_with_model.get("models") or [], None)
+        )
+    return apps
+
+
+def resolve_model_reference(to: str, app_label: str):
+    """Returns the app_label.Model reference of the to option of a relation."""
+    if to == "self" or "." in to:
+        return to
+    return f"{app_label}.{to}"
+
+
+def iter_relations(app_label: str, models: list, auth_model: dict):
+    """Yields the app_label.Model references of the relations of an application."""
+    fields = [field for model in models for field in model.get("fields") or []]
+    if auth_model is not None:
+        fields += auth_model.get("fields") or []
+    for field in fields:
+        options = field.get("options") or {}
+        if clean_field_type(field["type"]) in RELATION_FIELD_TYPES and options.get(
+            "to"
+        ):
+            yield resolve_model_reference(str(options["to"]), app_label)
+
+
+def build_app_graph(compose_content: dict):
+    """
+    Returns the dependency graph of the applications, as app label -> set of
+    the app labels its models relate to. Relations to models of applications
+    which are not part of the compose document, e.g auth.Group, are left out.
+    """
+    app_labels = [app_label for app_label, _, _ in get_apps(compose_content)]
+    graph = {}
+    for app_label, models, auth_model in get_apps(compose_content):
+        graph[app_label] = {
+            reference.split(".")[0]
+            for reference in iter_relations(app_label, models, auth_model)
+            if reference != "self"
+        } & (set(app_labels) - {app_label})
+    return graph
+
+
+def order_apps(graph: dict):
+    """
+    Returns the app labels of graph in topological order, every application
+    after the applications it depends on. Applications are otherwise kept in
+    their compose order, which is also the order applications of a
+    dependency cycle are left in.
+    """
+    ordered, done = [], set()
+    remaining = list(graph)
+    while remaining:
+        ready = [app for app in remaining if graph[app] <= done] or remaining[:1]
+        for app_label in ready:
+            ordered.append(app_label)
+            done.add(app_label)
+            remaining.remove(app_label)
+    return ordered
+
+
+def resolve_option_value(value: str, path: str):
+    """
+    Returns the value of a string option, which is a Python expression in the
+    generated models.py, e.g models.CASCADE. Only the names models.py imports
+    and literals are resolved, the compose document is never evaluated.
+    """
+    from django.db import models
+
+    expression = value.strip()
+    if expression == "uuid4":
+        return uuid.uuid4
+    match = OPTION_NAME_REGEX.fullmatch(expression)
+    if match is not None:
+        try:
+            return getattr(models, match.group(1))
+        except AttributeError:
+            raise MigrationError(f"{path}: django.db.models has no {match.group(1)!r}")
+    try:
+        return ast.literal_eval(expression)
+    except (ValueError, SyntaxError):
+        raise MigrationError(
+            f"{path}: {value!r} is not a models.<name>, uuid4 or a literal"
+        )
+
+
+def build_field(field: dict, app_label: str, path: str):
+    """Returns the Django model field described by a compose field."""
+    from django.db import models
+
+    class_name = clean_field_type(field["type"])
+    field_class = getattr(models, class_name, None)
+    if not isinstance(field_class, type) or not issubclass(field_class, models.Field):
+        raise MigrationError(f"{path}.type: unknown field type {field['type']!r}")
+
+    kwargs = {}
+    for option, value in (field.get("options") or {}).items():
+        if option in STRING_OPTIONS:
+            value = str(value)
+            if option == "to":
+                value = resolve_model_reference(value, app_label)
+        elif isinstance(value, str):
+            value = resolve_option_value(value, f"{path}.options.{option}")
+        kwargs[option] = value
+    try:
+        return field_class(**kwargs)
+    except Exception as error:
+        raise MigrationError(f"{path}: {error}")
+
+
+def build_model_state(
+    app_label: str,
+    model: dict,
+    path: str,
+    auth: bool = False,
+    project_pagination: dict = None,
+):
+    """
+    Returns the ModelState of a compose model, or of the custom user model
+    of the auth app if auth is set. The user model extends AbstractUser, whose
+    fields come first the way Django orders inherited fields.
+    """
+    from django.db import models
+    from django.db.migrations.state import ModelState
+
+    compose_fields = {}
+    if model.get("use_uuid_as_key"):
+        compose_fields["id"] = models.UUIDField(
+            primary_key=True, default=uuid.uuid4, editable=False
+        )
+    for index, field in enumerate(model.get("fields") or []):
+        compose_fields[field["name"]] = build_field(
+            field, app_label, f"{path}.fields[{index}]"
+        )
+
+    fields = {}
+    if auth:
+        from django.contrib.auth.models import AbstractUser
+
+        for base_field in (
+            AbstractUser._meta.local_fields + AbstractUser._meta.local_many_to_many
+        ):
+            if base_field.name not in compose_fields:
+                fields[base_field.name] = base_field.clone()
+    fields.update(compose_fields)
+
+    for field in fields.values():
+        if field.primary_key:
+            # Like the model options do, the primary key is left out of serialization
+            field.serialize = False
+    if not any(field.primary_key for field in fields.values()):
+        # The generated AppConfig sets BigAutoField as the default primary key
+        fields = {
+            "id": models.BigAutoField(
+                auto_created=True, primary_key=True, serialize=False, verbose_name="ID"
+            ),
+            **fields,
+        }
+    # Like Django, many to many fields come after the other ones
+    fields = dict(sorted(fields.items(), key=lambda item: bool(item[1].many_to_many)))
+
+    name = model["model_name"] if auth else model["name"]
+    options = {}
+    model_indexes = build_indexes(
+        indexes.get_indexes(app_label, name, model, project_pagination)
+    )
+    model_constraints = build_constraints(indexes.get_constraints(model))
+    if model.get("meta") or model_indexes:
+        from django.db.models.options import DEFAULT_NAMES, normalize_together
+
+        for option, value in (model.get("meta") or {}).items():
+            if option == "unique_together":
+                options[option] = set(normalize_together(value))
+            elif option in DEFAULT_NAMES and option not in ("indexes", "constraints"):
+                # The template quotes every meta option but ordering
+                options[option] = value if option == "ordering" else str(value)
+        if model_indexes:
+            options["indexes"] = model_indexes
+        if model_constraints:
+            options["constraints"] = model_constraints
+    elif auth:
+        # Without its own Meta, the user model inherits the one of AbstractUser
+        options = {
+            "verbose_name": str(AbstractUser._meta.verbose_name),
+            "verbose_name_plural": str(AbstractUser._meta.verbose_name_plural),
+            "abstract": False,
+        }
+
+    # The generated user manager is not used in migrations, so none is listed
+    return ModelState(app_label, name, list(fields.items()), options=options)
+
+
+def build_indexes(model_indexes: list):
+    """Returns the Django indexes of the indexes of drf_compose.indexes."""
+    from django.db import models
+
+    return [
+        models.Index(
+            fields=index["fields"],
+            name=index["name"],
+            condition=models.Q(**index["condition"]) if index["condition"] else None,
+            include=index["include"],
+        )
+        for index in model_indexes
+    ]
+
+
+def build_constraints(model_constraints: list):
+    """Returns the Django constraints of the constraints of drf_compose.indexes."""
+    from django.db import models
+
+    return [
+        models.CheckConstraint(
+            check=models.Q(**constraint["check"]), name=constraint["name"]
+        )
+        if constraint["check"]
+        else models.UniqueConstraint(
+            fields=constraint["fields"],
+            name=constraint["name"],
+            condition=(
+                models.Q(**constraint["condition"]) if constraint["condition"] else None
+            ),
+        )
+        for constraint in model_constraints
+    ]
+
+
+def build_project_state(compose_content: dict):
+    """
+    Returns the ModelStates of every compose model, applications in
+    topological order.
+    """
+    django_core.setup()
+    apps = {
+        app_label: (models, auth)
+        for app_label, models, auth in get_apps(compose_content)
+    }
+    app_indexes = {
+        app_with_model["app_name"]: index
+        for index, app_with_model in enumerate(compose_content["app_with_model"])
+    }
+    model_states = []
+    for app_label in order_apps(build_app_graph(compose_content)):
+        models, auth_model = apps[app_label]
+        if auth_model is not None:
+            model_states.append(
+                build_model_state(
+                    app_label,
+                    auth_model,
+                    "auth_app",
+                    auth=True,
+                    project_pagination=compose_content.get("pagination"),
+                )
+            )
+        for index, model in enumerate(models):
+            path = f"app_with_model[{app_indexes[app_label]}].models[{index}]"
+            model_states.append(
+                build_model_state(
+                    app_label,
+                    model,
+                    path,
+                    project_pagination=compose_content.get("pagination"),
+                )
+            )
+    return model_states
+
+
+def make_initial_migrations(compose_content: dict):
+    """
+    Returns the initial migrations of the compose applications, as app label
+    -> list of (migration name, migration source). An application has a
+    single 0001_initial migration, unless its relations form a cycle with
+    another application, which the autodetector then breaks in two.
+    """
+    django_core.setup()
+    from django.db.migrations.loader import MigrationLoader
+    from django.test.utils import override_settings
+
+    from drf_compose.django_core import settings as local_settings
+
+    app_labels = [app_label for app_label, _, _ in get_apps(compose_content)]
+
+    # Relations to the custom user model are written as settings.AUTH_USER_MODEL
+    # references, as in the generated settings.py
+    auth_app = compose_content.get("auth_app")
+    user_model = (
+        f"{auth_app['app_name']}.{auth_app['model_name']}"
+        if auth_app is not None
+        else "auth.User"
+    )
+    with _settings_lock, override_settings(
+        INSTALLED_APPS=local_settings.MIGRATIONS_INSTALLED_APPS,
+        AUTH_USER_MODEL=user_model,
+    ):
+        # The migrations of django.contrib.auth and contenttypes, without a database
+        loader = MigrationLoader(None, ignore_no_migrations=True)
+        return detect_initial_migrations(compose_content, loader, app_labels)
+
+
+def detect_initial_migrations(compose_content: dict, loader, app_labels: list):
+    """Returns the initial migrations of make_initial_migrations."""
+    from django.db.migrations.autodetector import MigrationAutodetector
+    from django.db.migrations.questioner import NonInteractiveMigrationQuestioner
+    from django.db.migrations.writer import MigrationWriter
+
+    from_state = loader.project_state()
+    to_state = loader.project_state()
+    for model_state in build_project_state(compose_content):
+        to_state.add_model(model_state)
+    try:
+        to_state.apps  # renders the models, resolving every relation
+    except (LookupError, ValueError) as error:
+        raise MigrationError(str(error))
+
+    # The applications are not installed, an initial migration must be asked for
+    questioner = NonInteractiveMigrationQuestioner(specified_apps=set(app_labels))
+    autodetector = MigrationAutodetector(from_state, to_state, questioner)
+    changes = autodetector.changes(
+        graph=loader.graph, trim_to_apps=set(app_labels), convert_apps=set(app_labels)
+    )
+    for migration in (migration for app in changes.values() for migration in app):
+        # The autodetector collects dependencies in a set, sort them for stable output
+        migration.dependencies.sort()
+    return {
+        app_label: [
+            (
+                migration.name,
+                MIGRATION_HEADER
+                + MigrationWriter(migration, include_header=False).as_string(),
+            )
+            for migration in changes[app_label]
+        ]
+        for app_label in order_apps(build_app_graph(compose_content))
+        if app_label in changes
+    }
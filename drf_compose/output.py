@@ -0,0 +1,157 @@
+"""In-memory tree of the generated project files.
+
+Generation renders every file into an OutputTree first. The tree is then
+written to disk in one bulk step, into a temporary directory which is
+renamed into place, streamed into a .tar.gz or .zip archive, or listed for
+a dry run. A failed run therefore leaves nothing behind on disk.
+"""
+import io
+import os
+import pathlib
+import shutil
+import tarfile
+import tempfile
+import time
+import zipfile
+
+import click
+
+# Archive file suffixes supported by OutputTree.write_archive
+ARCHIVE_SUFFIXES = (".tar.gz", ".tgz", ".zip")
+
+
+class OutputTree:
+    """
+    Generated files keyed by their POSIX path relative to the project folder.
+    Text files are kept as str, files copied as is are kept as bytes.
+    """
+
+    def __init__(self, files: dict = None):
+        self.files = dict(files) if files else {}
+
+    def __contains__(self, relative_path: str):
+        return relative_path in self.files
+
+    def __getitem__(self, relative_path: str):
+        return self.files[relative_path]
+
+    def __setitem__(self, relative_path: str, content):
+        self.files[pathlib.PurePosixPath(relative_path).as_posix()] = content
+
+    def __iter__(self):
+        return iter(self.files)
+
+    def __len__(self):
+        return len(self.files)
+
+    def items(self):
+        return self.files.items()
+
+    def update(self, other: "OutputTree", prefix: str = ""):
+        """
+        Adds the files of other under the prefix folder, replacing the files
+        with the same path.
+        """
+        for relative_path, content in other.items():
+            self[f"{prefix}/{relative_path}" if prefix else relative_path] = content
+
+    def get_bytes(self, relative_path: str):
+        content = self.files[relative_path]
+        return content.encode() if isinstance(content, str) else content
+
+    def write(self, project_path: pathlib.Path):
+        """
+        Writes the tree as the new project_path folder. The files are written
+        into a temporary folder next to project_path which is then renamed,
+        so project_path either appears complete or not at all.
+        """
+        project_path = pathlib.Path(project_path)
+        if project_path.exists():
+            raise click.ClickException(
+                click.style(f"{project_path} already exists.", fg="red")
+            )
+        project_path.parent.mkdir(parents=True, exist_ok=True)
+        temporary_path = pathlib.Path(
+            tempfile.mkdtemp(prefix=f".{project_path.name}-", dir=project_path.parent)
+        )
+        try:
+            # mkdtemp creates a private folder, give it the permissions of a regular one
+            os.chmod(temporary_path, 0o777 & ~get_umask())
+            self.write_files(temporary_path, self.files)
+            os.rename(temporary_path, project_path)
+        except BaseException:
+            shutil.rmtree(temporary_path, ignore_errors=True)
+            raise
+
+    def write_files(self, root_path: pathlib.Path, relative_paths):
+        """Writes the given files of the tree under root_path."""
+        created_dirs = set()
+        for relative_path in relative_paths:
+            file_path = root_path / relative_path
+            if file_path.parent not in created_dirs:
+                file_path.parent.mkdir(parents=True, exist_ok=True)
+                created_dirs.add(file_path.parent)
+            file_path.write_bytes(self.get_bytes(relative_path))
+
+    def write_archive(self, archive_path: pathlib.Path, root_name: str):
+        """
+        Streams the tree into a .tar.gz, .tgz or .zip archive, with every file
+        under the root_name folder.
+        """
+        archive_path = pathlib.Path(archive_path)
+        archive_path.parent.mkdir(parents=True, exist_ok=True)
+        modified_time = time.time()
+        if archive_path.name.endswith(".zip"):
+            with zipfile.ZipFile(archive_path, "w", zipfile.ZIP_DEFLATED) as archive:
+                for relative_path in self.files:
+                    archive.writestr(
+                        f"{root_name}/{relative_path}", self.get_bytes(relative_path)
+                    )
+        elif archive_path.name.endswith((".tar.gz", ".tgz")):
+            with tarfile.open(archive_path, "w:gz") as archive:
+                for relative_path in self.files:
+                    content = self.get_bytes(relative_path)
+                    info = tarfile.TarInfo(f"{root_name}/{relative_path}")
+                    info.size = len(content)
+                    info.mtime = modified_time
+                    info.mode = 0o644
+                    archive.addfile(info, io.BytesIO(content))
+        else:
+            raise click.ClickException(
+                click.style(
+                    f"Unsupported archive {archive_path.name}, "
+                    f"expected one of {', '.join(ARCHIVE_SUFFIXES)}",
+                    fg="red",
+                )
+            )
+
+    def listing(self):
+        """Returns the lines of a dry run listing, the size and path of each file."""
+        lines = [
+            f"{len(self.get_bytes(relative_path)):>8}  {relative_path}"
+            for relative_path in sorted(self.files)
+        ]
+        total_size = sum(len(self.get_bytes(path)) for path in self.files)
+        lines.append(f"{total_size:>8}  total, {len(self.files)} files")
+        return lines
+
+
+def delete_files(root_path: pathlib.Path, relative_paths):
+    """
+    Deletes the given files under root_path, along with the folders they
+    leave empty.
+    """
+    root_path = pathlib.Path(root_path)
+    for relative_path in relative_paths:
+        file_path = root_path / relative_path
+        file_path.unlink()
+        folder_path = file_path.parent
+        while folder_path != root_path and not any(folder_path.iterdir()):
+            folder_path.rmdir()
+            folder_path = folder_path.parent
+
+
+def get_umask():
+    umask = os.umask(0)
+    os.umask(umask)
+    return umask
@@ -0,0 +1,72 @@
+"""Pagination of the generated viewsets.
+
+The compose file sets the pagination of the whole project and models can set
+their own, or turn it off with false. Both are resolved here into the base
+class and the attributes of the pagination classes rendered into the
+generated ``<project>/pagination.py`` and ``views.py``.
+"""
+
+PAGINATION_STYLES = ("page_number", "limit_offset", "cursor")
+
+# How the paginated list endpoints count their rows: COUNT(*), the database
+# estimate of large tables, or not at all
+PAGINATION_COUNTS = ("exact", "estimate", "none")
+
+DEFAULT_PAGINATION = {
+    "style": "page_number",
+    "page_size": 100,
+    "count": "exact",
+    "ordering": "-pk",
+}
+
+STYLE_CLASS_NAMES = {
+    "page_number": "PageNumberPagination",
+    "limit_offset": "LimitOffsetPagination",
+}
+
+COUNT_CLASS_PREFIXES = {"exact": "", "estimate": "Estimated", "none": "Countless"}
+
+
+def resolve_pagination(pagination: dict, default: dict = None):
+    """
+    Returns pagination completed with the project's default pagination and
+    DEFAULT_PAGINATION, along with the class_name of its base class in the
+    generated pagination.py. Cursor pagination never counts.
+    """
+    resolved = {**DEFAULT_PAGINATION, **(default or {}), **pagination}
+    if resolved["style"] == "cursor":
+        resolved["class_name"] = "CursorPagination"
+    else:
+        resolved["class_name"] = (
+            COUNT_CLASS_PREFIXES[resolved["count"]]
+            + STYLE_CLASS_NAMES[resolved["style"]]
+        )
+    return resolved
+
+
+def get_model_pagination(model: dict, default: dict = None):
+    """
+    Returns the (paginated, pagination) of a model: whether its viewset is
+    paginated at all, and its own resolved pagination or None if it uses
+    the project's one.
+    """
+    pagination = model.get("pagination")
+    if pagination is False:
+        return False, None
+    if pagination is None:
+        return True, None
+    return True, resolve_pagination(pagination, default)
+
+
+def has_pagination(compose_content: dict):
+    """Returns whether the project or any of its models sets a pagination."""
+    models = [
+        model
+        for app_with_model in compose_content["app_with_model"]
+        for model in app_with_model.get("models") or []
+    ]
+    if compose_content.get("auth_app") is not None:
+        models.append(compose_content["auth_app"])
+    return compose_content.get("pagination") is not None or any(
+        isinstance(model.get("pagination"), dict) for model in models
+    )
@@ -0,0 +1,87 @@
+"""Parsing of the compose files.
+
+The format of a compose file is detected from its extension. YAML files
+are parsed with the libyaml C loader when PyYAML was built with it. JSON
+files are parsed with orjson or ujson when one of them is installed, with
+the standard library json module otherwise. Only the safe subset of YAML is
+supported, compose files are plain data.
+"""
+import json
+import pathlib
+
+import click
+
+from drf_compose import timing
+
+# Compose files with these suffixes are parsed as YAML, any other file as JSON
+YAML_FILE_SUFFIXES = (".yaml", ".yml")
+
+# Optional JSON parsers, the first one installed is used
+JSON_BACKENDS = ("orjson", "ujson")
+
+_json_backend = None
+
+
+def get_format(source: pathlib.Path):
+    """Returns the format of the source compose file, 'yaml' or 'json'."""
+    return "yaml" if source.suffix.lower() in YAML_FILE_SUFFIXES else "json"
+
+
+def get_json_backend():
+    """Returns the (name, loads) of the fastest JSON parser installed."""
+    global _json_backend
+    if _json_backend is None:
+        import importlib
+
+        for name in JSON_BACKENDS:
+            try:
+                module = importlib.import_module(name)
+            except ImportError:
+                continue
+            _json_backend = name, module.loads
+            break
+        else:
+            _json_backend = "json", json.loads
+    return _json_backend
+
+
+def get_yaml_loader():
+    """Returns the (name, loader class) of the fastest safe YAML loader."""
+    import yaml
+
+    if hasattr(yaml, "CSafeLoader"):
+        return "libyaml", yaml.CSafeLoader
+    return "pyyaml", yaml.SafeLoader
+
+
+def get_parser(format: str):
+    """Returns the (backend name, parse function) of the compose file format."""
+    if format == "yaml":
+        import yaml
+
+        name, loader = get_yaml_loader()
+        return name, lambda content: yaml.load(content, Loader=loader)
+    # orjson and ujson parse bytes directly, so does json since Python 3.6
+    return get_json_backend()
+
+
+def parse_compose(content: bytes, format: str = "json"):
+    """Parses the content of a compose file of the given format."""
+    return get_parser(format)[1](content)
+
+
+def load_compose_file(source: pathlib.Path, format: str = None):
+    """
+    Reads and parses the source compose file, its format is detected from
+    its extension unless given. Raises ClickException if it can not be parsed.
+    """
+    source = pathlib.Path(source)
+    name, parse = get_parser(format or get_format(source))
+    with timing.phase("parse", name):
+        content = source.read_bytes()
+        try:
+            return parse(content)
+        except Exception as error:
+            raise click.ClickException(
+                click.style(f"Error parsing compose file {source}: {error}", fg="red")
+            )
@@ -0,0 +1,414 @@
+"""Rendering of the project template files.
+
+Template files are written in the Django template language. They are
+rendered either by a dedicated Django template engine (the default) or by
+Jinja2, which runs the same template files translated to its own syntax,
+with the same filters.
+
+Both engines compile each template only once per process and keep it in
+memory. Optionally, compiled templates are also written to an on-disk cache
+keyed by the template's content hash, so later runs skip parsing completely.
+The cached templates render the generated code, the cache directory must only
+be writable by users trusted with it. Jinja2 runs its cached bytecode as is, so
+its cache is only used in a directory private to the current user.
+"""
+import copyreg
+import functools
+import hashlib
+import importlib
+import os
+import pathlib
+import pickle
+import re
+import stat
+import tempfile
+
+from drf_compose import django_core
+
+TEMPLATES_DIR = (
+    pathlib.Path(__file__).resolve().parent / "django_template_app" / "templates"
+)
+
+# Template tag libraries made available to {% load %} in the template files
+TEMPLATE_LIBRARIES = {
+    "myfilters": "drf_compose.django_template_app.templatetags.myfilters",
+}
+
+
+class TemplateRenderer:
+    """
+    Renders the template files found in TEMPLATES_DIR.
+
+    If cache_dir is given, compiled templates are loaded from and saved to it.
+    """
+
+    name = "django"
+
+    def __init__(self, cache_dir: pathlib.Path = None):
+        self.cache_dir = pathlib.Path(cache_dir) if cache_dir else None
+        self.templates = {}
+        self._engine = None
+
+    @property
+    def engine(self):
+        if self._engine is None:
+            # Django is only set up when the first template is compiled
+            django_core.setup()
+            from django.template import Engine
+
+            self._engine = Engine(
+                dirs=[str(TEMPLATES_DIR)],
+                libraries=TEMPLATE_LIBRARIES,
+                autoescape=False,
+            )
+        return self._engine
+
+    def render(self, template_name: str, context: dict):
+        """Renders the template_name template with context and returns the string."""
+        from django.template import Context
+
+        template = self.get_template(template_name)
+        return template.render(Context(context, autoescape=self.engine.autoescape))
+
+    def get_template(self, template_name: str):
+        """Returns the compiled template_name template, compiling it on first use."""
+        template = self.templates.get(template_name)
+        if template is None:
+            source = (TEMPLATES_DIR / template_name).read_text()
+            template = self.load_cached_template(template_name, source)
+            if template is None:
+                template = self.compile_template(template_name, source)
+                self.save_cached_template(template, source)
+            self.templates[template_name] = template
+        return template
+
+    def compile_all(self):
+        """Compiles every template file ahead of its first render."""
+        for template_path in sorted(TEMPLATES_DIR.rglob("*-tpl")):
+            self.get_template(template_path.relative_to(TEMPLATES_DIR).as_posix())
+
+    def compile_template(self, template_name: str, source: str):
+        from django.template import Origin, Template
+
+        origin = Origin(
+            name=str(TEMPLATES_DIR / template_name), template_name=template_name
+        )
+        return Template(source, origin=origin, name=template_name, engine=self.engine)
+
+    def get_cache_path(self, source: str):
+        """Returns the cache file path of a template given its source."""
+        import django
+
+        # The pickled node list depends on the Django version that compiled it
+        key = hashlib.sha256(f"{django.__version__}\0{source}".encode()).hexdigest()
+        return self.cache_dir / f"{key}.pickle"
+
+    def load_cached_template(self, template_name: str, source: str):
+        """
+        Returns the template from the on-disk cache, or None if there is no
+        cache, the template is not cached yet or the cached entry is unusable.
+        """
+        if self.cache_dir is None:
+            return None
+        from django.template import Template
+
+        try:
+            with self.get_cache_path(source).open("rb") as cache_file:
+                name, origin, nodelist = TemplateUnpickler(
+                    cache_file, self.engine
+                ).load()
+        except Exception:
+            return None
+
+        # Rebuild the template around the cached node list, skipping Template.__init__
+        # as it would compile the source all over again
+        template = Template.__new__(Template)
+        template.name = name
+        template.origin = origin
+        template.engine = self.engine
+        template.source = source
+        template.nodelist = nodelist
+        return template
+
+    def save_cached_template(self, template, source: str):
+        """
+        Writes the compiled template to the on-disk cache. Failing to write
+        the cache is not an error, the template is compiled again next time.
+        """
+        if self.cache_dir is None:
+            return
+        temporary_path = None
+        try:
+            self.cache_dir.mkdir(parents=True, exist_ok=True)
+            # Write to a temporary file first so concurrent runs never read a partial entry
+            with tempfile.NamedTemporaryFile(
+                dir=self.cache_dir, suffix=".tmp", delete=False
+            ) as cache_file:
+                temporary_path = cache_file.name
+                pickler = pickle.Pickler(cache_file, pickle.HIGHEST_PROTOCOL)
+                pickler.dispatch_table = get_pickle_dispatch_table()
+                pickler.dump((template.name, template.origin, template.nodelist))
+            os.replace(temporary_path, self.get_cache_path(source))
+        except Exception:
+            if temporary_path is not None and os.path.exists(temporary_path):
+                os.remove(temporary_path)
+
+
+class TemplateUnpickler(pickle.Unpickler):
+    """
+    Unpickles the cached templates of engine. Only the classes of compiled
+    templates and the filters of engine are loaded, an entry referring to
+    anything else is unusable rather than run.
+    """
+
+    def __init__(self, file, engine):
+        super().__init__(file)
+        self.allowed_globals = get_template_globals(engine)
+
+    def find_class(self, module: str, name: str):
+        if (module, name) not in self.allowed_globals:
+            raise pickle.UnpicklingError(f"{module}.{name} is not part of a template")
+        return super().find_class(module, name)
+
+
+@functools.lru_cache(maxsize=None)
+def get_template_globals(engine):
+    """
+    Returns the (module, name) of the classes and functions a compiled
+    template of engine refers to: the nodes of the Django template modules and
+    of the template tag libraries, the objects the nodes hold, and the filters.
+    """
+    from django.template import Node, base, defaulttags
+    from django.utils import safestring
+
+    node_modules = ("django.template.",) + tuple(
+        f"{library}." for library in TEMPLATE_LIBRARIES.values()
+    )
+    objects = [
+        base.NodeList,
+        base.FilterExpression,
+        base.Variable,
+        base.Token,
+        base.TokenType,
+        base.Origin,
+        defaulttags.TemplateLiteral,
+        safestring.SafeString,
+        rebuild_operator,
+    ]
+    node_classes = [Node]
+    while node_classes:
+        node_class = node_classes.pop()
+        if f"{node_class.__module__}.".startswith(node_modules):
+            objects.append(node_class)
+        node_classes.extend(node_class.__subclasses__())
+    for library in [*engine.template_builtins, *engine.template_libraries.values()]:
+        objects.extend(library.filters.values())
+    return {(obj.__module__, obj.__qualname__) for obj in objects}
+
+
+def get_pickle_dispatch_table():
+    """
+    Returns a pickle dispatch table able to pickle compiled {% if %} conditions,
+    which are instances of operator classes local to django.template.smartif.
+    """
+    from django.template import smartif
+
+    dispatch_table = copyreg.dispatch_table.copy()
+    for operator_class in smartif.OPERATORS.values():
+        dispatch_table[operator_class] = reduce_operator
+    return dispatch_table
+
+
+def reduce_operator(operator):
+    return rebuild_operator, (operator.id, operator.__dict__)
+
+
+def rebuild_operator(operator_id: str, state: dict):
+    from django.template import smartif
+
+    operator = smartif.OPERATORS[operator_id]()
+    operator.__dict__.update(state)
+    return operator
+
+
+# Template tag libraries loaded with {% load %}, the Jinja2 engine translates away
+LOAD_TAG_RE = re.compile(r"{%\s*load\s+[\w\s.]+%}")
+
+# Template tags and variables, whose filter arguments are translated
+TAG_RE = re.compile(r"{{.*?}}|{%.*?%}", re.DOTALL)
+
+# A filter with an argument, e.g |clean_option:option or |default:"none"
+FILTER_ARGUMENT_RE = re.compile(r"\|\s*(\w+)\s*:\s*(\"[^\"]*\"|'[^']*'|[\w.]+)")
+
+
+def translate_template(source: str):
+    """
+    Translates a template written in the subset of the Django template
+    language used by the template files to Jinja2. {% load %} tags are
+    dropped as the filters are registered globally, and filter arguments
+    become calls, e.g ``value|clean_option:option`` becomes
+    ``value|clean_option(option)``.
+
+    Attribute lookups, e.g ``field.options.items``, need no translation, the
+    Jinja2 environment resolves them the way Django does.
+    """
+    source = LOAD_TAG_RE.sub("", source)
+    return TAG_RE.sub(
+        lambda match: FILTER_ARGUMENT_RE.sub(r"|\1(\2)", match.group(0)), source
+    )
+
+
+class Jinja2Renderer:
+    """
+    Renders the template files found in TEMPLATES_DIR with Jinja2.
+
+    If cache_dir is given, the compiled bytecode of the templates is loaded
+    from and saved to it, provided check_bytecode_cache_dir accepts it.
+    """
+
+    name = "jinja2"
+
+    def __init__(self, cache_dir: pathlib.Path = None):
+        self.cache_dir = pathlib.Path(cache_dir) if cache_dir else None
+        self.templates = {}
+        self._environment = None
+
+    @property
+    def environment(self):
+        if self._environment is None:
+            self._environment = create_jinja2_environment(self.cache_dir)
+        return self._environment
+
+    def render(self, template_name: str, context: dict):
+        """Renders the template_name template with context and returns the string."""
+        return self.get_template(template_name).render(context)
+
+    def get_template(self, template_name: str):
+        """Returns the compiled template_name template, compiling it on first use."""
+        template = self.templates.get(template_name)
+        if template is None:
+            template = self.environment.get_template(template_name)
+            self.templates[template_name] = template
+        return template
+
+    def compile_all(self):
+        """Compiles every template file ahead of its first render."""
+        for template_path in sorted(TEMPLATES_DIR.rglob("*-tpl")):
+            self.get_template(template_path.relative_to(TEMPLATES_DIR).as_posix())
+
+
+def check_bytecode_cache_dir(cache_dir: pathlib.Path):
+    """
+    Returns why cache_dir can not hold the bytecode Jinja2 runs, None if it
+    can. The directory is created private to the current user if missing, an
+    existing one must be owned by the user and not writable by other users.
+    """
+    try:
+        cache_dir.mkdir(mode=stat.S_IRWXU, parents=True, exist_ok=True)
+        return get_unsafe_reason(cache_dir)
+    except OSError as error:
+        return str(error)
+
+
+def get_unsafe_reason(path: pathlib.Path):
+    """Returns why other users may write to path, None if they may not."""
+    if not hasattr(os, "getuid"):
+        return "its owner can not be checked on this platform"
+    path_stat = path.stat()
+    if path_stat.st_uid != os.getuid():
+        return "it is owned by another user"
+    if path_stat.st_mode & (stat.S_IWGRP | stat.S_IWOTH):
+        return "it is writable by other users"
+    return None
+
+
+def create_jinja2_environment(cache_dir: pathlib.Path = None):
+    """
+    Returns a Jinja2 environment rendering the translated template files the
+    way the Django engine renders them: same filters, same whitespace, Django
+    attribute lookups and silent undefined values.
+    """
+    import jinja2
+    from django.template import defaultfilters
+
+    class DjangoUndefined(jinja2.ChainableUndefined):
+        """
+        A missing value, behaving like one in a Django template: it renders as
+        an empty string, is falsy, iterates as an empty sequence, and looking
+        up or calling anything on it returns it again.
+        """
+
+        def __call__(self, *args, **kwargs):
+            return self
+
+    class DjangoEnvironment(jinja2.Environment):
+        def getattr(self, obj, attribute):
+            # Django resolves a.b as a["b"] first, then as an attribute, and calls
+            # callables, so {% for key, value in options.items %} iterates a dict
+            try:
+                value = obj[attribute]
+            except (TypeError, LookupError, AttributeError):
+                value = super().getattr(obj, attribute)
+            if callable(value) and not isinstance(value, jinja2.Undefined):
+                value = value()
+            return value
+
+    class PrivateBytecodeCache(jinja2.FileSystemBytecodeCache):
+        def load_bytecode(self, bucket):
+            # A cache file other users may have written is compiled again rather than run
+            path = pathlib.Path(self._get_cache_filename(bucket))
+            try:
+                if get_unsafe_reason(path) is not None:
+                    return
+            except FileNotFoundError:
+                return
+            super().load_bytecode(bucket)
+
+    class TranslatingLoader(jinja2.FileSystemLoader):
+        def get_source(self, environment, template):
+            source, filename, uptodate = super().get_source(environment, template)
+            return translate_template(source), filename, uptodate
+
+    environment = DjangoEnvironment(
+        loader=TranslatingLoader(str(TEMPLATES_DIR)),
+        undefined=DjangoUndefined,
+        autoescape=False,
+        keep_trailing_newline=True,
+        bytecode_cache=(
+            PrivateBytecodeCache(str(cache_dir))
+            if cache_dir and check_bytecode_cache_dir(pathlib.Path(cache_dir)) is None
+            else None
+        ),
+    )
+    # Django's title differs from Jinja2's on identifiers such as app_name
+    environment.filters["title"] = defaultfilters.title
+    environment.filters["lower"] = defaultfilters.lower
+    for library in TEMPLATE_LIBRARIES.values():
+        environment.filters.update(importlib.import_module(library).register.filters)
+    return environment
+
+
+# Rendering engines selectable with set_engine
+ENGINES = {
+    "django": TemplateRenderer,
+    "jinja2": Jinja2Renderer,
+}
+
+# Renderer shared by the whole process, so each template is compiled only once
+renderer = TemplateRenderer()
+
+
+def set_engine(engine: str):
+    """
+    Makes the process wide renderer use the given engine, one of ENGINES.
+    The template cache directory of the current renderer is kept.
+    """
+    global renderer
+    if engine != renderer.name:
+        renderer = ENGINES[engine](renderer.cache_dir)
+    return renderer
+
+
+def render_to_string(template_name: str, context: dict):
+    """Renders template_name with context using the process wide renderer."""
+    return renderer.render(template_name, context)
@@ -0,0 +1,137 @@
+"""In-process project and application scaffolding.
+
+This renders the same skeletons as ``django-admin startproject`` and
+``django-admin startapp`` without spawning a new interpreter for each call.
+Django's own ``project_template`` and ``app_template`` directories are used
+as the source, and every template is compiled only once per process.
+
+Django is imported lazily, see drf_compose.django_core.setup.
+"""
+import os
+import pathlib
+
+import click
+
+from drf_compose import django_core
+from drf_compose.output import OutputTree
+
+# Suffixes rewritten when a template file is copied to its destination,
+# mirrors django.core.management.templates.TemplateCommand
+REWRITE_TEMPLATE_SUFFIXES = ((".py-tpl", ".py"),)
+
+# Compiled skeletons keyed by the template subdirectory name,
+# e.g. "project_template" or "app_template"
+_skeletons = {}
+
+
+def start_project(project_name: str):
+    """Returns the OutputTree of the ``startproject`` skeleton of project_name."""
+    from django.core.management.utils import get_random_secret_key
+
+    context = {
+        "project_name": project_name,
+        "camel_case_project_name": to_camel_case(project_name),
+        "secret_key": get_random_secret_key(),
+    }
+    return render_skeleton("project", project_name, context)
+
+
+def start_app(app_name: str):
+    """Returns the OutputTree of the ``startapp`` skeleton of app_name."""
+    context = {
+        "app_name": app_name,
+        "camel_case_app_name": to_camel_case(app_name),
+    }
+    return render_skeleton("app", app_name, context)
+
+
+def render_skeleton(app_or_project: str, name: str, context: dict):
+    """
+    Renders the app or project skeleton and returns it as an OutputTree,
+    with paths relative to the app or project folder.
+    """
+    django_core.setup()
+    import django
+    from django.template import Context
+    from django.utils.version import get_docs_version
+
+    if not name.isidentifier():
+        raise click.ClickException(
+            click.style(
+                f"'{name}' is not a valid {app_or_project} name. "
+                "Please make sure the name is a valid identifier.",
+                fg="red",
+            )
+        )
+
+    base_name = f"{app_or_project}_name"
+    render_context = Context(
+        {
+            **context,
+            "docs_version": get_docs_version(),
+            "django_version": django.__version__,
+        },
+        autoescape=False,
+    )
+
+    tree = OutputTree()
+    for relative_path, template, source_path in get_skeleton(app_or_project):
+        dest_path = relative_path.replace(base_name, name)
+        if template is None:
+            tree[dest_path] = pathlib.Path(source_path).read_bytes()
+        else:
+            tree[dest_path] = template.render(render_context)
+    return tree
+
+
+def get_skeleton(app_or_project: str):
+    """
+    Returns the (relative path, compiled template, source path) entries
+    of the app or project skeleton, compiling them on first use.
+
+    Only Python files are rendered, every other file is copied as is and
+    has None in place of its compiled template.
+    """
+    base_subdir = f"{app_or_project}_template"
+    if base_subdir in _skeletons:
+        return _skeletons[base_subdir]
+
+    import django
+    from django.template import Engine
+
+    template_dir = os.path.join(django.__path__[0], "conf", base_subdir)
+    engine = Engine()
+    skeleton = []
+    for root, dirs, files in os.walk(template_dir):
+        dirs[:] = [
+            dirname
+            for dirname in dirs
+            if not dirname.startswith(".") and dirname != "__pycache__"
+        ]
+        for filename in sorted(files):
+            if filename.endswith((".pyo", ".pyc", ".py.class")):
+                # Ignore some files as they cause various breakages.
+                continue
+            source_path = os.path.join(root, filename)
+            relative_path = pathlib.Path(
+                os.path.relpath(source_path, template_dir)
+            ).as_posix()
+            for old_suffix, new_suffix in REWRITE_TEMPLATE_SUFFIXES:
+                if relative_path.endswith(old_suffix):
+                    relative_path = relative_path[: -len(old_suffix)] + new_suffix
+                    break  # Only rewrite once
+
+            template = None
+            if relative_path.endswith(".py"):
+                template = engine.from_string(
+                    pathlib.Path(source_path).read_text(encoding="utf-8")
+                )
+            skeleton.append((relative_path, template, source_path))
+
+    _skeletons[base_subdir] = skeleton
+    return skeleton
+
+
+def to_camel_case(name: str):
+    """Returns name in CamelCase the same way django-admin does."""
+    return "".join(x for x in name.title() if x != "_")
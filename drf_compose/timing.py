@@ -0,0 +1,160 @@
+"""Timing of the generation phases.
+
+The generation code marks its phases (parse, validate, scaffold, render,
+format, write...) with ``timing.phase(name, detail)``, where detail tells
+apart the runs of a phase, e.g the template being rendered. The phases are
+only measured while a Timings object is recording, otherwise marking a phase
+costs a function call.
+
+Worker processes record into their own Timings, which are sent back and
+merged into the Timings of the main process.
+"""
+import contextlib
+import json
+import os
+import threading
+import time
+
+# Timings the phases of each thread are currently recorded into, see recording
+_state = threading.local()
+
+
+class Timings:
+    """
+    Seconds spent in each phase, in the order the phases first ran, the
+    seconds spent in each detail of a phase and the timeline of every run of
+    a phase as (phase, detail, start time, seconds, process id) events.
+    """
+
+    def __init__(self):
+        self.phases = {}
+        self.details = {}
+        self.events = []
+
+    @contextlib.contextmanager
+    def phase(self, name: str, detail: str = None):
+        start_time = time.perf_counter()
+        try:
+            yield
+        finally:
+            seconds = time.perf_counter() - start_time
+            self.add(name, seconds, detail)
+            self.events.append((name, detail, start_time, seconds, os.getpid()))
+
+    def add(self, name: str, seconds: float, detail: str = None):
+        self.phases[name] = self.phases.get(name, 0.0) + seconds
+        if detail is not None:
+            phase_details = self.details.setdefault(name, {})
+            phase_details[detail] = phase_details.get(detail, 0.0) + seconds
+
+    def merge(self, other: "Timings"):
+        for name, seconds in other.phases.items():
+            self.phases[name] = self.phases.get(name, 0.0) + seconds
+        for name, other_details in other.details.items():
+            phase_details = self.details.setdefault(name, {})
+            for detail, seconds in other_details.items():
+                phase_details[detail] = phase_details.get(detail, 0.0) + seconds
+        self.events += other.events
+
+    def as_dict(self):
+        return dict(self.phases)
+
+    def slowest(self, name: str, count: int = 5):
+        """Returns the count slowest (detail, seconds) of the name phase."""
+        return sorted(
+            self.details.get(name, {}).items(), key=lambda item: item[1], reverse=True
+        )[:count]
+
+    def report(self, count: int = 5):
+        """
+        Returns the lines of the timings report, the seconds spent in each
+        phase followed by the count slowest sections and templates.
+        """
+        lines = ["Timings:"]
+        name_width = max(map(len, self.phases), default=0)
+        for name, seconds in self.phases.items():
+            if name == "section":
+                continue
+            line = f"  {name:<{name_width}}  {seconds:8.3f}s"
+            if name == "parse" and self.details.get(name):
+                # Tell which parser was used, e.g libyaml or orjson
+                line += f"  ({', '.join(self.details[name])})"
+            lines.append(line)
+        for title, name in (
+            ("Slowest sections:", "section"),
+            ("Slowest templates:", "render"),
+        ):
+            slowest = self.slowest(name, count)
+            if slowest:
+                lines.append(title)
+                detail_width = max(len(detail) for detail, _ in slowest)
+                lines += [
+                    f"  {detail:<{detail_width}}  {seconds:8.3f}s"
+                    for detail, seconds in slowest
+                ]
+        return lines
+
+    def chrome_trace(self):
+        """
+        Returns the events in the Chrome trace event format, which can be
+        opened in chrome://tracing or https://ui.perfetto.dev.
+        """
+        origin = min((event[2] for event in self.events), default=0.0)
+        trace_events = []
+        for name, detail, start_time, seconds, pid in self.events:
+            trace_events.append(
+                {
+                    "name": f"{name} {detail}" if detail else name,
+                    "cat": name,
+                    "ph": "X",
+                    "ts": (start_time - origin) * 1e6,
+                    "dur": seconds * 1e6,
+                    "pid": pid,
+                    "tid": pid,
+                }
+            )
+        return {"traceEvents": trace_events, "displayTimeUnit": "ms"}
+
+    def write_trace(self, trace_path):
+        with open(trace_path, "w") as trace_file:
+            json.dump(self.chrome_trace(), trace_file)
+
+
+@contextlib.contextmanager
+def recording(timings: Timings):
+    """Records the phases run within the block into timings."""
+    previous_timings = get_recording()
+    _state.timings = timings
+    try:
+        yield timings
+    finally:
+        _state.timings = previous_timings
+
+
+def get_recording():
+    """Returns the Timings the current thread records into, if any."""
+    return getattr(_state, "timings", None)
+
+
+def is_recording():
+    return get_recording() is not None
+
+
+def merge(timings: Timings):
+    """Merges timings, e.g recorded by a worker process, into the recording Timings."""
+    active_timings = get_recording()
+    if active_timings is not None:
+        active_timings.merge(timings)
+
+
+@contextlib.contextmanager
+def _not_recording():
+    yield
+
+
+def phase(name: str, detail: str = None):
+    """Times the block as the name phase of the recording Timings, if any."""
+    active_timings = get_recording()
+    if active_timings is None:
+        return _not_recording()
+    return active_timings.phase(name, detail)
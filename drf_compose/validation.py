@@ -0,0 +1,510 @@
+"""Validation of the compose file content.
+
+The compose schema is built once at import time. Validating a compose
+document is a single pass over it which collects every error together with
+its path, e.g ``app_with_model[39].models[2].fields[0].type``, so all the
+mistakes in a compose file are reported at once and before anything is
+written to disk.
+"""
+import click
+
+from drf_compose import caching, database, pagination
+
+TYPE_NAMES = {
+    bool: "a boolean",
+    dict: "an object",
+    int: "an integer",
+    list: "a list",
+    str: "a string",
+}
+
+# The foreign key and one to one field types, whose column can be named too
+RELATION_FIELD_TYPES = ("fk", "o2o", "onetoonefield")
+
+# The fields the auth app model inherits from AbstractUser
+ABSTRACT_USER_FIELDS = (
+    "password",
+    "last_login",
+    "is_superuser",
+    "username",
+    "first_name",
+    "last_name",
+    "email",
+    "is_staff",
+    "is_active",
+    "date_joined",
+    "groups",
+    "user_permissions",
+)
+
+
+class ComposeValidationError(click.ClickException):
+    """Raised with every error found in a compose document."""
+
+    def __init__(self, errors: list):
+        self.errors = errors
+        super().__init__(
+            click.style(
+                "Invalid compose file:\n" + "\n".join(f"  {error}" for error in errors),
+                fg="red",
+            )
+        )
+
+
+def format_error(path: str, message: str):
+    return f"{path}: {message}" if path else message
+
+
+class Schema:
+    """Base class of the schema nodes."""
+
+    def validate(self, value, path: str, errors: list):
+        raise NotImplementedError
+
+
+class OfType(Schema):
+    """Accepts values of the given types."""
+
+    def __init__(self, *types):
+        self.types = types
+
+    def validate(self, value, path, errors):
+        # bool is a subclass of int, so the type is compared exactly
+        if type(value) not in self.types:
+            expected = " or ".join(TYPE_NAMES.get(t, t.__name__) for t in self.types)
+            got = TYPE_NAMES.get(type(value), type(value).__name__)
+            errors.append(format_error(path, f"expected {expected}, got {got}"))
+            return False
+        return True
+
+
+class Identifier(OfType):
+    """Accepts strings which are valid Python identifiers, e.g app names."""
+
+    def __init__(self):
+        super().__init__(str)
+
+    def validate(self, value, path, errors):
+        if not super().validate(value, path, errors):
+            return False
+        if not value.isidentifier():
+            errors.append(format_error(path, f"'{value}' is not a valid identifier"))
+            return False
+        return True
+
+
+class Choice(OfType):
+    """Accepts strings which are one of the given choices."""
+
+    def __init__(self, *choices):
+        super().__init__(str)
+        self.choices = choices
+
+    def validate(self, value, path, errors):
+        if not super().validate(value, path, errors):
+            return False
+        if value not in self.choices:
+            expected = ", ".join(f"'{choice}'" for choice in self.choices)
+            errors.append(format_error(path, f"'{value}' is not one of {expected}"))
+            return False
+        return True
+
+
+class PositiveInteger(OfType):
+    """Accepts integers greater than zero, e.g page sizes."""
+
+    def __init__(self):
+        super().__init__(int)
+
+    def validate(self, value, path, errors):
+        if not super().validate(value, path, errors):
+            return False
+        if value < 1:
+            errors.append(
+                format_error(path, f"expected a positive integer, got {value}")
+            )
+            return False
+        return True
+
+
+class NonNegativeInteger(OfType):
+    """Accepts integers from zero, e.g durations where zero turns a setting off."""
+
+    def __init__(self):
+        super().__init__(int)
+
+    def validate(self, value, path, errors):
+        if not super().validate(value, path, errors):
+            return False
+        if value < 0:
+            errors.append(
+                format_error(path, f"expected a non-negative integer, got {value}")
+            )
+            return False
+        return True
+
+
+class FalseOr(Schema):
+    """Accepts false, which turns a setting off, or values matching schema."""
+
+    def __init__(self, schema: Schema):
+        self.schema = schema
+
+    def validate(self, value, path, errors):
+        return value is False or self.schema.validate(value, path, errors)
+
+
+class BooleanOr(Schema):
+    """Accepts true or false, which turn a setting on or off, or values matching schema."""
+
+    def __init__(self, schema: Schema):
+        self.schema = schema
+
+    def validate(self, value, path, errors):
+        return isinstance(value, bool) or self.schema.validate(value, path, errors)
+
+
+class ListOf(OfType):
+    """Accepts lists whose items all match the item schema."""
+
+    def __init__(self, item: Schema):
+        super().__init__(list)
+        self.item = item
+
+    def validate(self, value, path, errors):
+        if not super().validate(value, path, errors):
+            return False
+        valid = True
+        for index, item in enumerate(value):
+            valid = self.item.validate(item, f"{path}[{index}]", errors) and valid
+        return valid
+
+
+class Key:
+    """A key of an Object, a missing required key is reported with message."""
+
+    def __init__(self, schema: Schema, required: bool = False, message: str = None):
+        self.schema = schema
+        self.required = required
+        self.message = message
+
+
+class Object(OfType):
+    """
+    Accepts objects whose keys match their schema. Keys with a null value
+    are considered missing, unknown keys are accepted as is.
+    """
+
+    def __init__(self, **keys: Key):
+        super().__init__(dict)
+        self.keys = keys
+
+    def validate(self, value, path, errors):
+        if not super().validate(value, path, errors):
+            return False
+        valid = True
+        for name, key in self.keys.items():
+            key_path = f"{path}.{name}" if path else name
+            if value.get(name) is None:
+                if key.required:
+                    message = key.message or f"{name} is required"
+                    errors.append(format_error(key_path, message))
+                    valid = False
+            else:
+                valid = key.schema.validate(value[name], key_path, errors) and valid
+        return valid
+
+
+class Constraint(Object):
+    """Accepts a check constraint, with a check, or a unique one, with fields."""
+
+    def validate(self, value, path, errors):
+        if not super().validate(value, path, errors):
+            return False
+        if (value.get("check") is None) == (value.get("fields") is None):
+            errors.append(format_error(path, "expected either check or fields"))
+            return False
+        return True
+
+
+class Model(Object):
+    """
+    Accepts a model whose meta indexes and constraints only name its own
+    fields, base_fields being the fields the model inherits.
+    """
+
+    def __init__(self, base_fields=(), **keys):
+        super().__init__(**keys)
+        self.base_fields = base_fields
+
+    def validate(self, value, path, errors):
+        if not super().validate(value, path, errors):
+            return False
+        field_names = {"id", "pk", *self.base_fields}
+        for field in value.get("fields") or []:
+            field_names.add(field["name"])
+            if field["type"].lower() in RELATION_FIELD_TYPES:
+                field_names.add(f"{field['name']}_id")
+
+        meta = value.get("meta") or {}
+        references = []
+        for key in ("indexes", "constraints"):
+            for index, item in enumerate(meta.get(key) or []):
+                item_path = f"{path}.meta.{key}[{index}]"
+                for list_key in ("fields", "include"):
+                    references += [
+                        (f"{item_path}.{list_key}[{name_index}]", name.lstrip("-"))
+                        for name_index, name in enumerate(item.get(list_key) or [])
+                    ]
+                for lookups_key in ("condition", "check"):
+                    references += [
+                        (f"{item_path}.{lookups_key}", lookup.split("__")[0])
+                        for lookup in item.get(lookups_key) or {}
+                    ]
+        for index, names in enumerate(meta.get("unique_together") or []):
+            references += [
+                (f"{path}.meta.unique_together[{index}][{name_index}]", name)
+                for name_index, name in enumerate(names)
+            ]
+
+        valid = True
+        for reference_path, name in references:
+            if name not in field_names:
+                errors.append(format_error(reference_path, f"unknown field '{name}'"))
+                valid = False
+        return valid
+
+
+class Database(Object):
+    """Accepts a database whose pool and statement timeout its engine supports."""
+
+    def validate(self, value, path, errors):
+        if not super().validate(value, path, errors):
+            return False
+        engine = value.get("engine") or database.DEFAULT_DATABASE["engine"]
+        valid = True
+        pooled = isinstance(value.get("pool"), dict)
+        if pooled and engine not in database.POOLED_ENGINES:
+            errors.append(
+                format_error(f"{path}.pool", f"the {engine} engine can not be pooled")
+            )
+            valid = False
+        if value.get("statement_timeout") is not None and engine == "sqlite3":
+            errors.append(
+                format_error(
+                    f"{path}.statement_timeout",
+                    "the sqlite3 engine has no statement timeout",
+                )
+            )
+            valid = False
+        return valid
+
+
+FIELD_SCHEMA = Object(
+    name=Key(Identifier(), required=True, message="field's name is required"),
+    type=Key(OfType(str), required=True, message="field's type is required"),
+    options=Key(OfType(dict)),
+)
+
+PAGINATION_SCHEMA = Object(
+    style=Key(Choice(*pagination.PAGINATION_STYLES)),
+    page_size=Key(PositiveInteger()),
+    max_page_size=Key(PositiveInteger()),
+    ordering=Key(OfType(str)),
+    count=Key(Choice(*pagination.PAGINATION_COUNTS)),
+)
+
+CACHE_SCHEMA = Object(
+    backend=Key(Choice(*caching.CACHE_BACKENDS)),
+    location=Key(OfType(str)),
+    timeout=Key(PositiveInteger()),
+)
+
+POOL_SCHEMA = Object(
+    size=Key(PositiveInteger()),
+    max_overflow=Key(NonNegativeInteger()),
+    recycle=Key(PositiveInteger()),
+    timeout=Key(PositiveInteger()),
+)
+
+REPLICA_SCHEMA = Object(
+    alias=Key(Identifier(), required=True, message="database alias is required"),
+    name=Key(OfType(str)),
+    host=Key(OfType(str)),
+    port=Key(PositiveInteger()),
+)
+
+ROUTED_DATABASE_SCHEMA = Object(
+    alias=Key(Identifier(), required=True, message="database alias is required"),
+    name=Key(OfType(str)),
+    host=Key(OfType(str)),
+    port=Key(PositiveInteger()),
+    replicas=Key(ListOf(REPLICA_SCHEMA)),
+)
+
+DATABASE_SCHEMA = Database(
+    engine=Key(Choice(*database.DATABASE_ENGINES)),
+    conn_max_age=Key(NonNegativeInteger()),
+    health_checks=Key(OfType(bool)),
+    pool=Key(FalseOr(POOL_SCHEMA)),
+    connect_timeout=Key(PositiveInteger()),
+    statement_timeout=Key(PositiveInteger()),
+    replicas=Key(ListOf(REPLICA_SCHEMA)),
+    databases=Key(ListOf(ROUTED_DATABASE_SCHEMA)),
+    sticky_seconds=Key(NonNegativeInteger()),
+)
+
+MODEL_CACHE_SCHEMA = Object(timeout=Key(PositiveInteger()))
+
+BULK_SCHEMA = Object(batch_size=Key(PositiveInteger()))
+
+INDEX_SCHEMA = Object(
+    fields=Key(ListOf(OfType(str)), required=True, message="index fields are required"),
+    name=Key(OfType(str)),
+    condition=Key(OfType(dict)),
+    include=Key(ListOf(OfType(str))),
+)
+
+CONSTRAINT_SCHEMA = Constraint(
+    name=Key(OfType(str), required=True, message="constraint name is required"),
+    fields=Key(ListOf(OfType(str))),
+    condition=Key(OfType(dict)),
+    check=Key(OfType(dict)),
+)
+
+META_SCHEMA = Object(
+    indexes=Key(ListOf(INDEX_SCHEMA)),
+    constraints=Key(ListOf(CONSTRAINT_SCHEMA)),
+    unique_together=Key(ListOf(ListOf(OfType(str)))),
+)
+
+MODEL_SCHEMA = Model(
+    name=Key(Identifier(), required=True, message="model's name is required"),
+    fields=Key(
+        ListOf(FIELD_SCHEMA),
+        required=True,
+        message="model's list of fields is required",
+    ),
+    meta=Key(META_SCHEMA),
+    use_uuid_as_key=Key(OfType(bool)),
+    str=Key(OfType(str)),
+    select_related=Key(ListOf(OfType(str))),
+    prefetch_related=Key(ListOf(OfType(str))),
+    pagination=Key(FalseOr(PAGINATION_SCHEMA)),
+    cache=Key(FalseOr(MODEL_CACHE_SCHEMA)),
+    auto_indexes=Key(OfType(bool)),
+    bulk=Key(BooleanOr(BULK_SCHEMA)),
+)
+
+APP_SCHEMA = Object(
+    app_name=Key(Identifier(), required=True),
+    models=Key(ListOf(MODEL_SCHEMA)),
+    database=Key(Identifier()),
+)
+
+AUTH_APP_SCHEMA = Model(
+    base_fields=ABSTRACT_USER_FIELDS,
+    app_name=Key(Identifier(), required=True, message="auth app_name is required"),
+    model_name=Key(Identifier(), required=True, message="auth model_name is required"),
+    username_field=Key(OfType(str)),
+    email_field=Key(OfType(str)),
+    required_fields=Key(ListOf(OfType(str))),
+    fields=Key(ListOf(FIELD_SCHEMA)),
+    meta=Key(META_SCHEMA),
+    use_uuid_as_key=Key(OfType(bool)),
+    str=Key(OfType(str)),
+    select_related=Key(ListOf(OfType(str))),
+    prefetch_related=Key(ListOf(OfType(str))),
+    pagination=Key(FalseOr(PAGINATION_SCHEMA)),
+    cache=Key(FalseOr(MODEL_CACHE_SCHEMA)),
+    auto_indexes=Key(OfType(bool)),
+)
+
+COMPOSE_SCHEMA = Object(
+    name=Key(Identifier(), required=True, message="project name is required"),
+    app_with_model=Key(ListOf(APP_SCHEMA), required=True),
+    auth_app=Key(AUTH_APP_SCHEMA),
+    include=Key(OfType(dict)),
+    pagination=Key(PAGINATION_SCHEMA),
+    cache=Key(CACHE_SCHEMA),
+    database=Key(DATABASE_SCHEMA),
+)
+
+
+def validate_compose(compose_file_content):
+    """
+    Validates the whole compose document in a single pass and raises
+    ComposeValidationError with every error found.
+    """
+    errors = []
+    if COMPOSE_SCHEMA.validate(compose_file_content, "", errors):
+        errors += find_duplicate_app_names(compose_file_content)
+        errors += find_database_alias_errors(compose_file_content)
+    if errors:
+        raise ComposeValidationError(errors)
+
+
+def find_duplicate_app_names(compose_file_content: dict):
+    """Returns an error for every application name used more than once."""
+    errors = []
+    app_paths = [
+        (f"app_with_model[{index}].app_name", app_with_model["app_name"])
+        for index, app_with_model in enumerate(compose_file_content["app_with_model"])
+    ]
+    if compose_file_content.get("auth_app") is not None:
+        app_paths.append(
+            ("auth_app.app_name", compose_file_content["auth_app"]["app_name"])
+        )
+
+    seen_app_names = set()
+    for path, app_name in app_paths:
+        if app_name in seen_app_names:
+            errors.append(format_error(path, f"duplicate app name '{app_name}'"))
+        seen_app_names.add(app_name)
+    return errors
+
+
+def find_database_alias_errors(compose_file_content: dict):
+    """
+    Returns an error for every database alias used more than once, and for
+    every application placed in a database the database section does not
+    declare.
+    """
+    errors = []
+    database = compose_file_content.get("database") or {}
+    alias_paths = [
+        (f"database.replicas[{index}].alias", replica["alias"])
+        for index, replica in enumerate(database.get("replicas") or [])
+    ]
+    primary_aliases = set()
+    for index, routed_database in enumerate(database.get("databases") or []):
+        alias_paths.append(
+            (f"database.databases[{index}].alias", routed_database["alias"])
+        )
+        primary_aliases.add(routed_database["alias"])
+        alias_paths += [
+            (
+                f"database.databases[{index}].replicas[{replica_index}].alias",
+                replica["alias"],
+            )
+            for replica_index, replica in enumerate(
+                routed_database.get("replicas") or []
+            )
+        ]
+
+    seen_aliases = {"default"}
+    for path, alias in alias_paths:
+        if alias in seen_aliases:
+            errors.append(format_error(path, f"duplicate database alias '{alias}'"))
+        seen_aliases.add(alias)
+
+    for index, app_with_model in enumerate(compose_file_content["app_with_model"]):
+        alias = app_with_model.get("database")
+        if alias is not None and alias != "default" and alias not in primary_aliases:
+            errors.append(
+                format_error(
+                    f"app_with_model[{index}].database",
+                    f"'{alias}' is not one of the database.databases aliases",
+                )
+            )
+    return errors
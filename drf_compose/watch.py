@@ -0,0 +1,97 @@
+"""Watching of a compose file for changes.
+
+Changes are picked up with watchdog when it is installed, otherwise the
+compose file is polled. Editors often save a file by writing a temporary
+file and renaming it over the original, so the folder of the compose file is
+watched rather than the file itself.
+"""
+import os
+import pathlib
+import threading
+
+
+class PollingWatcher(threading.Thread):
+    """Calls on_change whenever the modification time or size of path changes."""
+
+    def __init__(self, path: pathlib.Path, on_change, interval: float = 0.1):
+        super().__init__(daemon=True)
+        self.path = path
+        self.on_change = on_change
+        self.interval = interval
+        self._stop_event = threading.Event()
+
+    def get_signature(self):
+        try:
+            stat = os.stat(self.path)
+        except OSError:
+            return None
+        return stat.st_mtime_ns, stat.st_size, stat.st_ino
+
+    def run(self):
+        signature = self.get_signature()
+        while not self._stop_event.wait(self.interval):
+            new_signature = self.get_signature()
+            if new_signature != signature:
+                signature = new_signature
+                self.on_change()
+
+    def stop(self):
+        self._stop_event.set()
+
+
+def start_watchdog_observer(path: pathlib.Path, on_change):
+    """
+    Starts a watchdog observer calling on_change whenever path is changed,
+    returns None if watchdog is not installed.
+    """
+    try:
+        from watchdog.events import FileSystemEventHandler
+        from watchdog.observers import Observer
+    except ImportError:
+        return None
+
+    watched_path = os.path.abspath(path)
+
+    class ComposeFileHandler(FileSystemEventHandler):
+        def on_any_event(self, event):
+            event_paths = (event.src_path, getattr(event, "dest_path", None))
+            if watched_path in map(os.path.abspath, filter(None, event_paths)):
+                on_change()
+
+    observer = Observer()
+    observer.schedule(ComposeFileHandler(), os.path.dirname(watched_path))
+    observer.start()
+    return observer
+
+
+def watch(
+    path: pathlib.Path,
+    on_change,
+    debounce: float = 0.2,
+    stop_event: threading.Event = None,
+):
+    """
+    Calls on_change after every burst of changes of path, once path was left
+    alone for debounce seconds, until stop_event is set.
+    """
+    stop_event = stop_event or threading.Event()
+    changed = threading.Event()
+    watcher = start_watchdog_observer(path, changed.set)
+    if watcher is None:
+        watcher = PollingWatcher(path, changed.set)
+        watcher.start()
+        # A burst of saves is only seen one poll at a time, the debounce must span a few polls
+        debounce = max(debounce, 2 * watcher.interval)
+    try:
+        while not stop_event.is_set():
+            # Wait with a timeout so stop_event and KeyboardInterrupt are noticed
+            if not changed.wait(0.5):
+                continue
+            changed.clear()
+            while changed.wait(debounce):
+                changed.clear()
+            if not stop_event.is_set():
+                on_change()
+    finally:
+        watcher.stop()
+        watcher.join()
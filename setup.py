@@ -25,6 +25,15 @@ test_requirements = [
     "pytest>=3",
 ]
 
+extras_requirements = {
+    # Faster change detection for drf-compose watch, which polls the compose file otherwise
+    "watch": ["watchdog"],
+    # Faster parsing of large JSON compose files
+    "fast": ["orjson"],
+    # Faster rendering with drf-compose --engine jinja2
+    "jinja2": ["Jinja2>=2.11"],
+}
+
 setup(
     author="Sotunde Abiodun",
     author_email="sotundeabiodun00@gmail.com",
@@ -46,6 +55,7 @@ setup(
         ],
     },
     install_requires=requirements,
+    extras_require=extras_requirements,
     license="BSD license",
     long_description=readme,
     include_package_data=True,
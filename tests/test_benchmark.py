@@ -0,0 +1,47 @@
+import json
+import pathlib
+import subprocess
+import sys
+
+BENCHMARK_SCRIPT = (
+    pathlib.Path(__file__).resolve().parent.parent / "benchmarks" / "bench_generate.py"
+)
+
+
+def run_benchmark(*args):
+    return subprocess.run(
+        [sys.executable, str(BENCHMARK_SCRIPT), "--apps", "1,2", "--models", "1"]
+        + ["--fields", "5", "--repeat", "1", "--no-format", *args],
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        universal_newlines=True,
+    )
+
+
+def test_benchmark_writes_phase_timings(tmp_path):
+    results_path = tmp_path / "results.json"
+    result = run_benchmark("--output", str(results_path))
+    assert result.returncode == 0, result.stderr
+
+    results = json.loads(results_path.read_text())
+    assert [case["name"] for case in results["cases"]] == [
+        "apps=1,models=1,fields=5",
+        "apps=2,models=1,fields=5",
+    ]
+    phases = results["cases"][1]["phases"]
+    for name in ("parse", "validate", "scaffold", "render", "write", "total"):
+        assert phases[name]["median"] >= 0
+    assert "format" not in phases
+
+
+def test_benchmark_reports_regressions(tmp_path):
+    baseline_path = tmp_path / "baseline.json"
+    assert run_benchmark("--output", str(baseline_path)).returncode == 0
+
+    baseline = json.loads(baseline_path.read_text())
+    for case in baseline["cases"]:
+        case["phases"]["total"]["median"] = 1e-9
+    baseline_path.write_text(json.dumps(baseline))
+    result = run_benchmark("--compare", str(baseline_path))
+    assert result.returncode == 1
+    assert "apps=2,models=1,fields=5" in result.stdout
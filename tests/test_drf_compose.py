@@ -1,6 +1,9 @@
 """Tests for `drf_compose` package."""
 import json
 import pathlib
+import subprocess
+import sys
+import time
 
 import pytest
 from click.testing import CliRunner
@@ -197,3 +200,460 @@ def test_level_4_required_key(
         if exit_code == 1:
             assert result.exception
         assert result.exit_code == exit_code
+
+
+def test_project_and_app_skeletons_are_written():
+    runner = CliRunner()
+    with runner.isolated_filesystem():
+        create_compose_file()
+        result = runner.invoke(cli.main)
+        assert result.exit_code == 0
+        project_path = pathlib.Path("delight_blog")
+        assert (project_path / "manage.py").exists()
+        assert (project_path / "delight_blog" / "wsgi.py").exists()
+        for app_name in ["post", "category", "authentication"]:
+            app_path = project_path / "apps" / app_name
+            assert (app_path / "__init__.py").exists()
+            assert (app_path / "tests.py").exists()
+            assert (app_path / "migrations" / "__init__.py").exists()
+
+
+def test_invalid_app_name():
+    runner = CliRunner()
+    with runner.isolated_filesystem():
+        test_compose_json: dict = json.loads(json_test_compose)
+        test_compose_json["app_with_model"][0]["app_name"] = "not-valid"
+        create_compose_file(json.dumps(test_compose_json))
+        result = runner.invoke(cli.main)
+        assert result.exception
+        assert result.exit_code == 1
+
+
+def test_no_format_option():
+    runner = CliRunner()
+    with runner.isolated_filesystem():
+        create_compose_file()
+        result = runner.invoke(cli.main, args="--no-format")
+        assert result.exit_code == 0
+        models_file = pathlib.Path("delight_blog/apps/post/models.py")
+        assert "blank=True,null=True," in models_file.read_text()
+
+
+@pytest.mark.parametrize("format_workers", ["1", "2"])
+def test_format_workers_option(format_workers):
+    runner = CliRunner()
+    with runner.isolated_filesystem():
+        create_compose_file()
+        result = runner.invoke(cli.main, args=["--format-workers", format_workers])
+        assert result.exit_code == 0
+        models_file = pathlib.Path("delight_blog/apps/post/models.py")
+        assert "blank=True,null=True," not in models_file.read_text()
+
+
+def test_invalid_format_workers_option():
+    runner = CliRunner()
+    with runner.isolated_filesystem():
+        create_compose_file()
+        result = runner.invoke(cli.main, args=["--format-workers", "0"])
+        assert result.exit_code == 2
+
+
+def test_importing_cli_does_not_set_up_django():
+    # A fresh interpreter is needed as the test session already set up Django
+    result = subprocess.run(
+        [
+            sys.executable,
+            "-c",
+            "import sys, drf_compose.cli; assert 'django' not in sys.modules",
+        ]
+    )
+    assert result.returncode == 0
+
+
+def read_project_files(project_path: pathlib.Path):
+    return {
+        path.relative_to(project_path): path.read_text()
+        for path in project_path.rglob("*")
+        if path.is_file()
+    }
+
+
+def test_jobs_option_output_is_identical_to_serial():
+    runner = CliRunner()
+    with runner.isolated_filesystem():
+        create_compose_file()
+        result = runner.invoke(cli.main)
+        assert result.exit_code == 0
+        pathlib.Path("delight_blog").rename("serial")
+        result = runner.invoke(cli.main, args="--jobs 2")
+        assert result.exit_code == 0
+        assert read_project_files(pathlib.Path("delight_blog")) == read_project_files(
+            pathlib.Path("serial")
+        )
+
+
+def test_jobs_option_reports_first_error():
+    runner = CliRunner()
+    with runner.isolated_filesystem():
+        test_compose_json: dict = json.loads(json_test_compose)
+        test_compose_json["app_with_model"][0]["models"][0].pop("name")
+        test_compose_json["app_with_model"][1]["models"][0]["fields"][0].pop("type")
+        create_compose_file(json.dumps(test_compose_json))
+        result = runner.invoke(cli.main, args="--jobs 2")
+        assert result.exit_code == 1
+        assert "model's name is required" in result.output
+
+
+def test_update_without_changes_writes_nothing():
+    runner = CliRunner()
+    with runner.isolated_filesystem():
+        create_compose_file()
+        result = runner.invoke(cli.main)
+        assert result.exit_code == 0
+        before = {
+            path: path.stat().st_mtime_ns
+            for path in pathlib.Path("delight_blog/apps").rglob("*.py")
+        }
+        result = runner.invoke(cli.main, args="--update")
+        assert result.exit_code == 0
+        assert "0 of 5 sections changed" in result.output
+        assert before == {
+            path: path.stat().st_mtime_ns
+            for path in pathlib.Path("delight_blog/apps").rglob("*.py")
+        }
+
+
+def test_update_regenerates_changed_sections_only():
+    runner = CliRunner()
+    with runner.isolated_filesystem():
+        create_compose_file()
+        result = runner.invoke(cli.main)
+        assert result.exit_code == 0
+
+        hand_edited_file = pathlib.Path("delight_blog/apps/post/views.py")
+        hand_edited_file.write_text(hand_edited_file.read_text() + "# hand edit\n")
+
+        test_compose_json: dict = json.loads(json_test_compose)
+        test_compose_json["app_with_model"][0]["models"][0]["fields"].append(
+            {"name": "slug", "type": "slug"}
+        )
+        create_compose_file(json.dumps(test_compose_json))
+        result = runner.invoke(cli.main, args="--update")
+        assert result.exit_code == 0
+        assert "2 of 5 sections changed" in result.output
+        assert "apps/post/views.py was edited by hand" in result.output
+        assert (
+            "slug = models.SlugField()"
+            in pathlib.Path("delight_blog/apps/post/models.py").read_text()
+        )
+        assert hand_edited_file.read_text().endswith("# hand edit\n")
+
+
+def test_update_removes_and_readds_an_app():
+    runner = CliRunner()
+    with runner.isolated_filesystem():
+        test_compose_json: dict = json.loads(json_test_compose)
+        tag_app = {
+            "app_name": "tag",
+            "models": [
+                {
+                    "name": "Tag",
+                    "fields": [
+                        {"name": "name", "type": "char", "options": {"max_length": 3}}
+                    ],
+                }
+            ],
+        }
+        create_compose_file(
+            json.dumps(
+                {
+                    **test_compose_json,
+                    "app_with_model": [*test_compose_json["app_with_model"], tag_app],
+                }
+            )
+        )
+        result = runner.invoke(cli.main)
+        assert result.exit_code == 0
+        tag_path = pathlib.Path("delight_blog/apps/tag")
+        assert (tag_path / "migrations/0001_initial.py").exists()
+        hand_edited_file = tag_path / "admin.py"
+        hand_edited_file.write_text(hand_edited_file.read_text() + "# hand edit\n")
+
+        # The unchanged files of the removed app are deleted, the hand-edited one is kept
+        create_compose_file(json.dumps(test_compose_json))
+        result = runner.invoke(cli.main, args="--update")
+        assert result.exit_code == 0
+        assert (
+            "apps/tag/admin.py is no longer generated but was edited by hand"
+            in result.output
+        )
+        assert [path.name for path in tag_path.rglob("*")] == ["admin.py"]
+
+        # Added back, its files are generated again but the hand-edited one
+        tag_app["models"][0]["fields"][0]["options"]["max_length"] = 9
+        create_compose_file(
+            json.dumps(
+                {
+                    **test_compose_json,
+                    "app_with_model": [*test_compose_json["app_with_model"], tag_app],
+                }
+            )
+        )
+        result = runner.invoke(cli.main, args="--update")
+        assert result.exit_code == 0
+        assert "was edited by hand" in result.output
+        assert "apps/tag/models.py was edited by hand" not in result.output
+        assert "max_length=9" in (tag_path / "models.py").read_text()
+        assert (tag_path / "__init__.py").exists()
+        assert (tag_path / "migrations/0001_initial.py").exists()
+        assert hand_edited_file.read_text().endswith("# hand edit\n")
+
+
+def test_update_without_manifest():
+    runner = CliRunner()
+    with runner.isolated_filesystem():
+        create_compose_file()
+        pathlib.Path("delight_blog").mkdir()
+        result = runner.invoke(cli.main, args="--update")
+        assert result.exception
+        assert result.exit_code == 1
+
+
+def test_batch_command():
+    runner = CliRunner()
+    with runner.isolated_filesystem():
+        for service, compose_file_name, content in [
+            ("blog", "drf-compose.json", json_test_compose),
+            ("shop", "drf-compose.yaml", yaml_test_compose),
+        ]:
+            pathlib.Path(service).mkdir()
+            pathlib.Path(service, compose_file_name).write_text(content)
+        result = runner.invoke(cli.main, args="batch . --workers 2")
+        assert result.exit_code == 0
+        assert "Generated 2 of 2 projects" in result.output
+        assert pathlib.Path("blog/delight_blog/manage.py").exists()
+        assert pathlib.Path("shop/delight_blog/manage.py").exists()
+
+
+def test_batch_command_reports_failed_projects():
+    runner = CliRunner()
+    with runner.isolated_filesystem():
+        pathlib.Path("blog").mkdir()
+        pathlib.Path("blog/drf-compose.json").write_text(json_test_compose)
+        pathlib.Path("broken").mkdir()
+        pathlib.Path("broken/drf-compose.json").write_text("{")
+        result = runner.invoke(cli.main, args=["batch", "*/drf-compose.json"])
+        assert result.exit_code == 1
+        assert "Generated 1 of 2 projects" in result.output
+        assert "broken/drf-compose.json: Error parsing compose file" in result.output
+
+
+def test_batch_command_without_compose_files():
+    runner = CliRunner()
+    with runner.isolated_filesystem():
+        result = runner.invoke(cli.main, args="batch .")
+        assert result.exit_code == 1
+
+
+def test_invalid_compose_file_fails_before_writing_anything():
+    runner = CliRunner()
+    with runner.isolated_filesystem():
+        test_compose_json: dict = json.loads(json_test_compose)
+        test_compose_json["app_with_model"][1]["models"][0]["fields"][0].pop("name")
+        create_compose_file(json.dumps(test_compose_json))
+        result = runner.invoke(cli.main)
+        assert result.exit_code == 1
+        assert "app_with_model[1].models[0].fields[0].name" in result.output
+        assert not pathlib.Path("delight_blog").exists()
+
+
+def test_dry_run_writes_nothing():
+    runner = CliRunner()
+    with runner.isolated_filesystem():
+        create_compose_file()
+        result = runner.invoke(cli.main, args="--dry-run")
+        assert result.exit_code == 0
+        assert "delight_blog/settings.py" in result.output
+        assert "apps/post/models.py" in result.output
+        assert list(pathlib.Path().iterdir()) == [pathlib.Path("drf-compose.json")]
+
+
+@pytest.mark.parametrize("archive_name", ["project.tar.gz", "project.zip"])
+def test_output_archive_option(archive_name):
+    import tarfile
+    import zipfile
+
+    runner = CliRunner()
+    with runner.isolated_filesystem():
+        create_compose_file()
+        result = runner.invoke(cli.main, args=f"--output-archive {archive_name}")
+        assert result.exit_code == 0
+        assert not pathlib.Path("delight_blog").exists()
+        if archive_name.endswith(".zip"):
+            with zipfile.ZipFile(archive_name) as archive:
+                names = archive.namelist()
+                models = archive.read("delight_blog/apps/post/models.py").decode()
+        else:
+            with tarfile.open(archive_name) as archive:
+                names = archive.getnames()
+                models = archive.extractfile("delight_blog/apps/post/models.py").read()
+                models = models.decode()
+        assert "delight_blog/manage.py" in names
+        assert "delight_blog/delight_blog/settings.py" in names
+        assert "class Post(models.Model)" in models
+
+
+def test_output_archive_option_can_not_be_combined_with_update():
+    runner = CliRunner()
+    with runner.isolated_filesystem():
+        create_compose_file()
+        result = runner.invoke(cli.main, args="--update --output-archive project.zip")
+        assert result.exit_code == 1
+        assert not pathlib.Path("project.zip").exists()
+
+
+def test_failed_write_leaves_nothing_on_disk(monkeypatch):
+    from drf_compose import output
+
+    write_files = output.OutputTree.write_files
+
+    def failing_write_files(self, root_path, relative_paths):
+        write_files(self, root_path, list(relative_paths)[:3])
+        raise OSError("No space left on device")
+
+    monkeypatch.setattr(output.OutputTree, "write_files", failing_write_files)
+    runner = CliRunner()
+    with runner.isolated_filesystem():
+        create_compose_file()
+        result = runner.invoke(cli.main)
+        assert result.exit_code == 1
+        assert list(pathlib.Path().iterdir()) == [pathlib.Path("drf-compose.json")]
+
+
+@pytest.mark.parametrize("jobs", [1, 2])
+def test_timings_option(jobs):
+    runner = CliRunner()
+    with runner.isolated_filesystem():
+        create_compose_file()
+        result = runner.invoke(cli.main, args=f"--timings --jobs {jobs}")
+        assert result.exit_code == 0
+        assert "Timings:" in result.output
+        for phase in ("parse", "validate", "scaffold", "render", "format", "write"):
+            assert f"  {phase} " in result.output
+        assert "Slowest sections:" in result.output
+        assert "app:post" in result.output
+        assert "Slowest templates:" in result.output
+        assert "app/models.py-tpl" in result.output
+
+
+def test_profile_and_trace_options():
+    import pstats
+
+    runner = CliRunner()
+    with runner.isolated_filesystem():
+        create_compose_file()
+        result = runner.invoke(
+            cli.main, args="--no-format --profile out.prof --trace out.json"
+        )
+        assert result.exit_code == 0
+        assert "Timings:" not in result.output
+        assert pstats.Stats("out.prof").total_calls > 0
+        trace = json.loads(pathlib.Path("out.json").read_text())
+        events = {event["name"]: event for event in trace["traceEvents"]}
+        assert events["total"]["ph"] == "X"
+        assert "render app/models.py-tpl" in events
+        assert "section app:category" in events
+
+
+def test_watch_regenerates_changed_sections(monkeypatch):
+    import threading
+
+    from drf_compose import watch
+
+    runner = CliRunner()
+    with runner.isolated_filesystem():
+        create_compose_file()
+        project_path = pathlib.Path("delight_blog")
+        stop_event = threading.Event()
+        runs = []
+        watch_file = watch.watch
+
+        def watch_until_stopped(path, on_change, debounce):
+            thread = threading.Thread(
+                target=watch_file, args=(path, on_change, debounce, stop_event)
+            )
+            thread.start()
+            time.sleep(0.5)
+            test_compose_json: dict = json.loads(json_test_compose)
+            test_compose_json["app_with_model"][0]["models"][0]["str"] = "content"
+            # A burst of saves is regenerated once
+            for _ in range(3):
+                create_compose_file(json.dumps(test_compose_json))
+                time.sleep(0.05)
+            deadline = time.monotonic() + 10
+            while len(runs) < 2 and time.monotonic() < deadline:
+                time.sleep(0.1)
+            time.sleep(0.5)
+            stop_event.set()
+            thread.join()
+
+        monkeypatch.setattr(watch, "watch", watch_until_stopped)
+        generate_project = cli.generate_project
+
+        def counting_generate_project(*args, **kwargs):
+            runs.append(generate_project(*args, **kwargs))
+            return runs[-1]
+
+        monkeypatch.setattr(cli, "generate_project", counting_generate_project)
+        result = runner.invoke(cli.main, args="watch --no-format --debounce 0.5")
+        assert result.exit_code == 0
+        assert len(runs) == 2
+        assert runs[1].changed_sections == 2
+        assert "2 of 5 sections changed" in result.output
+        assert "self.content" in (project_path / "apps/post/models.py").read_text()
+
+
+def test_yaml_compose_file_is_detected_from_extension():
+    runner = CliRunner()
+    with runner.isolated_filesystem():
+        create_compose_file(use_json=False)
+        result = runner.invoke(cli.main, args="-s drf-compose.yaml --timings")
+        assert result.exit_code == 0
+        assert pathlib.Path("delight_blog/apps/post/models.py").exists()
+        assert "  parse " in result.output
+
+
+def test_jinja2_engine_option():
+    pytest.importorskip("jinja2")
+    from drf_compose import rendering
+
+    runner = CliRunner()
+    with runner.isolated_filesystem():
+        create_compose_file()
+        try:
+            result = runner.invoke(cli.main, args="--engine jinja2 --no-format")
+        finally:
+            rendering.set_engine("django")
+        assert result.exit_code == 0
+        models = pathlib.Path("delight_blog/apps/post/models.py").read_text()
+        assert "help_text='This is the post title'" in models
+
+
+def test_jinja2_engine_refuses_a_shared_template_cache():
+    pytest.importorskip("jinja2")
+    from drf_compose import rendering
+
+    runner = CliRunner()
+    with runner.isolated_filesystem():
+        create_compose_file()
+        pathlib.Path("cache").mkdir()
+        pathlib.Path("cache").chmod(0o777)
+        try:
+            result = runner.invoke(
+                cli.main, args="--engine jinja2 --template-cache cache"
+            )
+        finally:
+            rendering.set_engine("django")
+        assert result.exit_code == 1
+        assert "it is writable by other users" in result.output
+        assert not pathlib.Path("delight_blog").exists()
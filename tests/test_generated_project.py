@@ -0,0 +1,289 @@
+import json
+import os
+import subprocess
+import sys
+
+from drf_compose import compose
+
+from .test_compose_contents import json_test_compose
+
+# Runs the generated project on SQLite, without the CORS middleware and the
+# schema views which are not under test
+TEST_SETTINGS = """
+from delight_blog.settings import *  # noqa
+
+INSTALLED_APPS = [app for app in INSTALLED_APPS if app not in ("corsheaders", "drf_yasg")]
+MIDDLEWARE = [middleware for middleware in MIDDLEWARE if not middleware.startswith("corsheaders.")]
+ROOT_URLCONF = "test_urls"
+ALLOWED_HOSTS = ["testserver"]
+"""
+
+TEST_URLS = """
+from django.urls import include, path
+
+urlpatterns = [
+    path("api/", include("apps.authentication.urls")),
+    path("api/", include("apps.post.urls")),
+    path("api/", include("apps.category.urls")),
+]
+"""
+
+# Drives the API of the generated project, the migrations included, and
+# exits with an AssertionError on the first unexpected response
+CHECK_API = """
+import django
+
+django.setup()
+
+from django.core.management import call_command
+from django.db import connection
+from django.test.utils import CaptureQueriesContext
+from rest_framework.test import APIClient
+
+from apps.authentication.models import CustomUser
+
+call_command("migrate", verbosity=0)
+client = APIClient()
+user = CustomUser.objects.create_user(email="author@example.com", password="secret-password")
+
+response = client.post("/api/labels/", {"name": "news"}, format="json")
+assert response.status_code == 201, response.data
+response = client.post("/api/categorys/", {"name": "News", "label": response.data["id"]}, format="json")
+assert response.status_code == 201, response.data
+category = response.data["label"]
+
+# Bulk create
+posts = [{"title": f"Post {index}", "created_by": user.pk, "categories": [category]} for index in range(3)]
+response = client.post("/api/posts/bulk/", posts, format="json")
+assert response.status_code == 201, response.data
+assert [post["categories"] for post in response.data] == [[category]] * 3
+ids = [post["id"] for post in response.data]
+
+# Cached list
+response = client.get("/api/posts/")
+assert response.status_code == 200, response.data
+assert sorted(post["id"] for post in response.data) == sorted(ids)
+with CaptureQueriesContext(connection) as queries:
+    assert client.get("/api/posts/").data == response.data
+assert not queries.captured_queries, queries.captured_queries
+
+# Only the changed fields are saved, nothing when nothing changed
+with CaptureQueriesContext(connection) as queries:
+    response = client.patch(f"/api/posts/{ids[0]}/", {"title": "Updated"}, format="json")
+assert response.status_code == 200, response.data
+assert response.data["title"] == "Updated"
+updates = [query["sql"] for query in queries.captured_queries if query["sql"].startswith("UPDATE")]
+assert len(updates) == 1 and '"content"' not in updates[0], updates
+with CaptureQueriesContext(connection) as queries:
+    response = client.patch(f"/api/posts/{ids[0]}/", {"title": "Updated"}, format="json")
+assert response.status_code == 200, response.data
+assert not any(query["sql"].startswith("UPDATE") for query in queries.captured_queries)
+assert client.get(f"/api/posts/{ids[0]}/").data["title"] == "Updated"
+
+# Bulk partial update
+response = client.patch("/api/posts/bulk/", [{"id": ids[1], "content": "Bulk"}], format="json")
+assert response.status_code == 200, response.data
+assert client.get(f"/api/posts/{ids[1]}/").data["content"] == "Bulk"
+
+# Sparse and expanded responses, which see the changes of the expanded instances
+response = client.get(f"/api/posts/{ids[0]}/?fields=id,title,created_by&expand=created_by")
+assert response.status_code == 200, response.data
+assert set(response.data) == {"id", "title", "created_by"}
+assert response.data["created_by"]["email"] == "author@example.com"
+assert "password" not in response.data["created_by"]
+response = client.patch(f"/api/customusers/{user.pk}/", {"email": "editor@example.com"}, format="json")
+assert response.status_code == 200, response.data
+response = client.get(f"/api/posts/{ids[0]}/?fields=id,title,created_by&expand=created_by")
+assert response.data["created_by"]["email"] == "editor@example.com"
+
+# Bulk delete
+response = client.delete("/api/posts/bulk/?title=Updated")
+assert response.status_code == 200, response.data
+assert response.data == {"deleted": 1}
+assert len(client.get("/api/posts/").data) == 2
+assert client.delete("/api/posts/bulk/").status_code == 400
+# Only the columns of the model itself filter the bulk delete
+response = client.delete("/api/posts/bulk/?created_by__password__startswith=pbkdf2")
+assert response.status_code == 400, response.data
+assert client.delete("/api/posts/bulk/?categories=1").status_code == 400
+assert client.delete("/api/posts/bulk/?title__contains=Post").status_code == 400
+response = client.delete(f"/api/posts/bulk/?id__in={ids[1]}&created_by={user.pk}")
+assert response.data == {"deleted": 1}, response.data
+
+print("API checked")
+"""
+
+
+CHECK_PAGINATION = """
+import django
+
+django.setup()
+
+from django.core.management import call_command
+from rest_framework.test import APIClient
+
+from apps.authentication.models import CustomUser
+
+call_command("migrate", verbosity=0)
+client = APIClient()
+
+# Estimated page number pagination, the project's default
+labels = [client.post("/api/labels/", {"name": f"label{index}"}, format="json").data for index in range(3)]
+response = client.get("/api/labels/")
+assert response.status_code == 200, response.data
+assert list(response.data) == ["count", "next", "previous", "results"], response.data
+assert response.data["count"] == 3 and len(response.data["results"]) == 2
+
+# Cursor pagination
+for index, label in enumerate(labels):
+    client.post("/api/categorys/", {"name": f"category{index}", "label": label["id"]}, format="json")
+response = client.get("/api/categorys/")
+assert list(response.data) == ["next", "previous", "results"], response.data
+assert [category["name"] for category in response.data["results"]] == ["category2", "category1"]
+response = client.get(response.data["next"])
+assert [category["name"] for category in response.data["results"]] == ["category0"]
+assert response.data["next"] is None
+
+# Countless limit offset pagination
+user = CustomUser.objects.create_user(email="author@example.com", password="secret-password")
+for index in range(3):
+    post = {"title": f"post{index}", "created_by": user.pk, "categories": [labels[0]["id"]]}
+    assert client.post("/api/posts/", post, format="json").status_code == 201
+response = client.get("/api/posts/?limit=2")
+assert list(response.data) == ["next", "previous", "results"], response.data
+assert len(response.data["results"]) == 2 and "offset=2" in response.data["next"]
+response = client.get(response.data["next"])
+assert len(response.data["results"]) == 1 and response.data["next"] is None
+
+# Countless page number pagination
+response = client.get("/api/customusers/")
+assert list(response.data) == ["next", "previous", "results"], response.data
+assert response.data["next"] is None
+
+print("Pagination checked")
+"""
+
+
+CHECK_DATABASE_ROUTING = """
+import django
+
+django.setup()
+
+from django.conf import settings
+from django.core.management import call_command
+from django.db import router
+from rest_framework.test import APIClient
+
+from apps.note.models import Note
+from apps.post.models import Post
+from delight_blog import routers
+
+assert list(settings.DATABASES) == ["default", "replica", "archive", "archive_replica"]
+assert settings.DATABASES["replica"]["TEST"] == {"MIRROR": "default"}
+assert "delight_blog.database.ConnectionHealthCheckMiddleware" in settings.MIDDLEWARE
+
+# Reads go to the replicas of the primary database of each app until a write
+assert router.db_for_read(Post) == "replica"
+assert router.db_for_read(Note) == "archive_replica"
+assert router.db_for_write(Post) == "default"
+assert router.db_for_write(Note) == "archive"
+assert router.db_for_read(Post) == "default"
+assert router.db_for_read(Note) == "archive"
+routers._state.pinned = False
+
+# Replicas get the tables of their primary database only
+assert router.allow_migrate("replica", "post") and router.allow_migrate("default", "post")
+assert not router.allow_migrate("archive", "post") and not router.allow_migrate("archive_replica", "post")
+assert router.allow_migrate("archive_replica", "note") and not router.allow_migrate("default", "note")
+
+# Instances read from a replica relate to those of its primary database
+read_post, written_post, note = Post(), Post(), Note()
+read_post._state.db, written_post._state.db, note._state.db = "replica", "default", "archive_replica"
+assert router.allow_relation(read_post, written_post)
+assert not router.allow_relation(read_post, note)
+
+# The replica is an empty database of its own, so the writes of a client are
+# only seen while it reads from the primary database
+for alias in settings.DATABASES:
+    call_command("migrate", database=alias, verbosity=0)
+client = APIClient()
+response = client.post("/api/labels/", {"name": "news"}, format="json")
+assert response.status_code == 201, response.data
+assert response.cookies[routers.STICKY_COOKIE_NAME]["max-age"] == routers.STICKY_SECONDS
+assert len(client.get("/api/labels/").data) == 1
+assert len(APIClient().get("/api/labels/").data) == 0
+
+print("Database routing checked")
+"""
+
+
+def run_project(tmp_path, compose_content: dict, script: str):
+    """
+    Generates compose_content into tmp_path, runs script in the project and
+    returns the lines of its output.
+    """
+    result = compose(compose_content, tmp_path)
+    assert result.ok
+
+    project_path = tmp_path / "delight_blog"
+    (project_path / "test_settings.py").write_text(TEST_SETTINGS)
+    (project_path / "test_urls.py").write_text(TEST_URLS)
+    (project_path / "check.py").write_text(script)
+    process = subprocess.run(
+        [sys.executable, "check.py"],
+        cwd=str(project_path),
+        env={
+            **os.environ,
+            "DJANGO_SETTINGS_MODULE": "test_settings",
+            "DB_NAME": str(tmp_path / "db.sqlite3"),
+        },
+        stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT,
+        universal_newlines=True,
+    )
+    assert process.returncode == 0, process.stdout
+    return process.stdout.splitlines()
+
+
+def test_generated_project_serves_its_api(tmp_path):
+    compose_content = json.loads(json_test_compose)
+    compose_content["cache"] = {"backend": "locmem"}
+    compose_content["app_with_model"][0]["models"][0]["bulk"] = True
+    assert run_project(tmp_path, compose_content, CHECK_API)[-1] == "API checked"
+
+
+def test_generated_project_paginates(tmp_path):
+    compose_content = json.loads(json_test_compose)
+    compose_content["pagination"] = {"count": "estimate", "page_size": 2}
+    post = compose_content["app_with_model"][0]["models"][0]
+    post["pagination"] = {"style": "limit_offset", "count": "none"}
+    category = compose_content["app_with_model"][1]["models"][0]
+    category["pagination"] = {"style": "cursor", "ordering": "-created_date"}
+    compose_content["auth_app"]["pagination"] = {"count": "none"}
+    lines = run_project(tmp_path, compose_content, CHECK_PAGINATION)
+    assert lines[-1] == "Pagination checked"
+
+
+def test_generated_project_routes_to_replicas(tmp_path):
+    compose_content = json.loads(json_test_compose)
+    compose_content["database"] = {
+        "health_checks": True,
+        "replicas": [{"alias": "replica"}],
+        "databases": [{"alias": "archive", "replicas": [{"alias": "archive_replica"}]}],
+    }
+    compose_content["app_with_model"].append(
+        {
+            "app_name": "note",
+            "database": "archive",
+            "models": [
+                {
+                    "name": "Note",
+                    "fields": [
+                        {"name": "text", "type": "char", "options": {"max_length": 200}}
+                    ],
+                }
+            ],
+        }
+    )
+    lines = run_project(tmp_path, compose_content, CHECK_DATABASE_ROUTING)
+    assert lines[-1] == "Database routing checked"
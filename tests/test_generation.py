@@ -0,0 +1,397 @@
+import concurrent.futures
+import functools
+import json
+import multiprocessing
+
+import pytest
+
+from drf_compose import compose, formatting, generation, output, rendering
+
+from .test_compose_contents import json_test_compose
+
+
+def test_compose_writes_project(tmp_path):
+    result = compose(json.loads(json_test_compose), tmp_path, no_format=True)
+    assert result.ok
+    assert result.project_path == tmp_path / "delight_blog"
+    assert "apps/post/models.py" in result.written
+    assert (tmp_path / "delight_blog" / "apps/post/models.py").read_text() == (
+        result.tree["apps/post/models.py"]
+    )
+    assert result.sections == 5
+    for phase in ("validate", "scaffold", "render", "write"):
+        assert phase in result.timings.phases
+
+
+def test_compose_dry_run_keeps_files_in_memory(tmp_path):
+    result = compose(json.loads(json_test_compose), tmp_path, dry_run=True)
+    assert result.ok
+    assert "class Post(models.Model):" in result.tree["apps/post/models.py"]
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_compose_returns_write_errors(tmp_path):
+    (tmp_path / "file").write_text("")
+    result = compose(json.loads(json_test_compose), tmp_path / "file", no_format=True)
+    assert not result.ok
+    assert result.errors[0].startswith("The project can not be written: ")
+
+
+def test_compose_in_threads(tmp_path):
+    compose_content = json.loads(json_test_compose)
+    with concurrent.futures.ThreadPoolExecutor(max_workers=4) as executor:
+        results = list(
+            executor.map(
+                lambda index: compose(
+                    compose_content, tmp_path / str(index), dry_run=True, no_format=True
+                ),
+                range(4),
+            )
+        )
+    assert all(result.ok for result in results)
+    assert (
+        len({result.tree["apps/post/migrations/0001_initial.py"] for result in results})
+        == 1
+    )
+
+
+def test_formatting_errors_are_returned():
+    tree = output.OutputTree({"valid.py": "x=1\n", "invalid.py": "def (\n"})
+    changed_files, errors = formatting.format_tree(tree, workers=1)
+    assert changed_files == ["valid.py"]
+    assert tree["valid.py"] == "x = 1\n"
+    assert tree["invalid.py"] == "def (\n"
+    assert len(errors) == 1 and errors[0].startswith("Error formatting invalid.py: ")
+
+
+def test_compose_returns_errors(tmp_path):
+    compose_content = json.loads(json_test_compose)
+    compose_content.pop("name")
+    compose_content["app_with_model"][0]["models"][0]["fields"][0].pop("type")
+    result = compose(compose_content, tmp_path)
+    assert not result.ok
+    assert result.errors == [
+        "name: project name is required",
+        "app_with_model[0].models[0].fields[0].type: field's type is required",
+    ]
+    assert list(tmp_path.iterdir()) == []
+
+    compose_content = json.loads(json_test_compose)
+    assert compose(compose_content, tmp_path, no_format=True).ok
+    result = compose(compose_content, tmp_path, no_format=True)
+    assert result.errors == [
+        "Project folder with the specified project name (delight_blog) already exists. "
+        "Use --update to regenerate it."
+    ]
+
+
+def test_viewset_querysets_load_related_objects(tmp_path):
+    compose_content = json.loads(json_test_compose)
+    result = compose(compose_content, tmp_path, dry_run=True, no_format=True)
+    assert (
+        'queryset = Post.objects.all().select_related("created_by")'
+        '.prefetch_related("categories")'
+    ) in result.tree["apps/post/views.py"]
+    assert "queryset = Label.objects.all()\n" in result.tree["apps/category/views.py"]
+
+    # A model's own lists replace the detected ones, an empty list disables them
+    post = compose_content["app_with_model"][0]["models"][0]
+    post["select_related"] = ["created_by__groups"]
+    post["prefetch_related"] = []
+    result = compose(compose_content, tmp_path, dry_run=True, no_format=True)
+    assert (
+        'queryset = Post.objects.all().select_related("created_by__groups")\n'
+    ) in result.tree["apps/post/views.py"]
+
+
+def test_pagination(tmp_path):
+    compose_content = json.loads(json_test_compose)
+    result = compose(compose_content, tmp_path, dry_run=True)
+    assert "REST_FRAMEWORK" not in result.tree["delight_blog/settings.py"]
+    assert "delight_blog/pagination.py" not in result.tree
+
+    compose_content["pagination"] = {"count": "none", "page_size": 20}
+    category, label = compose_content["app_with_model"][1]["models"]
+    category["pagination"] = {"style": "cursor", "ordering": "-created_date"}
+    label["pagination"] = False
+    result = compose(compose_content, tmp_path, dry_run=True)
+    assert result.ok
+    assert (
+        '"DEFAULT_PAGINATION_CLASS": "delight_blog.pagination.DefaultPagination",\n'
+        '    "PAGE_SIZE": 20,'
+    ) in result.tree["delight_blog/settings.py"]
+    assert "class DefaultPagination(CountlessPageNumberPagination):" in (
+        result.tree["delight_blog/pagination.py"]
+    )
+    views = result.tree["apps/category/views.py"]
+    assert (
+        "class CategoryPagination(pagination.CursorPagination):\n"
+        "    page_size = 20\n"
+        '    ordering = "-created_date"\n'
+    ) in views
+    assert "pagination_class = CategoryPagination" in views
+    assert "pagination_class = None" in views
+    assert "pagination_class" not in result.tree["apps/post/views.py"]
+
+
+def test_indexes_and_constraints(tmp_path):
+    compose_content = json.loads(json_test_compose)
+    post = compose_content["app_with_model"][0]["models"][0]
+    post["meta"]["indexes"] = [
+        {"fields": ["created_by"], "condition": {"content__isnull": False}}
+    ]
+    post["meta"]["constraints"] = [
+        {"name": "post_title_set", "check": {"title__isnull": False}}
+    ]
+    post["meta"]["unique_together"] = [["title", "created_by"]]
+    label = compose_content["app_with_model"][1]["models"][1]
+    label["auto_indexes"] = False
+    result = compose(compose_content, tmp_path, dry_run=True)
+    assert result.ok
+    models = result.tree["apps/post/models.py"]
+    assert 'unique_together = [["title", "created_by"]]' in models
+    assert (
+        "            models.Index(\n"
+        '                fields=["created_by"],\n'
+        '                name="post_post_created_88b3a1_idx",\n'
+        "                condition=models.Q(content__isnull=False),\n"
+        "            ),\n"
+        "            models.Index(\n"
+        '                fields=["-created_date"],\n'
+        '                name="post_post_created_7a8cc9_idx",\n'
+        "            ),\n"
+    ) in models
+    assert (
+        "models.CheckConstraint(\n"
+        '                check=models.Q(title__isnull=False), name="post_title_set"\n'
+        "            )"
+    ) in models
+    assert (
+        "indexes" not in result.tree["apps/category/models.py"].split("class Label")[1]
+    )
+
+
+def test_cache(tmp_path):
+    compose_content = json.loads(json_test_compose)
+    result = compose(compose_content, tmp_path, dry_run=True)
+    assert "CACHES" not in result.tree["delight_blog/settings.py"]
+    assert "apps/post/signals.py" not in result.tree
+
+    compose_content["cache"] = {"backend": "redis", "timeout": 60}
+    post = compose_content["app_with_model"][0]["models"][0]
+    post["cache"] = {"timeout": 10}
+    compose_content["app_with_model"][1]["models"][1]["cache"] = False
+    result = compose(compose_content, tmp_path, dry_run=True)
+    assert result.ok
+    settings = result.tree["delight_blog/settings.py"]
+    assert (
+        '"BACKEND": os.environ.get("CACHE_BACKEND", "django_redis.cache.RedisCache"),'
+    ) in settings
+    assert '"TIMEOUT": 60,' in settings
+    assert "django-redis" in result.tree["requirements.txt"]
+    assert "class CacheResponseMixin:" in result.tree["delight_blog/caching.py"]
+    assert (
+        'if fieldsets.get_query_fields(request, "expand"):'
+        in result.tree["delight_blog/caching.py"]
+    )
+
+    views = result.tree["apps/post/views.py"]
+    assert (
+        "class PostViewSet(\n"
+        "    caching.CacheResponseMixin,\n"
+        "    fieldsets.SparseFieldsViewSetMixin,\n"
+        "    viewsets.ModelViewSet,\n"
+        "):"
+    ) in views
+    assert "cache_timeout = 10" in views
+    assert (
+        "@receiver(signals.post_save, sender=Post)\n"
+        "@receiver(signals.post_delete, sender=Post)\n"
+        "@receiver(signals.m2m_changed, sender=Post.categories.through)\n"
+        '@receiver(signals.post_delete, sender="authentication.CustomUser")\n'
+        '@receiver(signals.post_delete, sender="category.Category")\n'
+        "def invalidate_post_cache(sender, **kwargs):\n"
+        "    caching.invalidate(Post)\n"
+    ) in result.tree["apps/post/signals.py"]
+    assert "from . import signals" in result.tree["apps/post/apps.py"]
+    category_views = result.tree["apps/category/views.py"]
+    assert (
+        "class LabelViewSet(fieldsets.SparseFieldsViewSetMixin, viewsets.ModelViewSet):"
+    ) in category_views
+    assert "invalidate_label_cache" not in result.tree["apps/category/signals.py"]
+
+
+def test_database(tmp_path):
+    compose_content = json.loads(json_test_compose)
+    result = compose(compose_content, tmp_path, dry_run=True)
+    assert "CONN_MAX_AGE" not in result.tree["delight_blog/settings.py"]
+    assert "bench_database.py" not in result.tree
+
+    compose_content["database"] = {
+        "engine": "postgresql",
+        "health_checks": True,
+        "pool": {"size": 5},
+        "statement_timeout": 5000,
+    }
+    result = compose(compose_content, tmp_path, dry_run=True)
+    assert result.ok
+    settings = result.tree["delight_blog/settings.py"]
+    assert (
+        '"ENGINE": os.environ.get("DB_ENGINE", "dj_db_conn_pool.backends.postgresql"),'
+    ) in settings
+    assert '"CONN_MAX_AGE": int(os.environ.get("DB_CONN_MAX_AGE", 0)),' in settings
+    assert '"OPTIONS": {"options": "-c statement_timeout=5000"},' in settings
+    assert '"POOL_SIZE": 5,' in settings
+    assert '"PRE_PING": True,' in settings
+    assert '"delight_blog.database.ConnectionHealthCheckMiddleware",' in settings
+    assert "class ConnectionHealthCheckMiddleware:" in (
+        result.tree["delight_blog/database.py"]
+    )
+    assert "django-db-connection-pool" in result.tree["requirements.txt"]
+    assert 'default="/api/posts/"' in result.tree["bench_database.py"]
+
+    compose_content["database"] = {"engine": "mysql", "connect_timeout": 5}
+    settings = compose(compose_content, tmp_path, dry_run=True).tree[
+        "delight_blog/settings.py"
+    ]
+    assert '"CONN_MAX_AGE": int(os.environ.get("DB_CONN_MAX_AGE", 60)),' in settings
+    assert '"OPTIONS": {"connect_timeout": 5},' in settings
+    assert "POOL_OPTIONS" not in settings
+
+
+def test_database_routing(tmp_path):
+    compose_content = json.loads(json_test_compose)
+    compose_content["database"] = {
+        "engine": "postgresql",
+        "replicas": [{"alias": "replica", "host": "replica.local"}],
+        "databases": [{"alias": "analytics", "name": "analytics"}],
+    }
+    compose_content["app_with_model"][1]["database"] = "analytics"
+    result = compose(compose_content, tmp_path, dry_run=True)
+    assert result.ok
+    settings = result.tree["delight_blog/settings.py"]
+    assert (
+        'DATABASES["replica"] = {\n'
+        '    **DATABASES["default"],\n'
+        '    "NAME": os.environ.get("DB_REPLICA_NAME", DATABASES["default"]["NAME"]),\n'
+    ) in settings
+    assert '"HOST": os.environ.get("DB_REPLICA_HOST", "replica.local"),' in settings
+    assert '"TEST": {"MIRROR": "default"},' in settings
+    assert '"NAME": os.environ.get("DB_ANALYTICS_NAME", "analytics"),' in settings
+    assert (
+        'DATABASE_ROUTERS = ["delight_blog.routers.PrimaryReplicaRouter"]'
+    ) in settings
+    assert '"delight_blog.routers.StickyPrimaryMiddleware",' in settings
+    routers = result.tree["delight_blog/routers.py"]
+    assert 'APP_DATABASES = {"category": "analytics"}' in routers
+    assert 'REPLICAS = {"default": ["replica"], "analytics": []}' in routers
+    assert "STICKY_SECONDS = 5" in routers
+
+    compose_content["database"] = {"replicas": [{"alias": "replica"}]}
+    compose_content["app_with_model"][1].pop("database")
+    settings = compose(compose_content, tmp_path, dry_run=True).tree[
+        "delight_blog/settings.py"
+    ]
+    assert ('"DB_REPLICA_NAME", os.path.join(BASE_DIR, "replica.sqlite3")') in settings
+
+
+def test_bulk(tmp_path):
+    compose_content = json.loads(json_test_compose)
+    result = compose(compose_content, tmp_path, dry_run=True)
+    assert "delight_blog/bulk.py" not in result.tree
+    assert "bulk" not in result.tree["apps/post/serializers.py"]
+
+    compose_content["cache"] = {}
+    compose_content["app_with_model"][0]["models"][0]["bulk"] = True
+    compose_content["app_with_model"][1]["models"][0]["bulk"] = {"batch_size": 500}
+    result = compose(compose_content, tmp_path, dry_run=True)
+    assert result.ok
+    assert "class BulkModelMixin:" in result.tree["delight_blog/bulk.py"]
+
+    serializers = result.tree["apps/post/serializers.py"]
+    assert (
+        "class PostListSerializer(bulk.BulkListSerializer):\n    batch_size = 1000\n"
+    ) in serializers
+    assert "        list_serializer_class = PostListSerializer\n" in serializers
+    assert (
+        "    caching.CacheResponseMixin,\n"
+        "    bulk.BulkModelMixin,\n"
+        "    fieldsets.SparseFieldsViewSetMixin,\n"
+    ) in result.tree["apps/post/views.py"]
+    assert "@receiver(bulk.post_bulk_save, sender=Post)\n" in (
+        result.tree["apps/post/signals.py"]
+    )
+
+    category_serializers = result.tree["apps/category/serializers.py"]
+    assert "    batch_size = 500\n" in category_serializers
+    assert "class LabelListSerializer" not in category_serializers
+    assert "class LabelViewSet(\n    caching.CacheResponseMixin,\n" in (
+        result.tree["apps/category/views.py"]
+    )
+
+
+def test_serializers_save_changed_fields(tmp_path):
+    result = compose(json.loads(json_test_compose), tmp_path, dry_run=True)
+    assert result.ok
+    assert "def set_changes(instance, validated_data):" in (
+        result.tree["delight_blog/serializers.py"]
+    )
+
+    serializers = result.tree["apps/post/serializers.py"]
+    assert (
+        '        categories = validated_data.pop("categories", None)\n'
+        "        post = Post.objects.create(**validated_data)\n"
+        "        if categories is not None:\n"
+        "            post.categories.set(categories)\n"
+    ) in serializers
+    assert "            instance.save(update_fields=update_fields)\n" in serializers
+    assert '            instance.categories.set(validated_data["categories"])\n' in (
+        serializers
+    )
+    assert "categories" not in result.tree["apps/category/serializers.py"]
+
+    auth_serializers = result.tree["apps/authentication/serializers.py"]
+    assert '            changed_fields.append("password")\n' in auth_serializers
+    assert "            instance.save(update_fields=update_fields)\n" in (
+        auth_serializers
+    )
+
+
+def test_sparse_fieldsets(tmp_path):
+    result = compose(json.loads(json_test_compose), tmp_path, dry_run=True)
+    assert result.ok
+    assert "class SparseFieldsViewSetMixin:" in result.tree["delight_blog/fieldsets.py"]
+    assert (
+        "class PostSerializer(fieldsets.SparseFieldsMixin, serializers.ModelSerializer):"
+    ) in result.tree["apps/post/serializers.py"]
+    assert "fieldsets.SparseFieldsViewSetMixin, viewsets.ModelViewSet" in (
+        result.tree["apps/post/views.py"]
+    )
+    assert "(fieldsets.SparseFieldsMixin, serializers.ModelSerializer):" in (
+        result.tree["apps/authentication/serializers.py"]
+    )
+    assert "fieldsets.SparseFieldsViewSetMixin, viewsets.ModelViewSet" in (
+        result.tree["apps/authentication/views.py"]
+    )
+
+
+def get_renderer():
+    return rendering.renderer.name, rendering.renderer.cache_dir
+
+
+def test_spawned_workers_use_the_renderer(tmp_path, monkeypatch):
+    pytest.importorskip("jinja2")
+    monkeypatch.setattr(
+        concurrent.futures,
+        "ProcessPoolExecutor",
+        functools.partial(
+            concurrent.futures.ProcessPoolExecutor,
+            mp_context=multiprocessing.get_context("spawn"),
+        ),
+    )
+    rendering.set_engine("jinja2").cache_dir = tmp_path
+    try:
+        results = generation.run_tasks([(get_renderer, ()), (get_renderer, ())], jobs=2)
+    finally:
+        rendering.set_engine("django").cache_dir = None
+    assert results == [("jinja2", tmp_path)] * 2
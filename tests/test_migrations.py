@@ -0,0 +1,187 @@
+import json
+import pathlib
+
+from click.testing import CliRunner
+
+from drf_compose import cli, compose, indexes, migrations
+
+from .test_compose_contents import json_test_compose
+from .test_drf_compose import create_compose_file
+
+
+def test_order_apps_puts_dependencies_first():
+    graph = {
+        "post": {"category", "authentication"},
+        "category": set(),
+        "authentication": set(),
+    }
+    assert migrations.order_apps(graph) == ["category", "authentication", "post"]
+
+
+def test_order_apps_keeps_compose_order_of_cycles():
+    graph = {"post": {"category"}, "category": {"post"}, "tag": set()}
+    assert migrations.order_apps(graph) == ["tag", "post", "category"]
+
+
+def test_build_app_graph_ignores_other_apps():
+    compose_content = json.loads(json_test_compose)
+    assert migrations.build_app_graph(compose_content) == {
+        "authentication": set(),
+        "post": {"authentication", "category"},
+        "category": set(),
+    }
+
+
+def test_initial_migrations_are_generated(tmp_path):
+    result = compose(json.loads(json_test_compose), tmp_path, dry_run=True)
+    assert result.ok
+    post_migration = result.tree["apps/post/migrations/0001_initial.py"]
+    assert post_migration.startswith(migrations.MIGRATION_HEADER)
+    assert "migrations.swappable_dependency(settings.AUTH_USER_MODEL)" in post_migration
+    assert '("category", "0001_initial")' in post_migration
+    assert "to=settings.AUTH_USER_MODEL" in post_migration
+    assert "apps/category/migrations/0001_initial.py" in result.tree
+    user_migration = result.tree["apps/authentication/migrations/0001_initial.py"]
+    assert '("auth", "0012_alter_user_first_name_max_length")' in user_migration
+    assert 'name="CustomUser"' in user_migration
+
+
+def test_initial_migrations_of_a_cycle_are_split():
+    compose_content = json.loads(json_test_compose)
+    compose_content["app_with_model"][1]["models"][1]["fields"].append(
+        {
+            "name": "post",
+            "type": "fk",
+            "options": {"to": "post.Post", "on_delete": "models.CASCADE"},
+        }
+    )
+    app_migrations = migrations.make_initial_migrations(compose_content)
+    assert [name for name, _ in app_migrations["category"]] == [
+        "0001_initial",
+        "0002_initial",
+    ]
+
+
+def test_unknown_field_type_is_reported(tmp_path):
+    compose_content = json.loads(json_test_compose)
+    compose_content["app_with_model"][0]["models"][0]["fields"][0]["type"] = "money"
+    result = compose(compose_content, tmp_path, dry_run=True)
+    assert result.ok
+    assert result.warnings == [
+        "The initial migrations were not generated: "
+        "app_with_model[0].models[0].fields[0].type: unknown field type 'money'"
+    ]
+    assert "apps/post/models.py" in result.tree
+    assert not any("/migrations/0001_initial.py" in path for path in result.tree)
+    result = compose(compose_content, tmp_path, dry_run=True, migrations=False)
+    assert result.ok and not result.warnings
+
+
+def test_option_expressions_are_not_evaluated(tmp_path):
+    compose_content = json.loads(json_test_compose)
+    fields = compose_content["app_with_model"][0]["models"][0]["fields"]
+    fields[3]["options"]["on_delete"] = "__import__('os').system('exit 1')"
+    result = compose(compose_content, tmp_path, dry_run=True)
+    assert len(result.warnings) == 1
+    assert "options.on_delete: " in result.warnings[0]
+    assert "is not a models.<name>, uuid4 or a literal" in result.warnings[0]
+
+    fields[3]["options"]["on_delete"] = "models.system"
+    result = compose(compose_content, tmp_path, dry_run=True)
+    assert "django.db.models has no 'system'" in result.warnings[0]
+
+
+def test_contrib_apps_are_only_installed_for_the_migrations(tmp_path):
+    from django.apps import apps
+
+    result = compose(json.loads(json_test_compose), tmp_path, dry_run=True)
+    assert "apps/authentication/migrations/0001_initial.py" in result.tree
+    assert not apps.is_installed("django.contrib.auth")
+
+
+def test_no_migrations_option():
+    runner = CliRunner()
+    with runner.isolated_filesystem():
+        create_compose_file()
+        result = runner.invoke(cli.main, args="--no-migrations")
+        assert result.exit_code == 0
+        assert list(pathlib.Path("delight_blog/apps/post/migrations").iterdir())
+        assert not pathlib.Path(
+            "delight_blog/apps/post/migrations/0001_initial.py"
+        ).exists()
+
+
+def test_update_keeps_the_initial_migrations():
+    runner = CliRunner()
+    with runner.isolated_filesystem():
+        create_compose_file()
+        assert runner.invoke(cli.main).exit_code == 0
+        migration_path = pathlib.Path(
+            "delight_blog/apps/post/migrations/0001_initial.py"
+        )
+        migration = migration_path.read_text()
+
+        compose_content = json.loads(json_test_compose)
+        compose_content["app_with_model"][0]["models"][0]["fields"][0]["options"][
+            "max_length"
+        ] = 300
+        create_compose_file(json.dumps(compose_content))
+        result = runner.invoke(cli.main, args="--update")
+        assert result.exit_code == 0
+        assert (
+            "apps/post/migrations/0001_initial.py was left alone as it may have been applied, "
+            "run manage.py makemigrations" in result.output
+        )
+        assert (
+            "max_length=300"
+            in pathlib.Path("delight_blog/apps/post/models.py").read_text()
+        )
+        assert migration_path.read_text() == migration
+
+
+def test_index_names_match_django():
+    assert (
+        indexes.make_index_name("post_post", ["-created_date"])
+        == "post_post_created_7a8cc9_idx"
+    )
+    assert indexes.make_index_name("1_table", ["name"])[0] == "D"
+
+
+def test_orderings_covered_by_an_index_are_not_indexed_again():
+    model = {
+        "name": "Post",
+        "fields": [
+            {"name": "slug", "type": "slug", "options": {"unique": True}},
+            {"name": "author", "type": "fk", "options": {"to": "Author"}},
+            {"name": "title", "type": "char"},
+        ],
+        "meta": {
+            "ordering": ["-title", "slug"],
+            "indexes": [{"fields": ["title", "-slug"]}],
+        },
+        "pagination": {"style": "cursor", "ordering": "author"},
+    }
+    assert indexes.get_indexes("blog", "Post", model) == [
+        {
+            "fields": ["title", "-slug"],
+            "name": "blog_post_title_58bde5_idx",
+            "condition": None,
+            "include": None,
+        }
+    ]
+
+    model["pagination"]["ordering"] = "-pk"
+    model["meta"]["ordering"] = ["title", "?"]
+    model["meta"]["indexes"][0]["condition"] = {"slug__isnull": False}
+    assert [
+        index["fields"] for index in indexes.get_indexes("blog", "Post", model)
+    ] == [["title", "-slug"]]
+    model["meta"]["ordering"] = ["title"]
+    assert [
+        index["fields"] for index in indexes.get_indexes("blog", "Post", model)
+    ] == [
+        ["title", "-slug"],
+        ["title"],
+    ]
+    model["auto_indexes"] = False
+    assert len(indexes.get_indexes("blog", "Post", model)) == 1
@@ -0,0 +1,45 @@
+import json
+import pathlib
+
+import click
+import pytest
+
+from drf_compose import parsing
+
+from .test_compose_contents import json_test_compose, yaml_test_compose
+
+
+@pytest.mark.parametrize(
+    "file_name, format",
+    [
+        ("drf-compose.json", "json"),
+        ("drf-compose.yaml", "yaml"),
+        ("drf-compose.YML", "yaml"),
+        ("compose", "json"),
+    ],
+)
+def test_format_is_detected_from_extension(file_name, format):
+    assert parsing.get_format(pathlib.Path(file_name)) == format
+
+
+def test_yaml_and_json_compose_files_are_equivalent(tmp_path):
+    json_path = tmp_path / "drf-compose.json"
+    json_path.write_text(json_test_compose)
+    yaml_path = tmp_path / "drf-compose.yaml"
+    yaml_path.write_text(yaml_test_compose)
+    assert parsing.load_compose_file(json_path) == parsing.load_compose_file(yaml_path)
+
+
+def test_json_falls_back_to_the_standard_library(monkeypatch):
+    monkeypatch.setattr(parsing, "JSON_BACKENDS", ("not_an_installed_module",))
+    monkeypatch.setattr(parsing, "_json_backend", None)
+    assert parsing.get_json_backend() == ("json", json.loads)
+    assert parsing.parse_compose(b'{"name": "blog"}') == {"name": "blog"}
+
+
+def test_yaml_is_loaded_safely(tmp_path):
+    source = tmp_path / "drf-compose.yaml"
+    source.write_text("name: !!python/object/apply:os.getcwd []\n")
+    with pytest.raises(click.ClickException) as error:
+        parsing.load_compose_file(source)
+    assert "Error parsing compose file" in error.value.format_message()
@@ -0,0 +1,127 @@
+"""Tests for `drf_compose.rendering` module."""
+import json
+import pathlib
+import pickle
+
+import pytest
+
+from drf_compose import compose
+from drf_compose.rendering import (
+    ENGINES,
+    Jinja2Renderer,
+    TemplateRenderer,
+    check_bytecode_cache_dir,
+    set_engine,
+    translate_template,
+)
+
+from .test_compose_contents import json_test_compose
+
+
+def test_templates_are_compiled_once():
+    renderer = TemplateRenderer()
+    template = renderer.get_template("app/models.py-tpl")
+    assert renderer.get_template("app/models.py-tpl") is template
+
+
+def test_on_disk_template_cache(tmp_path):
+    context = {"models": json.loads(json_test_compose)["app_with_model"][0]["models"]}
+    rendered = TemplateRenderer().render("app/models.py-tpl", context)
+
+    TemplateRenderer(cache_dir=tmp_path).get_template("app/models.py-tpl")
+    assert len(list(tmp_path.glob("*.pickle"))) == 1
+
+    cached_renderer = TemplateRenderer(cache_dir=tmp_path)
+    cached_renderer.compile_template = None  # the cached template must be used
+    assert cached_renderer.render("app/models.py-tpl", context) == rendered
+
+
+def test_unusable_template_cache_entry(tmp_path):
+    context = {"models": [{"name": "Post"}]}
+    TemplateRenderer(cache_dir=tmp_path).get_template("app/views.py-tpl")
+    for cache_file in tmp_path.glob("*.pickle"):
+        cache_file.write_bytes(b"not a pickle")
+
+    rendered = TemplateRenderer(cache_dir=tmp_path).render("app/views.py-tpl", context)
+    assert (
+        "class PostViewSet(fieldsets.SparseFieldsViewSetMixin, viewsets.ModelViewSet):"
+    ) in rendered
+
+
+def test_template_cache_entry_can_not_run_code(tmp_path):
+    class Tampered:
+        def __reduce__(self):
+            return pathlib.Path.touch, (tmp_path / "touched",)
+
+    TemplateRenderer(cache_dir=tmp_path).get_template("app/views.py-tpl")
+    for cache_file in tmp_path.glob("*.pickle"):
+        cache_file.write_bytes(pickle.dumps(Tampered()))
+
+    renderer = TemplateRenderer(cache_dir=tmp_path)
+    rendered = renderer.render("app/views.py-tpl", {"models": [{"name": "Post"}]})
+    assert "class PostViewSet(" in rendered
+    assert not (tmp_path / "touched").exists()
+
+
+def test_jinja2_bytecode_cache_is_private(tmp_path):
+    pytest.importorskip("jinja2")
+    cache_dir = tmp_path / "cache"
+    Jinja2Renderer(cache_dir=cache_dir).get_template("app/views.py-tpl")
+    assert cache_dir.stat().st_mode & 0o777 == 0o700
+    (cache_file,) = cache_dir.iterdir()
+
+    environment = Jinja2Renderer(cache_dir=cache_dir).environment
+    source, filename, _ = environment.loader.get_source(environment, "app/views.py-tpl")
+    get_bucket = environment.bytecode_cache.get_bucket
+    assert (
+        get_bucket(environment, "app/views.py-tpl", filename, source).code is not None
+    )
+    # A cache file other users may have written is not run
+    cache_file.chmod(0o666)
+    assert get_bucket(environment, "app/views.py-tpl", filename, source).code is None
+
+    cache_dir.chmod(0o777)
+    assert check_bytecode_cache_dir(cache_dir) == "it is writable by other users"
+    assert Jinja2Renderer(cache_dir=cache_dir).environment.bytecode_cache is None
+
+
+def test_translate_template():
+    source = (
+        "{% load myfilters %}\n"
+        "{% for option, value in field.options.items %}"
+        "{{option}}={{value|clean_option:option}},{{value|default:'a:b'}}"
+        "{% endfor %}"
+    )
+    assert translate_template(source) == (
+        "\n"
+        "{% for option, value in field.options.items %}"
+        "{{option}}={{value|clean_option(option)}},{{value|default('a:b')}}"
+        "{% endfor %}"
+    )
+
+
+@pytest.mark.parametrize("no_format", [True, False])
+def test_engines_generate_identical_projects(tmp_path, no_format):
+    pytest.importorskip("jinja2")
+    compose_content = json.loads(json_test_compose)
+    # Missing options and an app name which Django and Jinja2 title differently
+    compose_content["app_with_model"][0]["models"][0]["fields"][1].pop("options")
+    compose_content["app_with_model"][1]["app_name"] = "post_category"
+
+    trees = {}
+    for engine in ENGINES:
+        set_engine(engine)
+        try:
+            # The renamed app breaks the relation to category.Category migrations resolve
+            result = compose(
+                compose_content,
+                tmp_path,
+                dry_run=True,
+                no_format=no_format,
+                migrations=False,
+            )
+        finally:
+            set_engine("django")
+        assert result.ok
+        trees[engine] = result.tree
+    assert trees["jinja2"].files == trees["django"].files
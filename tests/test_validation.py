@@ -0,0 +1,138 @@
+"""Tests for `drf_compose.validation` module."""
+import json
+
+import pytest
+
+from drf_compose.validation import ComposeValidationError, validate_compose
+
+from .test_compose_contents import json_test_compose
+
+
+def get_validation_errors(compose_file_content):
+    with pytest.raises(ComposeValidationError) as error:
+        validate_compose(compose_file_content)
+    return error.value.errors
+
+
+def test_valid_compose_file_content():
+    validate_compose(json.loads(json_test_compose))
+
+
+def test_every_error_is_collected_with_its_path():
+    compose_file_content = json.loads(json_test_compose)
+    compose_file_content.pop("name")
+    compose_file_content["app_with_model"][0]["models"][0]["fields"][0].pop("type")
+    compose_file_content["app_with_model"][1]["models"][1]["fields"] = "title"
+    compose_file_content["app_with_model"][1]["models"][1]["select_related"] = "label"
+    compose_file_content["auth_app"]["model_name"] = "Custom User"
+    compose_file_content["pagination"] = {"style": "pages", "page_size": 0}
+    compose_file_content["cache"] = {"backend": "redis", "timeout": "1m"}
+    assert get_validation_errors(compose_file_content) == [
+        "name: project name is required",
+        "app_with_model[0].models[0].fields[0].type: field's type is required",
+        "app_with_model[1].models[1].fields: expected a list, got a string",
+        "app_with_model[1].models[1].select_related: expected a list, got a string",
+        "auth_app.model_name: 'Custom User' is not a valid identifier",
+        "pagination.style: 'pages' is not one of 'page_number', 'limit_offset', "
+        "'cursor'",
+        "pagination.page_size: expected a positive integer, got 0",
+        "cache.timeout: expected an integer, got a string",
+    ]
+
+
+def test_duplicate_app_names():
+    compose_file_content = json.loads(json_test_compose)
+    compose_file_content["auth_app"]["app_name"] = "post"
+    assert get_validation_errors(compose_file_content) == [
+        "auth_app.app_name: duplicate app name 'post'",
+    ]
+
+
+def test_compose_file_content_is_not_an_object():
+    assert get_validation_errors([]) == ["expected an object, got a list"]
+
+
+def test_meta_indexes_and_constraints():
+    compose_file_content = json.loads(json_test_compose)
+    meta = compose_file_content["app_with_model"][0]["models"][0]["meta"]
+    meta["indexes"] = [{"name": "post_idx"}]
+    meta["constraints"] = [
+        {"fields": ["title"]},
+        {"name": "post_check", "check": {"title__isnull": False}, "fields": ["title"]},
+    ]
+    compose_file_content["auth_app"]["auto_indexes"] = "no"
+    assert get_validation_errors(compose_file_content) == [
+        "app_with_model[0].models[0].meta.indexes[0].fields: index fields are required",
+        "app_with_model[0].models[0].meta.constraints[0].name: constraint name is required",
+        "app_with_model[0].models[0].meta.constraints[1]: expected either check or fields",
+        "auth_app.auto_indexes: expected a boolean, got a string",
+    ]
+
+
+def test_meta_field_names():
+    compose_file_content = json.loads(json_test_compose)
+    meta = compose_file_content["app_with_model"][0]["models"][0]["meta"]
+    meta["indexes"] = [
+        {"fields": ["-title", "created_by_id"], "include": ["contnet"]},
+        {"fields": ["id"], "condition": {"titel__isnull": False}},
+    ]
+    meta["constraints"] = [{"name": "post_unique", "fields": ["title", "slug"]}]
+    compose_file_content["auth_app"]["meta"]["indexes"] = [
+        {"fields": ["username", "phone", "nickname"]}
+    ]
+    assert get_validation_errors(compose_file_content) == [
+        "app_with_model[0].models[0].meta.indexes[0].include[0]: unknown field 'contnet'",
+        "app_with_model[0].models[0].meta.indexes[1].condition: unknown field 'titel'",
+        "app_with_model[0].models[0].meta.constraints[0].fields[1]: unknown field 'slug'",
+        "auth_app.meta.indexes[0].fields[2]: unknown field 'nickname'",
+    ]
+
+
+def test_database():
+    compose_file_content = json.loads(json_test_compose)
+    compose_file_content["database"] = {
+        "conn_max_age": -1,
+        "pool": {},
+        "statement_timeout": 1000,
+    }
+    assert get_validation_errors(compose_file_content) == [
+        "database.conn_max_age: expected a non-negative integer, got -1",
+    ]
+    compose_file_content["database"]["conn_max_age"] = 0
+    assert get_validation_errors(compose_file_content) == [
+        "database.pool: the sqlite3 engine can not be pooled",
+        "database.statement_timeout: the sqlite3 engine has no statement timeout",
+    ]
+    compose_file_content["database"]["engine"] = "postgresql"
+    validate_compose(compose_file_content)
+
+
+def test_database_aliases():
+    compose_file_content = json.loads(json_test_compose)
+    compose_file_content["database"] = {
+        "replicas": [{"alias": "replica"}, {"alias": "default"}],
+        "databases": [{"alias": "analytics", "replicas": [{"alias": "replica"}]}],
+    }
+    compose_file_content["app_with_model"][0]["database"] = "replica"
+    compose_file_content["app_with_model"][1]["database"] = "analytics"
+    assert get_validation_errors(compose_file_content) == [
+        "database.replicas[1].alias: duplicate database alias 'default'",
+        "database.databases[0].replicas[0].alias: duplicate database alias 'replica'",
+        "app_with_model[0].database: 'replica' is not one of the database.databases "
+        "aliases",
+    ]
+
+
+def test_bulk():
+    compose_content = json.loads(json_test_compose)
+    models = compose_content["app_with_model"][0]["models"]
+    models[0]["bulk"] = "yes"
+    compose_content["app_with_model"][1]["models"][0]["bulk"] = {"batch_size": 0}
+    assert get_validation_errors(compose_content) == [
+        "app_with_model[0].models[0].bulk: expected an object, got a string",
+        "app_with_model[1].models[0].bulk.batch_size: expected a positive integer, "
+        "got 0",
+    ]
+    models[0]["bulk"] = False
+    compose_content["app_with_model"][1]["models"][0]["bulk"] = {}
+    validate_compose(compose_content)